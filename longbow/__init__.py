@@ -34,12 +34,15 @@
 
 from longbow.applications import checkapp, processjobs
 from longbow.configuration import (processconfigs, loadconfigs, saveconfigs,
-                                   saveini)
+                                   saveini, saverecovery, loadrecovery)
 from longbow.entrypoints import launcher, longbow, recovery
+from longbow.jobset import JobSet
 from longbow.scheduling import (checkenv, delete, monitor, prepare,
                                 submit)
 from longbow.shellwrappers import (checkconnections, sendtoshell, sendtossh,
-                                   sendtorsync, localcopy, localdelete,
-                                   locallist, remotecopy, remotedelete,
-                                   remotelist, upload, download)
-from longbow.staging import stage_upstream, stage_downstream, cleanup
+                                   sendtorsync, sendtotar, localcopy,
+                                   localdelete, locallist, remotecopy,
+                                   remotedelete, remotelist, upload, download,
+                                   uploadmany, downloadmany)
+from longbow.staging import (stage_upstream, stage_downstream,
+                             stage_downstream_many, cleanup)
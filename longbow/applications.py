@@ -53,6 +53,8 @@ import logging
 import os
 
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
+import longbow.parallel as parallel
 import longbow.shellwrappers as shellwrappers
 import longbow.apps as apps
 
@@ -79,49 +81,27 @@ def checkapp(jobs):
 
     """
     checked = {}
+    tasks = {}
 
     LOG.info("Testing the executables defined for each job.")
 
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         # If we haven't checked this resource then it is likely not in the dict
         if jobs[job]["resource"] not in checked:
 
             checked[jobs[job]["resource"]] = []
+            tasks[jobs[job]["resource"]] = []
 
         # Now check if we have tested this exec already.
         if jobs[job]["executable"] not in checked[jobs[job]["resource"]]:
 
             # If not then add it to the list now.
             checked[jobs[job]["resource"]].extend([jobs[job]["executable"]])
+            tasks[jobs[job]["resource"]].append(job)
 
-            LOG.info("Checking executable '%s' on '%s'",
-                     jobs[job]["executable"], jobs[job]["resource"])
-
-            cmd = []
-
-            if jobs[job]["modules"] is "":
-
-                LOG.debug("Checking without modules.")
-
-            else:
-                LOG.debug("Checking with modules.")
-
-                for module in jobs[job]["modules"].split(","):
-
-                    module = module.replace(" ", "")
-                    cmd.extend(["module load " + module + "\n"])
-
-            cmd.extend(["which " + jobs[job]["executable"]])
-
-            try:
-
-                shellwrappers.sendtossh(jobs[job], cmd)
-                LOG.info("Executable check - passed.")
-
-            except exceptions.SSHError:
-
-                raise exceptions.ExecutableError("Executable check - failed.")
+    # Check the executables on each resource at the same time.
+    parallel.byresource(jobs, tasks, lambda job: _checkexecutable(jobs[job]))
 
 
 def processjobs(jobs):
@@ -143,7 +123,7 @@ def processjobs(jobs):
     LOG.info("Processing job/s and detecting files that require upload.")
 
     # Process each job.
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         filelist = []
         foundflags = []
@@ -164,7 +144,7 @@ def processjobs(jobs):
                     "not supported".format(job))
 
         # If we have multiple jobs.
-        if len([a for a in jobs if "lbowconf" not in a]) > 1:
+        if len(jobset.joblist(jobs)) > 1:
 
             # Add the job name to the path.
             jobs[job]["localworkdir"] = os.path.join(
@@ -247,6 +227,20 @@ def processjobs(jobs):
 
             jobs[job]["upload-exclude"] = "*"
 
+        # Files fetched whilst the job is running, when staged in tiers.
+        try:
+
+            progress = getattr(apps, app.lower()).PROGRESSFILES
+
+        except AttributeError:
+
+            progress = ""
+
+        if ("download-running" in jobs[job] and
+                jobs[job]["download-running"] == ""):
+
+            jobs[job]["download-running"] = progress
+
         # Replace the input command line with the execution command line.
         jobs[job]["executableargs"] = (jobs[job]["executable"] + " " +
                                        " ".join(jobs[job]["executableargs"]))
@@ -257,6 +251,38 @@ def processjobs(jobs):
     LOG.info("Processing jobs - complete.")
 
 
+def _checkexecutable(job):
+    """Check that the executable for a job can be found on its resource."""
+    LOG.info("Checking executable '%s' on '%s'", job["executable"],
+             job["resource"])
+
+    cmd = []
+
+    if job["modules"] == "":
+
+        LOG.debug("Checking without modules.")
+
+    else:
+
+        LOG.debug("Checking with modules.")
+
+        for module in job["modules"].split(","):
+
+            module = module.replace(" ", "")
+            cmd.extend(["module load " + module + "\n"])
+
+    cmd.extend(["which " + job["executable"]])
+
+    try:
+
+        shellwrappers.sendtossh(job, cmd)
+        LOG.info("Executable check - passed.")
+
+    except exceptions.SSHError:
+
+        raise exceptions.ExecutableError("Executable check - failed.")
+
+
 def _flagvalidator(job, foundflags):
     """Validate that required command-line flags are provided."""
     # Initialisation.
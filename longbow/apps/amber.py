@@ -59,3 +59,7 @@ EXECDATA = {
         "requiredfiles": ["<"],
     },
 }
+
+# Files showing the progress of a job, these are fetched whilst it is
+# running when the job is staged in tiers.
+PROGRESSFILES = "mdinfo, mdout, *.mdout, *.out, *.log"
@@ -58,6 +58,10 @@ EXECDATA = {
     }
 }
 
+# Files showing the progress of a job, these are fetched whilst it is
+# running when the job is staged in tiers.
+PROGRESSFILES = "*.out, *.log"
+
 
 def file_parser(filename, path, files, substitutions=None):
     """Find dependancy files and add them to the upload list.
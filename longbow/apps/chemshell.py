@@ -44,6 +44,10 @@ EXECDATA = {
     }
 }
 
+# Files showing the progress of a job, these are fetched whilst it is
+# running when the job is staged in tiers.
+PROGRESSFILES = "*.out, *.log"
+
 
 def rsyncuploadhook(jobs, job):
     '''Override the default rsync upload parameters to null so that rsync
@@ -43,3 +43,7 @@ EXECDATA = {
         "requiredfiles": ["--include || --restore"],
     },
 }
+
+# Files showing the progress of a job, these are fetched whilst it is
+# running when the job is staged in tiers.
+PROGRESSFILES = "*.log, *.ene"
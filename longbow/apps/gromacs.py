@@ -66,6 +66,10 @@ EXECDATA = {
     }
 }
 
+# Files showing the progress of a job, these are fetched whilst it is
+# running when the job is staged in tiers.
+PROGRESSFILES = "*.log"
+
 
 def defaultfilename(path, item, initargs):
     """Process tpr files provided by the -deffnm flag.
@@ -63,8 +63,20 @@ saveini(inifile, params)
     A method to save an ini file formatted file (inifile) from a dictionary
     structure (params). This method is much simpler than the saveconfigs
     method which has been tuned to simply update configuration files.
+
+saverecovery(recoveryfile, jobs)
+    A method to save the state of a session to its recovery file, by adding
+    what has changed to a journal alongside it.
+
+loadrecovery(recoveryfile)
+    A method to load the state of a session from its recovery file and the
+    journal alongside it.
+
+removerecovery(recoveryfile)
+    A method to remove the recovery file of a session and its journal.
 """
 
+import json
 import logging
 import os
 import re
@@ -72,19 +84,36 @@ import time
 from random import randint
 
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
 import longbow.apps as apps
 
 
 LOG = logging.getLogger("longbow.configuration")
 
+# The changes made since a recovery file was last written are kept in a file
+# of the same name with this on the end.
+JOURNALSUFFIX = ".journal"
+
+# What was last saved to each recovery file, along with how many changes its
+# journal holds and the sequence number of the last of them.
+RECOVERY = {}
+
 JOBTEMPLATE = {
     "account": "",
     "accountflag": "",
     "arcsge-gpu": "",
+    "breaker-cooldown": "600",
+    "breaker-threshold": "3",
+    "bulk-staging": "false",
+    "cleanup-background": "false",
+    "compression": "zlib",
+    "compression-level": "",
     "cores": "24",
     "corespernode": "24",
+    "download-append": "",
     "download-exclude": "",
     "download-include": "",
+    "download-running": "",
     "email-address": "",
     "email-flags": "",
     "env-fix": "false",
@@ -93,13 +122,18 @@ JOBTEMPLATE = {
     "handler": "",
     "hold_jid": "",
     "host": "",
+    "input-cache": "false",
     "localworkdir": "",
     "lsf-cluster": "",
     "maxtime": "24:00",
     "memory": "",
     "modules": "",
     "mpiprocs": "",
+    "persistent-shell": "false",
+    "polling-adaptive": "false",
     "polling-frequency": "300",
+    "polling-frequency-max": "1800",
+    "polling-frequency-min": "60",
     "port": "22",
     "queue": "",
     "recoveryfile": "",
@@ -107,15 +141,30 @@ JOBTEMPLATE = {
     "replicates": "1",
     "replicate-naming": "rep",
     "resource": "",
+    "resource-workers": "4",
+    "retry-attempts": "3",
+    "retry-delay": "10",
     "scheduler": "",
     "scripts": "",
     "sge-peflag": "mpi",
     "sge-peoverride": "false",
+    "skip-compress": ("7z, bz2, dcd, gz, h5, jpg, nc, png, tgz, tpr, trr, "
+                      "xtc, xz, zip, zst"),
     "slurm-gres": "",
+    "ssh-multiplex": "true",
+    "ssh-timeout": "300",
+    "staging-adaptive": "false",
+    "staging-concurrency": "4",
     "staging-frequency": "300",
+    "staging-frequency-max": "1800",
+    "staging-frequency-min": "60",
+    "staging-manifest": "true",
+    "staging-tiers": "false",
     "stdout": "",
     "stderr": "",
     "subfile": "",
+    "submit-batch": "true",
+    "transfer-mode": "rsync",
     "upload-exclude": "",
     "upload-include": "",
     "user": ""
@@ -412,7 +461,9 @@ def saveini(inifile, params):
     """
     LOG.info("Saving current state to recovery file '%s'", inifile)
 
-    ini = open(inifile, "w")
+    # Write a new file and then move it into place, so that the old file is
+    # still there if anything goes wrong part way through.
+    ini = open(inifile + ".tmp", "w")
 
     for obj in params:
 
@@ -426,6 +477,177 @@ def saveini(inifile, params):
 
     ini.close()
 
+    getattr(os, "replace", os.rename)(inifile + ".tmp", inifile)
+
+
+def saverecovery(recoveryfile, jobs):
+    """Save the state of a session to its recovery file.
+
+    Only what has changed since the last save is written, as one line for
+    each job added to the end of a journal alongside the recovery file. Once
+    the journal holds more changes than there are jobs, the whole recovery
+    file is written out again and the journal is emptied, so that loading the
+    session never takes much longer than the recovery file itself.
+
+    Required arguments are:
+
+    recoveryfile (string): This should be an absolute path to a recovery file.
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    """
+    state = RECOVERY.get(recoveryfile)
+
+    if (state is None or state["saved"] is None or
+            state["changes"] > jobset.count(jobs)):
+
+        _compactrecovery(recoveryfile, jobs)
+
+        return
+
+    sequence = state["sequence"]
+    entries = []
+    saved = {}
+
+    for section in jobs:
+
+        last = state["saved"].get(section, {})
+        changed = dict((str(opt), str(value))
+                       for opt, value in jobs[section].items()
+                       if last.get(str(opt)) != str(value))
+
+        if len(changed) > 0:
+
+            sequence = sequence + 1
+            saved[section] = changed
+
+            entries.append(json.dumps(
+                {"sequence": sequence, "section": section,
+                 "params": changed}, sort_keys=True))
+
+    if len(entries) == 0:
+
+        return
+
+    LOG.debug("Saving %d changes to recovery file '%s'", len(entries),
+              recoveryfile)
+
+    with open(recoveryfile + JOURNALSUFFIX, "a") as journal:
+
+        journal.write("\n".join(entries) + "\n")
+
+    for section in saved:
+
+        state["saved"].setdefault(section, {}).update(saved[section])
+
+    state["changes"] = state["changes"] + len(entries)
+    state["sequence"] = sequence
+
+
+def loadrecovery(recoveryfile):
+    """Load the state of a session from its recovery file.
+
+    The changes in the journal alongside the recovery file are applied in
+    turn, leaving out any that were already written to the recovery file and
+    any line that was only part written.
+
+    Required arguments are:
+
+    recoveryfile (string): This should be an absolute path to a recovery file.
+
+    Return parameters are:
+
+    params (dictionary): The jobs data structure as it was last saved.
+
+    """
+    _, _, params = loadconfigs(recoveryfile)
+
+    sequence = 0
+
+    if "lbowconf" in params:
+
+        sequence = int(params["lbowconf"].pop("recovery-sequence", "0"))
+
+    try:
+
+        with open(recoveryfile + JOURNALSUFFIX, "r") as journal:
+
+            for line in journal:
+
+                try:
+
+                    entry = json.loads(line)
+
+                except ValueError:
+
+                    continue
+
+                if entry["sequence"] > sequence:
+
+                    params.setdefault(entry["section"], {}).update(
+                        entry["params"])
+
+                    sequence = entry["sequence"]
+
+    except (IOError, OSError):
+
+        pass
+
+    # The session carries on from a freshly written recovery file, numbering
+    # its changes on from those already in the journal.
+    RECOVERY[recoveryfile] = {"changes": 0, "saved": None,
+                              "sequence": sequence}
+
+    return params
+
+
+def removerecovery(recoveryfile):
+    """Remove the recovery file of a session along with its journal.
+
+    Required arguments are:
+
+    recoveryfile (string): This should be an absolute path to a recovery file.
+
+    """
+    RECOVERY.pop(recoveryfile, None)
+
+    for path in (recoveryfile, recoveryfile + JOURNALSUFFIX):
+
+        if os.path.isfile(path):
+
+            os.remove(path)
+
+
+def _compactrecovery(recoveryfile, jobs):
+    """Write out the whole recovery file and empty its journal.
+
+    The recovery file records the sequence number of the last change it
+    includes, so that if the journal can't be emptied its changes are passed
+    over when loading.
+
+    """
+    sequence = 0
+
+    if recoveryfile in RECOVERY:
+
+        sequence = RECOVERY[recoveryfile]["sequence"]
+
+    params = dict(jobs)
+    params["lbowconf"] = dict(jobs.get("lbowconf", {}))
+    params["lbowconf"]["recovery-sequence"] = sequence
+
+    saveini(recoveryfile, params)
+
+    open(recoveryfile + JOURNALSUFFIX, "w").close()
+
+    RECOVERY[recoveryfile] = {
+        "changes": 0, "sequence": sequence,
+        "saved": dict((section, dict((str(opt), str(value))
+                                     for opt, value in jobs[section].items()))
+                      for section in jobs)}
+
 
 def _processconfigsfinalinit(jobs):
     """Perform some last bits of initialisation."""
@@ -434,7 +656,7 @@ def _processconfigsfinalinit(jobs):
     modoverrides = getattr(apps, "MODNAMEOVERRIDES")
     modules[""] = ""
 
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         # This is just for logging messages.
         jobs[job]["jobname"] = job
@@ -483,10 +705,25 @@ def _processconfigsfinalinit(jobs):
 
 def _processconfigsparams(jobs, parameters, jobdata, hostdata):
     """Assimilate all parameters into jobs dict."""
+    hostlayers = {}
+
     # Process the parameters and apply priority ordering.
     for job in jobs:
 
-        for item in jobs[job]:
+        resource = jobs[job]["resource"]
+
+        # Hosts file is lowest in priority after the defaults, its values are
+        # shared by all of the jobs on the resource.
+        if resource not in hostlayers:
+
+            hostlayers[resource] = dict(
+                (item, value) for item, value in hostdata[resource].items()
+                if item in JOBTEMPLATE and item != "resource" and
+                value != "")
+
+        jobset.inherit(jobs[job], hostlayers[resource])
+
+        for item in list(jobs[job]):
 
             # This should already be dealt with.
             if item != "resource":
@@ -501,23 +738,18 @@ def _processconfigsparams(jobs, parameters, jobdata, hostdata):
 
                     jobs[job][item] = jobdata[job][item]
 
-                # Hosts file is next highest in priority.
-                elif item in hostdata[jobs[job]["resource"]] and \
-                        hostdata[jobs[job]["resource"]][item] is not "":
-
-                    jobs[job][item] = hostdata[jobs[job]["resource"]][item]
-
 
 def _processconfigsresource(parameters, jobdata, hostsections):
     """Check which HPC each job should use."""
     # Initialise
-    jobs = {}
+    jobs = jobset.JobSet()
 
     # Process resource/s for job/s.
     for job in jobdata:
 
-        # Create a base job structure along with known defaults.
-        jobs[job] = JOBTEMPLATE.copy()
+        # Create a base job structure along with known defaults, these are
+        # shared rather than copied into each job.
+        jobs[job] = jobset.JobRecord(layers=(JOBTEMPLATE,))
 
         # Before we go further, check that the job has been assigned a host.
         try:
@@ -585,7 +817,7 @@ def _processconfigsvalidate(jobs):
                       "specifying a value for it in the configuration file."
     }
     # Check parameters that are required for running jobs are provided.
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         # Validate required parameters have been set.
         for validationitem in required:
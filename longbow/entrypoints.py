@@ -47,6 +47,14 @@ longbowmain(parameters)
     structures that the main entry point of the application would normally
     create.
 
+prunecache(parameters)
+    This method is for removing files that have not been used for a given
+    number of days from the remote input caches.
+
+calibrate(parameters)
+    This method is for finding the quickest rsync compression profile for each
+    remote resource and saving it to the hosts configuration file.
+
 recover(recoveryfile)
     This method is for attempting to recover a Longbow session. This should be
     used in cases where jobs have been submitted to the host and somehow
@@ -65,6 +73,7 @@ import longbow.applications as applications
 import longbow.apps as apps
 import longbow.configuration as configuration
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
 import longbow.scheduling as scheduling
 import longbow.shellwrappers as shellwrappers
 import longbow.staging as staging
@@ -97,6 +106,7 @@ def launcher():
     # Initialise parameters that could alternatively be provided in
     # configuration files
     parameters = {
+        "calibrate": False,
         "debug": False,
         "disconnect": False,
         "executable": "",
@@ -107,6 +117,7 @@ def launcher():
         "log": "",
         "maxtime": "",
         "nochecks": False,
+        "prunecache": "",
         "recover": "",
         "resource": "",
         "replicates": "",
@@ -117,6 +128,7 @@ def launcher():
     # Specify all recognised longbow arguments
     alllongbowargs = [
         "--about",
+        "--calibrate",
         "--debug",
         "--disconnect",
         "--examples",
@@ -128,6 +140,7 @@ def launcher():
         "--log",
         "--maxtime",
         "--nochecks",
+        "--prunecache",
         "--recover",
         "--resource",
         "--replicates",
@@ -195,7 +208,9 @@ def launcher():
 
         # If no executable and jobfile has been given then fail.
         if (parameters["executable"] == "" and parameters["job"] == "" and
-                parameters["recover"] == "" and parameters["update"] == ""):
+                parameters["recover"] == "" and parameters["update"] == "" and
+                parameters["prunecache"] == "" and
+                parameters["calibrate"] is False):
 
             raise exceptions.RequiredinputError(
                 "There was no executable or job file given on the "
@@ -205,10 +220,24 @@ def launcher():
         # ---------------------------------------------------------------------
         # Call one of the main methods at the top level of the library.
 
-        jobs = {}
+        jobs = jobset.JobSet()
+
+        # If cache pruning is asked for then do just that.
+        if parameters["prunecache"] != "":
+
+            LOG.info("Pruning the remote input caches.")
+
+            prunecache(parameters)
+
+        # If calibration is asked for then do just that.
+        elif parameters["calibrate"] is True:
+
+            LOG.info("Calibrating the compression used for transfers.")
+
+            calibrate(parameters)
 
         # If recovery or update mode is not active then this is a new run.
-        if parameters["recover"] == "" and parameters["update"] == "":
+        elif parameters["recover"] == "" and parameters["update"] == "":
 
             LOG.info("Initialisation complete.")
 
@@ -247,35 +276,70 @@ def launcher():
 
         LOG.info("User interrupt detected.")
 
-        if len([a for a in jobs if "lbowconf" not in a]) >= 1:
+        if len(jobset.joblist(jobs)) >= 1:
 
             LOG.info("Kill any queued or running jobs and clean up.")
 
-            # If we are exiting at this stage then we need to kill off
-            for item in [a for a in jobs if "lbowconf" not in a]:
+            kill = []
+            fetch = []
+
+            for item in jobset.joblist(jobs):
 
                 job = jobs[item]
 
-                if "laststatus" in job:
+                # Jobs whose files were never staged have nothing to fetch.
+                if "laststatus" in job and not (
+                        "upload-deferred" in job and
+                        job["upload-deferred"] == "true"):
 
-                    # If job is not finished delete and stage.
+                    # If job is not finished delete and stage, jobs held back
+                    # by Longbow were never submitted.
                     if (job["laststatus"] != "Complete" and
                             job["laststatus"] != "Finished" and
                             job["laststatus"] != "Submit Error"):
 
-                        # Kill it.
-                        scheduling.delete(job)
+                        if job["laststatus"] != "Waiting Submission":
 
-                        # Transfer the directories as they are.
-                        staging.stage_downstream(job)
+                            kill.append(item)
+
+                        fetch.append(item)
 
                     # Job is finished then just stage.
                     elif job["laststatus"] != "Submit Error":
 
-                        # Transfer the directories as they are.
-                        staging.stage_downstream(job)
+                        fetch.append(item)
+
+            # Kill them with one command for each resource.
+            if len(kill) > 0:
+
+                scheduling.delete_many(jobs, kill)
+
+                # Nothing more will be written, so fetch everything.
+                for item in kill:
+
+                    jobs[item]["laststatus"] = "Finished"
+
+            failed = []
+
+            # Transfer the directories as they are, all at the same time.
+            if len(fetch) > 0:
+
+                failed = staging.stage_downstream_many(jobs, fetch)
+
+            # Removing the job directories now would lose the results of jobs
+            # that could not be fetched, so keep them along with the recovery
+            # file.
+            if len(failed) > 0:
 
-            staging.cleanup(jobs)
+                LOG.warning(
+                    "The files of job/s '%s' could not be fetched, so the "
+                    "remote job directories and the recovery file have been "
+                    "kept. The files can be fetched later with --recover.",
+                    "', '".join(failed))
+
+            else:
+
+                staging.cleanup(jobs)
 
     # If disconnect mode is enabled then the disconnect exception is raised,
     # allow to disconnect gracefully.
@@ -322,6 +386,9 @@ def launcher():
     # Show nice exit message.
     finally:
 
+        # Shut down any shared SSH connections that are still open.
+        shellwrappers.closeconnections()
+
         LOG.info("Good bye from Longbow!")
         LOG.info("Check out http://www.hecbiosim.ac.uk/ for other "
                  "powerful biomolecular simulation software tools.")
@@ -372,11 +439,9 @@ def longbow(jobs, parameters):
     # uploading.
     scheduling.prepare(jobs)
 
-    # Stage all of the job files along with the scheduling script.
-    staging.stage_upstream(jobs)
-
-    # Submit all jobs.
-    scheduling.submit(jobs)
+    # Stage the job files along with the scheduling script, submitting each
+    # job as soon as its own files are in place.
+    scheduling.submit(jobs, stage=True)
 
     # Process the disconnect function.
     if parameters["disconnect"] is True:
@@ -415,7 +480,7 @@ def recovery(jobs, recoveryfile):
 
         LOG.info("Recovery file found.")
 
-        _, _, jobparams = configuration.loadconfigs(jobfile)
+        jobparams = configuration.loadrecovery(jobfile)
 
         # Copy to jobs so when exceptions are raised the structure is
         # available.
@@ -454,7 +519,7 @@ def update(jobs, updatefile):
 
         LOG.info("Recovery file found.")
 
-        _, _, jobparams = configuration.loadconfigs(jobfile)
+        jobparams = configuration.loadrecovery(jobfile)
 
         # Copy to jobs so when exceptions are raised the structure is
         # available.
@@ -479,6 +544,120 @@ def update(jobs, updatefile):
     staging.cleanup(jobs)
 
 
+def prunecache(parameters):
+    """Prune the remote input caches.
+
+    This method is for removing files from the remote input caches (see the
+    input-cache parameter) that have not been used for a given number of days.
+    The resource given by --resource is pruned, or every resource in the hosts
+    configuration file if no resource is given.
+
+    Required inputs are:
+    parameters (dictionary): A dictionary containing the parameters from the
+                             command-line, "prunecache" holds the number of
+                             days.
+
+    """
+    try:
+
+        days = int(parameters["prunecache"])
+
+    except ValueError:
+
+        raise exceptions.CommandlineargsError(
+            "The --prunecache flag needs a whole number of days, e.g. "
+            "longbow --prunecache 30")
+
+    _, sections, hostdata = configuration.loadconfigs(parameters["hosts"])
+
+    if parameters["resource"] != "":
+
+        sections = [parameters["resource"]]
+
+    for resource in sections:
+
+        if resource not in hostdata:
+
+            raise exceptions.RequiredinputError(
+                "The resource '{0}' is not in the hosts configuration file."
+                .format(resource))
+
+        job = dict(configuration.JOBTEMPLATE)
+        job.update(hostdata[resource])
+        job["resource"] = resource
+
+        if job["host"] == "" or job["remoteworkdir"] == "":
+
+            LOG.info("Resource '%s' has no host or remoteworkdir, skipping.",
+                     resource)
+
+            continue
+
+        staging.prunecache(job, days)
+
+
+def calibrate(parameters):
+    """Find the quickest compression profile for each resource.
+
+    This method will time test transfers to the resource given by --resource,
+    or every resource in the hosts configuration file if no resource is given,
+    with each compression profile that rsync supports at both ends. The
+    quickest profile for each resource is saved to the hosts configuration
+    file as its compression and compression-level parameters.
+
+    Required inputs are:
+    parameters (dictionary): A dictionary containing the parameters from the
+                             command-line.
+
+    """
+    _, sections, hostdata = configuration.loadconfigs(parameters["hosts"])
+    saveparams = {}
+
+    if parameters["resource"] != "":
+
+        sections = [parameters["resource"]]
+
+    for resource in sections:
+
+        if resource not in hostdata:
+
+            raise exceptions.RequiredinputError(
+                "The resource '{0}' is not in the hosts configuration file."
+                .format(resource))
+
+        job = dict(configuration.JOBTEMPLATE)
+        job.update(hostdata[resource])
+        job["resource"] = resource
+
+        if job["host"] == "" or job["remoteworkdir"] == "":
+
+            LOG.info("Resource '%s' has no host or remoteworkdir, skipping.",
+                     resource)
+
+            continue
+
+        try:
+
+            best, _ = shellwrappers.calibrate(job)
+
+        except (exceptions.SSHError, exceptions.RsyncError):
+
+            LOG.warning("Could not calibrate transfers to resource '%s'.",
+                        resource)
+
+            continue
+
+        LOG.info("The quickest compression for resource '%s' is '%s' "
+                 "(level '%s').", resource, best[0], best[1] or "default")
+
+        saveparams[resource] = {"compression": best[0],
+                                "compression-level": best[1]}
+
+    if len(saveparams) > 0:
+
+        configuration.saveconfigs(parameters["hosts"], saveparams)
+
+
 def _commandlineproc(alllongbowargs, cmdlnargs, parameters):
     """Process the command-line arguments.
 
@@ -714,6 +893,9 @@ def _messageflags(longbowargs):
               "example.top -o output\n\n"
               "longbow args:\n\n"
               "--about                   : prints Longbow description.\n"
+              "--calibrate               : finds the quickest compression "
+              "for transfers to\n                            each resource "
+              "and saves it to the hosts file.\n"
               "--debug                   : additional output to assist "
               "debugging.\n"
               "--disconnect              : instructs Longbow to disconnect and"
@@ -731,6 +913,9 @@ def _messageflags(longbowargs):
               "should be directed to.\n"
               "--maxtime [HH:MM]         : set the maximum job time for all "
               "jobs.\n"
+              "--prunecache [days]       : removes files not used for this "
+              "many days from\n                            the remote input "
+              "caches.\n"
               "--recover [file name]     : launches the recovery mode.\n"
               "--resource [name]         : specifies the remote resource.\n"
               "--replicates [number]     : number of replicate jobs to be "
@@ -0,0 +1,529 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""A module containing the container that holds the jobs of a session.
+
+The jobs data structure is a dictionary of jobs keyed on job name, with the
+settings for the whole session kept under "lbowconf". The JobSet class found
+here behaves just like that dictionary, so it can be used anywhere the plain
+dictionary is, but it also keeps track of which jobs are in each state and on
+each resource. This means questions such as "which jobs are running on this
+resource" can be answered without looking at every job in the session, which
+matters when the monitor asks them of thousands of jobs on every pass.
+
+The following can be found:
+
+JobSet(jobs=None)
+    A dictionary of jobs that keeps its jobs indexed by their laststatus and
+    resource parameters as these change.
+
+JobRecord(params=None, layers=())
+    A dictionary-like record of the parameters of one job, which only holds
+    the parameters set for that job and takes the rest from layers of shared
+    defaults. A JobRecord in a JobSet tells it when the job changes state or
+    resource.
+
+joblist(jobs, states=None, resources=None)
+    This method will list the names of the jobs in the jobs data structure,
+    optionally only those in some states or on some resources.
+
+count(jobs, states=None)
+    This method will count the jobs in the jobs data structure, optionally
+    only those in some states.
+
+getint(job, param)
+    This method will get a job parameter as an integer.
+
+inherit(job, layer)
+    This method will give a job a layer of default parameters.
+"""
+
+import threading
+
+try:
+
+    from collections.abc import MutableMapping
+
+except ImportError:
+
+    from collections import MutableMapping
+
+# The job parameters that JobSet keeps an index of.
+INDEXED = ("laststatus", "resource")
+
+
+class JobSet(dict):
+    """A dictionary of jobs, indexed by state and resource.
+
+    Jobs added to a JobSet are held as JobRecords, so that the
+    indexes are kept up to date whenever their laststatus or resource is
+    changed. The session settings are kept under "lbowconf" as a plain
+    dictionary and are never counted as a job.
+
+    """
+
+    def __init__(self, jobs=None):
+        """Create a JobSet, optionally holding the jobs given."""
+        dict.__init__(self)
+
+        self._lock = threading.RLock()
+        self._order = {}
+        self._added = 0
+        self._index = dict((param, {}) for param in INDEXED)
+
+        if jobs is not None:
+
+            self.update(jobs)
+
+    def __setitem__(self, name, params):
+        """Add a job, or replace the session settings under "lbowconf"."""
+        if name == "lbowconf":
+
+            dict.__setitem__(self, name, params)
+
+            return
+
+        # Records already in a JobSet are copied, keeping their layers.
+        if not isinstance(params, JobRecord):
+
+            record = JobRecord(params)
+
+        elif params._owner is None:
+
+            record = params
+
+        else:
+
+            record = params.copy()
+
+        with self._lock:
+
+            if name in self:
+
+                self._unindex(name, dict.__getitem__(self, name))
+
+            else:
+
+                self._order[name] = self._added
+                self._added = self._added + 1
+
+            record._owner = self
+            record._name = name
+
+            dict.__setitem__(self, name, record)
+
+            for param in INDEXED:
+
+                self._reindex(name, param, None, record.get(param))
+
+    def __delitem__(self, name):
+        """Remove a job."""
+        with self._lock:
+
+            if name != "lbowconf" and name in self:
+
+                record = dict.__getitem__(self, name)
+
+                self._unindex(name, record)
+                del self._order[name]
+
+                record._owner = None
+
+            dict.__delitem__(self, name)
+
+    def clear(self):
+        """Remove all jobs and settings."""
+        for name in list(self):
+
+            del self[name]
+
+    def pop(self, name, *default):
+        """Remove a job and return it."""
+        if name not in self:
+
+            return dict.pop(self, name, *default)
+
+        params = self[name]
+
+        del self[name]
+
+        return params
+
+    def popitem(self):
+        """Remove any job and return its name along with it."""
+        for name in self:
+
+            return name, self.pop(name)
+
+        raise KeyError("popitem(): JobSet is empty")
+
+    def setdefault(self, name, params=None):
+        """Get a job, adding it first if it isn't there."""
+        if name not in self:
+
+            self[name] = params if params is not None else {}
+
+        return self[name]
+
+    def update(self, *args, **kwargs):
+        """Add many jobs at once."""
+        for name, params in dict(*args, **kwargs).items():
+
+            self[name] = params
+
+    @property
+    def conf(self):
+        """The session settings, kept apart from the jobs."""
+        return self.setdefault("lbowconf", {})
+
+    def select(self, states=None, resources=None):
+        """List the jobs in some states and on some resources.
+
+        The jobs are listed in the order they were added, all jobs are listed
+        if neither states nor resources are given.
+
+        """
+        with self._lock:
+
+            if states is None and resources is None:
+
+                names = self._order
+
+            else:
+
+                names = None
+
+                for param, values in (("laststatus", states),
+                                      ("resource", resources)):
+
+                    if values is None:
+
+                        continue
+
+                    found = set()
+
+                    for value in values:
+
+                        found.update(self._index[param].get(value, ()))
+
+                    names = found if names is None else names & found
+
+            return sorted(names, key=self._order.get)
+
+    def count(self, states=None):
+        """Count the jobs, or just those in some states."""
+        with self._lock:
+
+            if states is None:
+
+                return len(self._order)
+
+            return sum(len(self._index["laststatus"].get(state, ()))
+                       for state in set(states))
+
+    def _reindex(self, name, param, old, new):
+        """Move a job to its new place in the index of a parameter."""
+        with self._lock:
+
+            index = self._index[param]
+
+            if old in index:
+
+                index[old].discard(name)
+
+                if len(index[old]) == 0:
+
+                    del index[old]
+
+            index.setdefault(new, set()).add(name)
+
+    def _unindex(self, name, record):
+        """Remove a job from all of the indexes."""
+        for param in INDEXED:
+
+            values = self._index[param]
+            value = record.get(param)
+
+            if value in values:
+
+                values[value].discard(name)
+
+                if len(values[value]) == 0:
+
+                    del values[value]
+
+
+class JobRecord(MutableMapping):
+    """The parameters of a job, on top of layers of shared defaults.
+
+    A job record only holds the parameters that were set for that job, such
+    as those from the command-line and job configuration file or those set
+    while the job runs. Anything else is looked up in its layers in turn, for
+    example the parameters of its resource from the hosts configuration file
+    and then the JOBTEMPLATE, which are shared by all of the jobs using them.
+    Removing a parameter set for the job brings back the default from its
+    layers, if there is one.
+
+    Job records in a JobSet tell it whenever their indexed parameters change.
+    Integer parameters can be read with getint, which only parses each value
+    once.
+
+    """
+
+    __slots__ = ("_values", "_layers", "_typed", "_owner", "_name")
+
+    def __init__(self, params=None, layers=()):
+        """Create a job record holding a copy of params over the layers."""
+        self._values = dict(params) if params is not None else {}
+        self._layers = tuple(layers)
+        self._typed = None
+        self._owner = None
+        self._name = None
+
+    def __getitem__(self, param):
+        """Get a parameter, from the job if it is set there."""
+        try:
+
+            return self._values[param]
+
+        except KeyError:
+
+            for layer in self._layers:
+
+                if param in layer:
+
+                    return layer[param]
+
+        raise KeyError(param)
+
+    def __contains__(self, param):
+        """Check if a parameter is set for the job or its layers."""
+        if param in self._values:
+
+            return True
+
+        return any(param in layer for layer in self._layers)
+
+    def __iter__(self):
+        """Go through the parameters, those set for the job come first."""
+        seen = set(self._values)
+
+        for param in self._values:
+
+            yield param
+
+        for layer in self._layers:
+
+            for param in layer:
+
+                if param not in seen:
+
+                    seen.add(param)
+
+                    yield param
+
+    def __len__(self):
+        """Count the parameters."""
+        return len(set(self._values).union(*self._layers))
+
+    def __repr__(self):
+        """Show the parameters as a plain dictionary would."""
+        return repr(dict(self))
+
+    def __setitem__(self, param, value):
+        """Set a parameter, telling the JobSet about a change of index."""
+        self._change(param, lambda: self._values.__setitem__(param, value))
+
+    def __delitem__(self, param):
+        """Remove a parameter set for the job."""
+        self._change(param, lambda: self._values.__delitem__(param))
+
+    def copy(self):
+        """Make a new job record, sharing the same layers."""
+        return JobRecord(self._values, self._layers)
+
+    def inherit(self, layer):
+        """Add a layer of defaults, in front of the existing layers."""
+        before = dict((param, self.get(param)) for param in INDEXED)
+
+        self._layers = (layer,) + self._layers
+        self._typed = None
+
+        for param in INDEXED:
+
+            if self._owner is not None and self.get(param) != before[param]:
+
+                self._owner._reindex(self._name, param, before[param],
+                                     self.get(param))
+
+    def getint(self, param):
+        """Get a parameter as an integer, parsing it the first time only."""
+        if self._typed is None:
+
+            self._typed = {}
+
+        if param not in self._typed:
+
+            self._typed[param] = int(self[param])
+
+        return self._typed[param]
+
+    def _change(self, param, change):
+        """Change a parameter, keeping the indexes and parsed values."""
+        if self._typed is not None:
+
+            self._typed.pop(param, None)
+
+        if self._owner is not None and param in INDEXED:
+
+            with self._owner._lock:
+
+                old = self.get(param)
+
+                change()
+
+                self._owner._reindex(self._name, param, old, self.get(param))
+
+        else:
+
+            change()
+
+
+def joblist(jobs, states=None, resources=None):
+    """List the names of the jobs in the jobs data structure.
+
+    The indexes of a JobSet are used where jobs is one, otherwise each job is
+    looked at in turn, so that plain dictionaries can still be used.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    Optional arguments are:
+
+    states (list) - Only list the jobs whose laststatus is one of these.
+
+    resources (list) - Only list the jobs on one of these resources.
+
+    Return parameters are:
+
+    names (list) - The names of the jobs, in the order they were added.
+
+    """
+    if isinstance(jobs, JobSet):
+
+        return jobs.select(states, resources)
+
+    return [a for a in jobs if "lbowconf" not in a and
+            (states is None or jobs[a].get("laststatus") in states) and
+            (resources is None or jobs[a]["resource"] in resources)]
+
+
+def count(jobs, states=None):
+    """Count the jobs in the jobs data structure.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    Optional arguments are:
+
+    states (list) - Only count the jobs whose laststatus is one of these.
+
+    Return parameters are:
+
+    count (int) - The number of jobs.
+
+    """
+    if isinstance(jobs, JobSet):
+
+        return jobs.count(states)
+
+    return len(joblist(jobs, states))
+
+
+def getint(job, param):
+    """Get a job parameter as an integer.
+
+    Job records only parse each parameter once, plain dictionaries are parsed
+    every time.
+
+    Required arguments are:
+
+    job (dictionary) - A single job from the Longbow jobs data structure.
+
+    param (string) - The name of the parameter.
+
+    Return parameters are:
+
+    value (int) - The value of the parameter.
+
+    """
+    if isinstance(job, JobRecord):
+
+        return job.getint(param)
+
+    return int(job[param])
+
+
+def inherit(job, layer):
+    """Give a job a layer of default parameters.
+
+    The parameters in layer take priority over the defaults the job already
+    has, but not over anything set for the job itself. A job record shares
+    the layer with the other jobs given it. The parameters are copied into a
+    plain dictionary, over whatever it holds, so the layer should be given
+    before anything is set for the job. The layer should only hold parameters
+    the job has.
+
+    Required arguments are:
+
+    job (dictionary) - A single job from the Longbow jobs data structure.
+
+    layer (dictionary) - The default parameters.
+
+    """
+    if isinstance(job, JobRecord):
+
+        job.inherit(layer)
+
+    else:
+
+        for param in layer:
+
+            if param in job:
+
+                job[param] = layer[param]
@@ -0,0 +1,226 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""A module containing methods for working on remote resources in parallel.
+
+Most of the time Longbow spends in a session is spent waiting on remote
+hosts. This module provides a way of doing that waiting for all resources at
+the same time, so that a session spread over several machines takes as long
+as the slowest of them, rather than the sum of all of them.
+
+The following methods can be found:
+
+groupbyresource(jobs, joblist)
+    This method will group a list of jobs by the resource they run on.
+
+byresource(jobs, tasks, function, limit="resource-workers", stoponerror=True)
+    This method will call function on every item in tasks, a dictionary of
+    lists of items keyed on resource. Each resource is worked on at the same
+    time, by up to as many threads as the limit parameter of its jobs allows.
+"""
+
+import logging
+import threading
+
+try:
+
+    import queue
+
+except ImportError:
+
+    import Queue as queue
+
+import longbow.jobset as jobset
+
+LOG = logging.getLogger("longbow.parallel")
+
+# Held whilst changing anything in the jobs structure that is shared between
+# resources, such as the queue slot counters in jobs["lbowconf"].
+LOCK = threading.RLock()
+
+
+def groupbyresource(jobs, joblist=None):
+    """Group jobs by the resource they run on.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    Optional arguments are:
+
+    joblist (list) - The names of the jobs to group, all jobs are grouped if
+                     this is not given.
+
+    Return parameters are:
+
+    resources (dictionary) - Lists of job names keyed on resource, jobs keep
+                             the order they were given in.
+
+    """
+    resources = {}
+
+    if joblist is None:
+
+        joblist = jobset.joblist(jobs)
+
+    for job in joblist:
+
+        resources.setdefault(jobs[job]["resource"], []).append(job)
+
+    return resources
+
+
+def byresource(jobs, tasks, function, limit="resource-workers",
+               stoponerror=True):
+    """Run a function on many items, in parallel across resources.
+
+    Each resource gets its own pool of worker threads, the size of which is
+    taken from the limit parameter of the jobs on that resource (one if this
+    is not set). Once all items are done, if any call raised an exception then
+    the one belonging to the earliest item is raised again here.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    tasks (dictionary) - Lists of items (such as job names) keyed on resource.
+                         Items must be unique across all resources.
+
+    function (method) - The method to call with each item.
+
+    Optional arguments are:
+
+    limit (string) - The job parameter giving the number of threads to use on
+                     each resource.
+
+    stoponerror (boolean) - If True, no new items are started once a call has
+                            raised an exception. If False, the remaining items
+                            carry on regardless.
+
+    Return parameters are:
+
+    results (dictionary) - The return value of each call keyed on its item.
+
+    """
+    results = {}
+    errors = {}
+    order = []
+    threads = []
+
+    for resource in sorted(tasks):
+
+        items = queue.Queue()
+
+        for item in tasks[resource]:
+
+            items.put(item)
+            order.append(item)
+
+        workers = min(_workers(jobs, resource, limit), len(tasks[resource]))
+
+        LOG.debug("Using %s worker/s for %s item/s on resource '%s'",
+                  workers, len(tasks[resource]), resource)
+
+        for _ in range(workers):
+
+            threads.append(threading.Thread(
+                target=_worker,
+                args=(items, function, results, errors, stoponerror)))
+
+    # Not worth a thread if there is only one lot of work to do.
+    if len(threads) == 1:
+
+        threads[0].run()
+
+    else:
+
+        for thread in threads:
+
+            thread.daemon = True
+            thread.start()
+
+        for thread in threads:
+
+            # Join with a timeout so that Ctrl-C is still picked up.
+            while thread.is_alive():
+
+                thread.join(0.1)
+
+    for item in order:
+
+        if item in errors:
+
+            raise errors[item]
+
+    return results
+
+
+def _workers(jobs, resource, limit):
+    """Get the number of worker threads to use for a resource."""
+    for job in jobset.joblist(jobs, resources=[resource]):
+
+        if limit in jobs[job]:
+
+            try:
+
+                return max(jobset.getint(jobs[job], limit), 1)
+
+            except ValueError:
+
+                return 1
+
+    return 1
+
+
+def _worker(items, function, results, errors, stoponerror):
+    """Work through a queue of items until it is empty."""
+    while len(errors) == 0 or stoponerror is False:
+
+        try:
+
+            item = items.get_nowait()
+
+        except queue.Empty:
+
+            return
+
+        try:
+
+            results[item] = function(item)
+
+        except Exception as err:
+
+            errors[item] = err
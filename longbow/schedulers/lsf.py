@@ -35,16 +35,28 @@
 delete(job)
     A method for deleting a single job.
 
+delete_many(jobs)
+    A method for deleting many jobs on one resource with a single command.
+
 prepare(job)
     The method for creating the job submission file for a single job.
 
 status(job)
     The method for checking the status of a job.
 
+status_many(jobs)
+    The method for checking the status of many jobs on one resource with a
+    single scheduler query.
+
 submit(job)
     The method for submitting a single job.
+
+submit_many(jobs)
+    The method for submitting many jobs on one resource with a single remote
+    script.
 """
 
+import json
 import os
 import re
 
@@ -53,6 +65,19 @@ import longbow.shellwrappers as shellwrappers
 
 QUERY_STRING = "env | grep -i 'lsf'"
 
+STATES = {
+    "DONE": "Job Exited Properly",
+    "EXIT": "Job Exited in Error",
+    "PEND": "Queued",
+    "PSUSP": "Suspended",
+    "RUN": "Running",
+    "SSUSP": "Suspended",
+    "UNKWN": "Unknown Status",
+    "USUSP": "Suspended",
+    "WAIT": "Waiting for Start Time",
+    "ZOMBI": "Zombie Job"
+}
+
 
 def delete(job):
     """Delete a job."""
@@ -70,6 +95,22 @@ def delete(job):
     return shellout[0]
 
 
+def delete_many(jobs):
+    """Delete many jobs on the same resource with one command."""
+    jobids = [job["jobid"] for job in jobs]
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["bkill " + " ".join(jobids)])
+
+    except exceptions.SSHError:
+
+        raise exceptions.JobdeleteError("Unable to delete jobs.")
+
+    return shellout[0]
+
+
 def prepare(job):
     """Create the LSF jobfile ready for submitting jobs."""
     # Open file for LSF script.
@@ -200,19 +241,6 @@ def prepare(job):
 def status(job):
     """Query a job status."""
     # Initialise variables.
-    states = {
-        "DONE": "Job Exited Properly",
-        "EXIT": "Job Exited in Error",
-        "PEND": "Queued",
-        "PSUSP": "Suspended",
-        "RUN": "Running",
-        "SSUSP": "Suspended",
-        "UNKWN": "Unknown Status",
-        "USUSP": "Suspended",
-        "WAIT": "Waiting for Start Time",
-        "ZOMBI": "Zombie Job"
-    }
-
     jobstate = ""
 
     shellout = shellwrappers.sendtossh(job, ["bjobs -u " + job["user"]])
@@ -229,7 +257,7 @@ def status(job):
 
         if len(line) > 0 and job["jobid"] in line[0]:
 
-            jobstate = states[line[2]]
+            jobstate = STATES[line[2]]
             break
 
     if jobstate == "":
@@ -239,6 +267,64 @@ def status(job):
     return jobstate
 
 
+def status_many(jobs):
+    """Query the status of many jobs on the same resource.
+
+    Only the requested jobs are asked for and the reply is requested as json
+    so it can be parsed in one go. LSF installs without json output fall back
+    to a single query of all of the users jobs. Jobs that no longer appear in
+    the queue are reported as finished.
+    """
+    jobids = [job["jobid"] for job in jobs]
+    jobstates = {}
+
+    # Asking for jobs by id also gets those that have ended but not yet been
+    # purged, these are left out so that they are reported as finished.
+    ended = ("DONE", "EXIT")
+
+    # bjobs exits with an error if any job id has left the system, which must
+    # not be mistaken for a failed SSH connection.
+    shellout = shellwrappers.sendtossh(
+        jobs[0], ["bjobs -o 'jobid stat' -json " + " ".join(jobids) +
+                  " || true"])
+
+    try:
+
+        for record in json.loads(shellout[0])["RECORDS"]:
+
+            if ("STAT" in record and record["STAT"] in STATES and
+                    record["STAT"] not in ended):
+
+                jobid = re.match(r'\d+', record["JOBID"]).group()
+                jobstates[jobid] = STATES[record["STAT"]]
+
+    except (ValueError, KeyError, TypeError, AttributeError):
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["bjobs -u " + jobs[0]["user"]])
+
+        for line in shellout[0].split("\n"):
+
+            line = line.split()
+
+            if len(line) > 2 and line[2] in STATES and line[2] not in ended:
+
+                jobid = re.match(r'\d+', line[0])
+
+                if jobid is not None:
+
+                    jobstates[jobid.group()] = STATES[line[2]]
+
+    # Anything not found must have finished.
+    for jobid in jobids:
+
+        if jobid not in jobstates:
+
+            jobstates[jobid] = "Finished"
+
+    return jobstates
+
+
 def submit(job):
     """Submit a job."""
     # cd into the working directory and submit the job.
@@ -251,21 +337,61 @@ def submit(job):
 
     except exceptions.SSHError as inst:
 
-        if "limit" in inst.stderr:
+        _submiterror(inst.stdout, inst.stderr)
 
-            raise exceptions.QueuemaxError
+    _submitjobid(job, shellout[0])
 
-        else:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. The following output "
-                "came back from the SSH call:\nstdout: {0}\nstderr {1}"
-                .format(inst.stdout, inst.stderr))
+def submit_many(jobs):
+    """Submit many jobs on the same resource in one go.
+
+    The submit commands for all of the jobs are run by one remote script, the
+    output of each is then checked as in submit. Returns a list holding the
+    exception raised for each job, or None for those that were submitted.
+    """
+    shellouts = shellwrappers.sendtosshmany(
+        jobs[0], [["cd " + job["destdir"] + "\n", "bsub < " + job["subfile"]]
+                  for job in jobs])
+    errors = []
+
+    for job, shellout in zip(jobs, shellouts):
+
+        try:
+
+            if shellout[2] != 0:
+
+                _submiterror(shellout[0], shellout[1])
+
+            _submitjobid(job, shellout[0])
+            errors.append(None)
+
+        except (exceptions.QueuemaxError, exceptions.JobsubmitError) as err:
+
+            errors.append(err)
+
+    return errors
+
+
+def _submiterror(stdout, stderr):
+    """Raise the exception matching the error from a submit command."""
+    if "limit" in stderr:
+
+        raise exceptions.QueuemaxError
+
+    else:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. The following output "
+            "came back from the SSH call:\nstdout: {0}\nstderr {1}"
+            .format(stdout, stderr))
+
 
+def _submitjobid(job, stdout):
+    """Get the job id from the output of a submit command."""
     try:
 
         # Do the regex in Longbow rather than in the subprocess.
-        jobid = re.search(r'\d+', shellout[0]).group()
+        jobid = re.search(r'\d+', stdout).group()
 
     except AttributeError:
 
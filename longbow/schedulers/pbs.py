@@ -35,16 +35,28 @@
 delete(job)
     A method for deleting a single job.
 
+delete_many(jobs)
+    A method for deleting many jobs on one resource with a single command.
+
 prepare(job)
     The method for creating the job submission file for a single job.
 
 status(job)
     The method for checking the status of a job.
 
+status_many(jobs)
+    The method for checking the status of many jobs on one resource with a
+    single scheduler query.
+
 submit(job)
     The method for submitting a single job.
+
+submit_many(jobs)
+    The method for submitting many jobs on one resource with a single remote
+    script.
 """
 
+import json
 import math
 import os
 import re
@@ -54,6 +66,20 @@ import longbow.shellwrappers as shellwrappers
 
 QUERY_STRING = "env | grep -i 'pbs'"
 
+STATES = {
+    "B": "Subjob(s) Running",
+    "E": "Exiting",
+    "H": "Held",
+    "M": "Job Moved to Server",
+    "Q": "Queued",
+    "R": "Running",
+    "S": "Suspended",
+    "T": "Job Moved to New Location",
+    "U": "Cycle-Harvesting Job is Suspended Due to Keyboard Activity",
+    "W": "Waiting for Start Time",
+    "X": "Subjob Completed Execution/Has Been Deleted"
+}
+
 
 def delete(job):
     """Delete a job."""
@@ -77,6 +103,32 @@ def delete(job):
     return shellout[0]
 
 
+def delete_many(jobs):
+    """Delete many jobs on the same resource with one command."""
+    jobids = []
+
+    for job in jobs:
+
+        if int(job["replicates"]) > 1:
+
+            jobids.append(job["jobid"] + "[]")
+
+        else:
+
+            jobids.append(job["jobid"])
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["qdel " + " ".join(jobids)])
+
+    except exceptions.SSHError:
+
+        raise exceptions.JobdeleteError("Unable to delete jobs.")
+
+    return shellout[0]
+
+
 def prepare(job):
     """Create the PBS jobfile ready for submitting jobs."""
     # Open file for PBS script.
@@ -222,20 +274,6 @@ def prepare(job):
 def status(job):
     """Query a job status."""
     # Initialise variables.
-    states = {
-        "B": "Subjob(s) Running",
-        "E": "Exiting",
-        "H": "Held",
-        "M": "Job Moved to Server",
-        "Q": "Queued",
-        "R": "Running",
-        "S": "Suspended",
-        "T": "Job Moved to New Location",
-        "U": "Cycle-Harvesting Job is Suspended Due to Keyboard Activity",
-        "W": "Waiting for Start Time",
-        "X": "Subjob Completed Execution/Has Been Deleted"
-    }
-
     jobstate = ""
 
     shellout = shellwrappers.sendtossh(job, ["qstat -u " + job["user"]])
@@ -249,7 +287,7 @@ def status(job):
 
         if len(line) > 0 and job["jobid"] in line[0]:
 
-            jobstate = states[line[9]]
+            jobstate = STATES[line[9]]
             break
 
     if jobstate == "":
@@ -259,6 +297,82 @@ def status(job):
     return jobstate
 
 
+def status_many(jobs):
+    """Query the status of many jobs on the same resource.
+
+    Only the requested jobs are asked for and the reply is requested as json
+    so it can be parsed in one go. PBS installs without json output (such as
+    Torque) fall back to a single query of all of the users jobs. Jobs that no
+    longer appear in the queue are reported as finished.
+    """
+    jobids = [job["jobid"] for job in jobs]
+    query = []
+    jobstates = {}
+
+    # Array jobs (replicates) have to be asked for as such.
+    for job in jobs:
+
+        if int(job["replicates"]) > 1:
+
+            query.append(job["jobid"] + "[]")
+
+        else:
+
+            query.append(job["jobid"])
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["qstat -f -F json " + " ".join(query)])
+
+        stdout = shellout[0]
+
+    except exceptions.SSHError as inst:
+
+        # qstat exits with an error if any job id has left the system, but
+        # still reports the rest.
+        stdout = inst.stdout
+
+    try:
+
+        queue = json.loads(stdout)["Jobs"]
+
+        for jobid in queue:
+
+            state = queue[jobid]["job_state"]
+
+            # Array jobs come back as "id[].server", key on the bare id.
+            if state in STATES:
+
+                jobstates[re.match(r'\d+', jobid).group()] = STATES[state]
+
+    except (ValueError, KeyError, TypeError, AttributeError):
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["qstat -u " + jobs[0]["user"]])
+
+        for line in shellout[0].split("\n"):
+
+            line = line.split()
+
+            if len(line) > 9 and line[9] in STATES:
+
+                jobid = re.match(r'\d+', line[0])
+
+                if jobid is not None:
+
+                    jobstates[jobid.group()] = STATES[line[9]]
+
+    # Anything not found must have finished.
+    for jobid in jobids:
+
+        if jobid not in jobstates:
+
+            jobstates[jobid] = "Finished"
+
+    return jobstates
+
+
 def submit(job):
     """Submit a job."""
     # Change into the working directory and submit the job.
@@ -270,69 +384,109 @@ def submit(job):
 
     except exceptions.SSHError as inst:
 
-        if "would exceed" in inst.stderr and "per-user limit" in inst.stderr:
+        _submiterror(inst.stdout, inst.stderr)
 
-            raise exceptions.QueuemaxError
+    _submitjobid(job, shellout[0])
 
-        elif "set_booleans" in inst.stderr:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. The likely cause is "
-                "your particular PBS install is not receiving the "
-                "information/options/parameters it " "requires "
-                "e.g. '#PBS -l mem=20gb'. Check the PBS documentation and edit"
-                " the configuration files to provide the necessary information"
-                "e.g. 'memory = 20' in the job configuration file")
+def submit_many(jobs):
+    """Submit many jobs on the same resource in one go.
 
-        elif "Job rejected by all possible destinations" in inst.stderr:
+    The submit commands for all of the jobs are run by one remote script, the
+    output of each is then checked as in submit. Returns a list holding the
+    exception raised for each job, or None for those that were submitted.
+    """
+    shellouts = shellwrappers.sendtosshmany(
+        jobs[0], [["cd " + job["destdir"] + "\n", "qsub " + job["subfile"]]
+                  for job in jobs])
+    errors = []
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. This may be because "
-                "you need to provide PBS with your account code and the "
-                "account flag your PBS install expects (Longbow defaults to "
-                "A). Check the PBS documentation and edit the configuration "
-                "files to provide the necessary information e.g. "
-                "'accountflag = P' and 'account = ABCD-01234-EFG'")
+    for job, shellout in zip(jobs, shellouts):
 
-        elif "Job must specify budget (-A option)" in inst.stderr:
+        try:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. This may be because "
-                "you provided PBS with an account flag other than 'A' which "
-                "your PBS install expects")
+            if shellout[2] != 0:
 
-        elif "Job exceeds queue and/or server resource limits" in inst.stderr:
+                _submiterror(shellout[0], shellout[1])
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. PBS has reported "
-                "that 'Job exceeds queue and/or server resource limits'. "
-                "This may be because you set a walltime or some other "
-                "quantity that exceeds the maximum allowed on your system.")
+            _submitjobid(job, shellout[0])
+            errors.append(None)
 
-        elif "budget" in inst.stderr:
+        except (exceptions.QueuemaxError, exceptions.JobsubmitError) as err:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. This may be that you "
-                "have entered an incorrect account code.")
+            errors.append(err)
 
-        elif "illegal -N value" in inst.stderr:
+    return errors
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. This is due to the job "
-                "name being too long, consult your system administrators/"
-                "documentation to query this policy (try < 15 chars).")
 
-        else:
+def _submiterror(stdout, stderr):
+    """Raise the exception matching the error from a submit command."""
+    if "would exceed" in stderr and "per-user limit" in stderr:
+
+        raise exceptions.QueuemaxError
+
+    elif "set_booleans" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. The likely cause is "
+            "your particular PBS install is not receiving the "
+            "information/options/parameters it " "requires "
+            "e.g. '#PBS -l mem=20gb'. Check the PBS documentation and edit"
+            " the configuration files to provide the necessary information"
+            "e.g. 'memory = 20' in the job configuration file")
+
+    elif "Job rejected by all possible destinations" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. This may be because "
+            "you need to provide PBS with your account code and the "
+            "account flag your PBS install expects (Longbow defaults to "
+            "A). Check the PBS documentation and edit the configuration "
+            "files to provide the necessary information e.g. "
+            "'accountflag = P' and 'account = ABCD-01234-EFG'")
+
+    elif "Job must specify budget (-A option)" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. This may be because "
+            "you provided PBS with an account flag other than 'A' which "
+            "your PBS install expects")
+
+    elif "Job exceeds queue and/or server resource limits" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. PBS has reported "
+            "that 'Job exceeds queue and/or server resource limits'. "
+            "This may be because you set a walltime or some other "
+            "quantity that exceeds the maximum allowed on your system.")
+
+    elif "budget" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. This may be that you "
+            "have entered an incorrect account code.")
+
+    elif "illegal -N value" in stderr:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. This is due to the job "
+            "name being too long, consult your system administrators/"
+            "documentation to query this policy (try < 15 chars).")
+
+    else:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. The following output "
+            "came back from the SSH call:\nstdout: {0}\nstderr {1}"
+            .format(stdout, stderr))
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. The following output "
-                "came back from the SSH call:\nstdout: {0}\nstderr {1}"
-                .format(inst.stdout, inst.stderr))
 
+def _submitjobid(job, stdout):
+    """Get the job id from the output of a submit command."""
     try:
 
         # Do the regex in Longbow rather than in the subprocess.
-        jobid = re.search(r'\d+', shellout[0]).group()
+        jobid = re.search(r'\d+', stdout).group()
 
     except AttributeError:
 
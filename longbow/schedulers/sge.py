@@ -35,14 +35,25 @@
 delete(job)
     A method for deleting a single job.
 
+delete_many(jobs)
+    A method for deleting many jobs on one resource with a single command.
+
 prepare(job)
     The method for creating the job submission file for a single job.
 
 status(job)
     The method for checking the status of a job.
 
+status_many(jobs)
+    The method for checking the status of many jobs on one resource with a
+    single scheduler query.
+
 submit(job)
     The method for submitting a single job.
+
+submit_many(jobs)
+    The method for submitting many jobs on one resource with a single remote
+    script.
 """
 
 import os
@@ -53,6 +64,12 @@ import longbow.shellwrappers as shellwrappers
 
 QUERY_STRING = "env | grep -i 'sge'"
 
+STATES = {
+    "h": "Held",
+    "qw": "Queued",
+    "r": "Running"
+}
+
 
 def delete(job):
     """Delete a job."""
@@ -70,6 +87,22 @@ def delete(job):
     return shellout[0]
 
 
+def delete_many(jobs):
+    """Delete many jobs on the same resource with one command."""
+    jobids = [job["jobid"] for job in jobs]
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["qdel " + " ".join(jobids)])
+
+    except exceptions.SSHError:
+
+        raise exceptions.JobdeleteError("Unable to delete jobs.")
+
+    return shellout[0]
+
+
 def prepare(job):
     """Create the SGE jobfile ready for submitting jobs."""
     # Open file for LSF script.
@@ -190,12 +223,6 @@ def prepare(job):
 def status(job):
     """Query a job status."""
     # Initialise variables.
-    states = {
-        "h": "Held",
-        "qw": "Queued",
-        "r": "Running"
-    }
-
     jobstate = ""
 
     shellout = shellwrappers.sendtossh(job, ["qstat -u " + job["user"]])
@@ -212,7 +239,7 @@ def status(job):
 
         if len(line) > 0 and job["jobid"] in line[0]:
 
-            jobstate = states[line[4]]
+            jobstate = STATES[line[4]]
             break
 
     if jobstate == "":
@@ -222,6 +249,41 @@ def status(job):
     return jobstate
 
 
+def status_many(jobs):
+    """Query the status of many jobs on the same resource.
+
+    qstat cannot filter on a list of job ids, so the users jobs are queried
+    once and the table is parsed for every job in a single pass. Jobs that no
+    longer appear in the queue are reported as finished.
+    """
+    jobids = [job["jobid"] for job in jobs]
+    jobstates = {}
+
+    shellout = shellwrappers.sendtossh(jobs[0],
+                                       ["qstat -u " + jobs[0]["user"]])
+
+    for line in shellout[0].split("\n"):
+
+        line = line.split()
+
+        if len(line) > 4 and line[4] in STATES:
+
+            jobid = re.match(r'\d+', line[0])
+
+            if jobid is not None:
+
+                jobstates[jobid.group()] = STATES[line[4]]
+
+    # Anything not found must have finished.
+    for jobid in jobids:
+
+        if jobid not in jobstates:
+
+            jobstates[jobid] = "Finished"
+
+    return jobstates
+
+
 def submit(job):
     """Submit a job."""
     # Change into the working directory and submit the job.
@@ -234,21 +296,61 @@ def submit(job):
 
     except exceptions.SSHError as inst:
 
-        if "per user" in inst.stderr or "per-user" in inst.stderr:
+        _submiterror(inst.stdout, inst.stderr)
 
-            raise exceptions.QueuemaxError
+    _submitjobid(job, shellout[0])
 
-        else:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. The following output "
-                "came back from the SSH call:\nstdout: {0}\nstderr {1}"
-                .format(inst.stdout, inst.stderr))
+def submit_many(jobs):
+    """Submit many jobs on the same resource in one go.
+
+    The submit commands for all of the jobs are run by one remote script, the
+    output of each is then checked as in submit. Returns a list holding the
+    exception raised for each job, or None for those that were submitted.
+    """
+    shellouts = shellwrappers.sendtosshmany(
+        jobs[0], [["cd " + job["destdir"] + "\n", "qsub " + job["subfile"]]
+                  for job in jobs])
+    errors = []
+
+    for job, shellout in zip(jobs, shellouts):
+
+        try:
+
+            if shellout[2] != 0:
+
+                _submiterror(shellout[0], shellout[1])
+
+            _submitjobid(job, shellout[0])
+            errors.append(None)
+
+        except (exceptions.QueuemaxError, exceptions.JobsubmitError) as err:
+
+            errors.append(err)
+
+    return errors
+
+
+def _submiterror(stdout, stderr):
+    """Raise the exception matching the error from a submit command."""
+    if "per user" in stderr or "per-user" in stderr:
+
+        raise exceptions.QueuemaxError
+
+    else:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. The following output "
+            "came back from the SSH call:\nstdout: {0}\nstderr {1}"
+            .format(stdout, stderr))
+
 
+def _submitjobid(job, stdout):
+    """Get the job id from the output of a submit command."""
     try:
 
         # Do the regex in Longbow rather than in the subprocess.
-        jobid = re.search(r'\d+', shellout[0]).group()
+        jobid = re.search(r'\d+', stdout).group()
 
     except AttributeError:
 
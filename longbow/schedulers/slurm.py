@@ -35,14 +35,25 @@
 delete(job)
     A method for deleting a single job.
 
+delete_many(jobs)
+    A method for deleting many jobs on one resource with a single command.
+
 prepare(job)
     The method for creating the job submission file for a single job.
 
 status(job)
     The method for checking the status of a job.
 
+status_many(jobs)
+    The method for checking the status of many jobs on one resource with a
+    single scheduler query.
+
 submit(job)
     The method for submitting a single job.
+
+submit_many(jobs)
+    The method for submitting many jobs on one resource with a single remote
+    script.
 """
 
 import math
@@ -54,6 +65,20 @@ import longbow.shellwrappers as shellwrappers
 
 QUERY_STRING = "which sbatch"
 
+STATES = {
+    "CA": "Cancelled",
+    "CD": "Completed",
+    "CF": "Configuring",
+    "CG": "Completing",
+    "F": "Failed",
+    "NF": "Node Failure",
+    "PD": "Pending",
+    "PR": "Preempted",
+    "R": "Running",
+    "S": "Suspended",
+    "TO": "Timed out"
+}
+
 
 def delete(job):
     """Delete a job."""
@@ -71,6 +96,22 @@ def delete(job):
     return shellout[0]
 
 
+def delete_many(jobs):
+    """Delete many jobs on the same resource with one command."""
+    jobids = [job["jobid"] for job in jobs]
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["scancel " + " ".join(jobids)])
+
+    except exceptions.SSHError:
+
+        raise exceptions.JobdeleteError("Unable to delete jobs.")
+
+    return shellout[0]
+
+
 def prepare(job):
     """Create the SLURM jobfile ready for submitting jobs."""
     # Open file for SLURM script.
@@ -201,20 +242,6 @@ def prepare(job):
 def status(job):
     """Query a job status."""
     # Initialise variables.
-    states = {
-        "CA": "Cancelled",
-        "CD": "Completed",
-        "CF": "Configuring",
-        "CG": "Completing",
-        "F": "Failed",
-        "NF": "Node Failure",
-        "PD": "Pending",
-        "PR": "Preempted",
-        "R": "Running",
-        "S": "Suspended",
-        "TO": "Timed out"
-    }
-
     jobstate = ""
 
     shellout = shellwrappers.sendtossh(job, ["squeue -u " + job["user"]])
@@ -231,7 +258,7 @@ def status(job):
 
         if len(line) > 0 and job["jobid"] in line[0]:
 
-            jobstate = states[line[4]]
+            jobstate = STATES[line[4]]
             break
 
     if jobstate == "":
@@ -241,6 +268,56 @@ def status(job):
     return jobstate
 
 
+def status_many(jobs):
+    """Query the status of many jobs on the same resource.
+
+    Only the requested jobs are asked for, and slurm is told to print just
+    the job id and state so the reply is cheap to produce and to parse.
+    Jobs that no longer appear in the queue are reported as finished.
+    """
+    jobids = [job["jobid"] for job in jobs]
+    jobstates = {}
+
+    try:
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["squeue -h -j " + ",".join(jobids) + " -o '%i %t'"])
+
+    except exceptions.SSHError as inst:
+
+        # Some versions of slurm reject the whole query if any of the job ids
+        # have already left the system, so fall back to a single query for
+        # all of the users jobs.
+        if "Invalid job id" not in inst.stderr:
+
+            raise
+
+        shellout = shellwrappers.sendtossh(
+            jobs[0], ["squeue -h -u " + jobs[0]["user"] + " -o '%i %t'"])
+
+    for line in shellout[0].split("\n"):
+
+        line = line.split()
+
+        # Array jobs are reported as jobid_index, so key on the leading digits.
+        if len(line) > 1 and line[1] in STATES:
+
+            jobid = re.match(r'\d+', line[0])
+
+            if jobid is not None:
+
+                jobstates[jobid.group()] = STATES[line[1]]
+
+    # Anything not found must have finished.
+    for jobid in jobids:
+
+        if jobid not in jobstates:
+
+            jobstates[jobid] = "Finished"
+
+    return jobstates
+
+
 def submit(job):
     """Submit a job."""
     # Change into the working directory and submit the job.
@@ -253,21 +330,61 @@ def submit(job):
 
     except exceptions.SSHError as inst:
 
-        if "violates" in inst.stderr and "job submit limit" in inst.stderr:
+        _submiterror(inst.stdout, inst.stderr)
 
-            raise exceptions.QueuemaxError
+    _submitjobid(job, shellout[0])
 
-        else:
 
-            raise exceptions.JobsubmitError(
-                "Something went wrong when submitting. The following output "
-                "came back from the SSH call:\nstdout: {0}\nstderr {1}"
-                .format(inst.stdout, inst.stderr))
+def submit_many(jobs):
+    """Submit many jobs on the same resource in one go.
+
+    The submit commands for all of the jobs are run by one remote script, the
+    output of each is then checked as in submit. Returns a list holding the
+    exception raised for each job, or None for those that were submitted.
+    """
+    shellouts = shellwrappers.sendtosshmany(
+        jobs[0], [["cd " + job["destdir"] + "\n", "sbatch " + job["subfile"]]
+                  for job in jobs])
+    errors = []
+
+    for job, shellout in zip(jobs, shellouts):
+
+        try:
+
+            if shellout[2] != 0:
+
+                _submiterror(shellout[0], shellout[1])
+
+            _submitjobid(job, shellout[0])
+            errors.append(None)
+
+        except (exceptions.QueuemaxError, exceptions.JobsubmitError) as err:
+
+            errors.append(err)
+
+    return errors
+
+
+def _submiterror(stdout, stderr):
+    """Raise the exception matching the error from a submit command."""
+    if "violates" in stderr and "job submit limit" in stderr:
+
+        raise exceptions.QueuemaxError
+
+    else:
+
+        raise exceptions.JobsubmitError(
+            "Something went wrong when submitting. The following output "
+            "came back from the SSH call:\nstdout: {0}\nstderr {1}"
+            .format(stdout, stderr))
+
 
+def _submitjobid(job, stdout):
+    """Get the job id from the output of a submit command."""
     try:
 
         # Do the regex in Longbow rather than in the subprocess.
-        jobid = re.search(r'\d+', shellout[0]).group()
+        jobid = re.search(r'\d+', stdout).group()
 
     except AttributeError:
 
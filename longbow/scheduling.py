@@ -47,6 +47,10 @@ delete(job)
     A method containing the generic and boiler plate Longbow code for deleting
     a job.
 
+delete_many(jobs, joblist)
+    A method for deleting many jobs, with a single delete command for each
+    resource where the scheduler plugin supports it.
+
 monitor(jobs)
     A method containing the generic and boiler plate Longbow code for
     monitoring a job, this method contains the entire structure of the loop
@@ -56,17 +60,21 @@ prepare(jobs)
     A method containing the generic and boiler plate Longbow code for
     constructing the submit file.
 
-submit(jobs)
+submit(jobs, stage=False)
     A method containing the generic and boiler plate Longbow code for
-    submitting a job.
+    submitting a job. Optionally the files for each job are staged just before
+    it is submitted.
 """
 
+import heapq
 import logging
 import time
 import os
 
 import longbow.configuration as configuration
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
+import longbow.parallel as parallel
 import longbow.shellwrappers as shellwrappers
 import longbow.staging as staging
 import longbow.schedulers as schedulers
@@ -74,6 +82,34 @@ import longbow.schedulers as schedulers
 
 LOG = logging.getLogger("longbow.scheduling")
 
+# Jobs with adaptive staging are staged about once for every this many bytes
+# of output they are seen to write, within their minimum and maximum interval.
+STAGINGBYTES = 10485760
+
+# When each job with adaptive staging is next due to be staged, along with the
+# size of its local directory and its rate of growth at the last staging.
+STAGING = {}
+
+# The number of jobs listed in the summary of time spent staging files.
+TRANSFERSUMMARY = 5
+
+# How long to wait before staging again when all jobs have finished but some
+# could not be staged.
+RESTAGEDELAY = 1.0
+
+# When each job with adaptive polling is next due to be polled, along with the
+# status it was last seen in, how many polls it has been in that status and
+# when it was first seen running.
+POLLING = {}
+
+# The states in which a job with adaptive polling is still waiting in the
+# queue, the time between its polls doubles while it stays in one of these.
+POLLQUEUED = ("Held", "Held in queue", "Pending", "Queued", "Suspended",
+              "Waiting for Start Time")
+
+# The most times the polling interval of a queued job is doubled.
+POLLBACKOFF = 10
+
 
 def checkenv(jobs, hostconf):
     """Determine the scheduler and job handler on a machine.
@@ -96,65 +132,37 @@ def checkenv(jobs, hostconf):
     """
     save = False
 
-    checked = []
     saveparams = {}
+    resources = parallel.groupbyresource(jobs)
 
-    # Take a look at each job.
-    for item in [a for a in jobs if "lbowconf" not in a]:
-
-        job = jobs[item]
-
-        # If we have not checked this host already
-        if job["resource"] not in checked:
+    # Check each resource at the same time, using the first job on each.
+    results = parallel.byresource(
+        jobs, dict((resource, [resource]) for resource in resources),
+        lambda resource: _checkresource(jobs[resources[resource][0]]))
 
-            # Make sure we don't check the same thing again.
-            checked.extend([job["resource"]])
+    for resource in resources:
 
-            # If we don't have the resource defined then define it.
-            if job["resource"] not in saveparams:
+        saveparams[resource] = results[resource]
 
-                saveparams[job["resource"]] = {}
-                
-            # If we have no scheduler defined by the user then find it.
-            if job["scheduler"] is "":
+        if len(saveparams[resource]) > 0:
 
-                _testscheduler(job)
-                saveparams[job["resource"]]["scheduler"] = job["scheduler"]
-                save = True
-
-            else:
-
-                LOG.info("The environment on host '%s' is '%s'",
-                         job["resource"], job["scheduler"])
-
-            # If we have no job handler defined by the user then find it.
-            if job["handler"] is "":
-
-                _testhandler(job)
-                saveparams[job["resource"]]["handler"] = job["handler"]
-                save = True
-
-            else:
+            save = True
 
-                LOG.info("The handler on host '%s' is '%s'",
-                         job["resource"], job["handler"])
+        # Then copy any detected scheduler or handler over to the other jobs
+        # on this resource.
+        for item in resources[resource][1:]:
 
-        # If resource has been checked.
-        else:
-
-            # Then we should have a look if the resource for this job has been
-            # altered.
-            if job["resource"] in saveparams:
+            job = jobs[item]
 
-                # Then check if scheduler has been added.
-                if "scheduler" in saveparams[job["resource"]]:
+            # Then check if scheduler has been added.
+            if "scheduler" in saveparams[resource]:
 
-                    job["scheduler"] = saveparams[job["resource"]]["scheduler"]
+                job["scheduler"] = saveparams[resource]["scheduler"]
 
-                # Then check if handler has been added.
-                if "handler" in saveparams[job["resource"]]:
+            # Then check if handler has been added.
+            if "handler" in saveparams[resource]:
 
-                    job["handler"] = saveparams[job["resource"]]["handler"]
+                job["handler"] = saveparams[resource]["handler"]
 
     # Do we have anything to change in the host file.
     if save is True:
@@ -197,6 +205,39 @@ def delete(job):
     LOG.info("Deletion successful")
 
 
+def delete_many(jobs, joblist):
+    """Delete many jobs.
+
+    The jobs on each resource are deleted at the same time as those on the
+    others. Where the scheduler plugin provides delete_many, all of the jobs
+    on a resource are deleted with a single command, otherwise they are
+    deleted one at a time (see delete). A failure to delete is logged and does
+    not stop the others.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    joblist (list) - The names of the jobs to delete.
+
+    """
+    tasks = parallel.groupbyresource(jobs, joblist)
+
+    for resource in tasks:
+
+        plugin = getattr(schedulers,
+                         jobs[tasks[resource][0]]["scheduler"].lower(), None)
+
+        if len(tasks[resource]) > 1 and hasattr(plugin, "delete_many"):
+
+            tasks[resource] = [tuple(tasks[resource])]
+
+    parallel.byresource(jobs, tasks, lambda item: _deletemany(jobs, item),
+                        stoponerror=False)
+
+
 def monitor(jobs):
     """Monitor the status of jobs (loop).
 
@@ -214,39 +255,88 @@ def monitor(jobs):
     LOG.info("Monitoring job/s. Depending on the chosen logging mode, Longbow "
              "might appear to be doing nothing. Please be patient!")
 
+    # Start from a clean timetable, in case jobs from an earlier call share
+    # their names with these.
+    POLLING.clear()
+    STAGING.clear()
+
     stageinterval, pollinterval = _monitorinitialise(jobs)
+    pollintervals = _pollintervals(jobs, pollinterval)
 
     allcomplete = False
-    allfinished = False
-    lastpolltime = 0
-    laststagetime = 0
     basepath = os.path.expanduser('~/.longbow')
     recoveryfile = os.path.join(basepath, jobs["lbowconf"]["recoveryfile"])
     saverecoveryfile = True
     recoveryfileerror = False
 
+    # Everything that is to be done is kept in order of when it falls due,
+    # each resource is polled to its own timetable and jobs with adaptive
+    # staging are staged to theirs ("" stands for all of the other jobs).
+    events = []
+    deadlines = {}
+    now = time.time()
+
+    for resource in pollintervals:
+
+        _schedule(events, deadlines, now, "poll", resource)
+
+    if int(stageinterval) != 0:
+
+        _schedule(events, deadlines, now, "stage", "")
+
     # Loop until all jobs are done.
     while allcomplete is False:
 
-        # Sane time interval (CPU core maxes out easily otherwise).
-        time.sleep(1.0)
+        # Sleep until the next thing is due.
+        time.sleep(max(events[0][0] - time.time(), 0))
 
         now = time.time()
+        due = _dueevents(events, deadlines, now)
+
+        # Poll the resources that are due, then submit any jobs that were
+        # waiting for the slots that have been freed up.
+        if len(due["poll"]) > 0:
 
-        # Check if we should be polling.
-        if int(now - lastpolltime) > int(pollinterval):
+            saverecoveryfile = _polljobs(jobs, saverecoveryfile, due["poll"])
+            saverecoveryfile = _checkwaitingjobs(jobs, saverecoveryfile,
+                                                 due["poll"])
 
-            lastpolltime = int(now)
-            saverecoveryfile = _polljobs(jobs, saverecoveryfile)
-            saverecoveryfile = _checkwaitingjobs(jobs, saverecoveryfile)
+            _pollingupdate(jobs, now, due["poll"])
 
-        # Check if we should be staging.
-        if ((int(now - laststagetime) > int(stageinterval) and
-                int(stageinterval) != 0) or allfinished is True):
+            for resource in due["poll"]:
+
+                _schedule(events, deadlines,
+                          _pollnext(jobs, resource, now,
+                                    pollintervals[resource]),
+                          "poll", resource)
+
+            _stagingschedule(jobs, events, deadlines, now, due["poll"])
+
+        # Stage the jobs without adaptive staging.
+        if "" in due["stage"]:
 
-            laststagetime = int(now)
             saverecoveryfile = _stagejobfiles(jobs, saverecoveryfile)
 
+            if int(stageinterval) != 0:
+
+                _schedule(events, deadlines, now + int(stageinterval),
+                          "stage", "")
+
+        # Jobs with adaptive staging keep their own timetable.
+        staged = _stagingdue(jobs, now, [a for a in due["stage"] if a != ""])
+
+        if len(staged) > 0:
+
+            saverecoveryfile = _stagejobfiles(jobs, saverecoveryfile, staged)
+            _stagingupdate(jobs, staged, now)
+
+            for job in staged:
+
+                if jobs[job]["laststatus"] != "Complete":
+
+                    _schedule(events, deadlines, STAGING[job]["next"],
+                              "stage", job)
+
         # Save out the recovery files.
         if (os.path.isdir(os.path.expanduser('~/.longbow')) and
                 saverecoveryfile is True and recoveryfileerror is False and
@@ -256,7 +346,7 @@ def monitor(jobs):
 
             try:
 
-                configuration.saveini(recoveryfile, jobs)
+                configuration.saverecovery(recoveryfile, jobs)
 
             except (OSError, IOError):
 
@@ -267,6 +357,18 @@ def monitor(jobs):
 
         allcomplete, allfinished = _checkcomplete(jobs)
 
+        # Once everything has finished the last of the files are fetched
+        # straight away, and again shortly after if any could not be.
+        if allfinished is True and allcomplete is False:
+
+            if "" in due["stage"]:
+
+                _schedule(events, deadlines, now + RESTAGEDELAY, "stage", "")
+
+            else:
+
+                _schedule(events, deadlines, now, "stage", "")
+
         if ("update" in jobs["lbowconf"] and allfinished is False and
                 allcomplete is False):
 
@@ -278,7 +380,7 @@ def monitor(jobs):
     complete = 0
     error = 0
 
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         if jobs[job]["laststatus"] == "Submit Error":
 
@@ -291,6 +393,9 @@ def monitor(jobs):
     LOG.info("Session complete - %s jobs ran - %s jobs encountered submission "
              "errors.", complete, error)
 
+    shellwrappers.connectionsummary()
+    _transfersummary(jobs)
+
 
 def prepare(jobs):
     """Create job submission scripts.
@@ -309,7 +414,7 @@ def prepare(jobs):
     """
     LOG.info("Creating submit files for job/s.")
 
-    for item in [a for a in jobs if "lbowconf" not in a]:
+    for item in jobset.joblist(jobs):
 
         job = jobs[item]
         scheduler = job["scheduler"]
@@ -341,18 +446,28 @@ def prepare(jobs):
     LOG.info("Submit file/s created.")
 
 
-def submit(jobs):
+def submit(jobs, stage=False):
     """Submit all jobs.
 
     A method containing the generic and boiler plate Longbow code for
     submitting a job.
 
+    If stage is True, the files for the jobs are staged here too and each job
+    is submitted as soon as its own files are in place, rather than once all
+    jobs have been staged. Once a resource has hit its queue slot limit, the
+    files for the rest of its jobs are not staged until they can be submitted
+    (see _checkwaitingjobs).
+
     Required arguments are:
 
     jobs (dictionary) - The Longbow jobs data structure, see configuration.py
                         for more information about the format of this
                         structure.
 
+    Optional arguments are:
+
+    stage (boolean) - Stage the files for each job before submitting it.
+
     """
     # Initialise some counters.
     submitted = 0
@@ -361,7 +476,7 @@ def submit(jobs):
 
     LOG.info("Submitting job/s.")
 
-    for item in [a for a in jobs if "lbowconf" not in a]:
+    for item in jobset.joblist(jobs):
 
         job = jobs[item]
 
@@ -369,69 +484,102 @@ def submit(jobs):
         jobs["lbowconf"][job["resource"] + "-" + "queue-slots"] = str(0)
         jobs["lbowconf"][job["resource"] + "-" + "queue-max"] = str(0)
 
-    for item in [a for a in jobs if "lbowconf" not in a]:
+    full = []
+    results = {}
 
-        job = jobs[item]
-        scheduler = job["scheduler"]
+    try:
 
-        # Try and submit.
-        try:
+        if stage is True:
 
-            getattr(schedulers, scheduler.lower()).submit(job)
+            # Submit each lot of jobs straight after its files are staged.
+            held = staging.stage_upstream(
+                jobs, then=lambda group: _submitstaged(jobs, group, full,
+                                                       results))
 
-            LOG.info("Job '%s' submitted with id '%s'", item, job["jobid"])
+            # These jobs have nothing on the remote resource yet.
+            for item in held:
 
-            job["laststatus"] = "Queued"
+                jobs[item]["upload-deferred"] = "true"
+                results[item] = _submitjob(jobs, item,
+                                           [jobs[item]["resource"]])
 
-            # Increment the queue counter by one (used to count the slots).
-            jobs["lbowconf"][job["resource"] + "-" + "queue-slots"] = str(int(
-                jobs["lbowconf"][job["resource"] + "-" + "queue-slots"]) + 1)
+        else:
 
-            submitted += 1
+            # Jobs on resources whose plugin can submit many jobs at once go
+            # out in one remote script per resource, the outcome for each job
+            # is then dealt with below.
+            outcomes = {}
 
-        # Submit method can't be found.
-        except AttributeError:
+            parallel.byresource(
+                jobs, _submitgroups(jobs),
+                lambda group: outcomes.update(_submitmany(jobs, group)))
 
-            raise exceptions.PluginattributeError(
-                "submit method cannot be found in plugin '{0}'"
-                .format(scheduler))
+            # Submit to each resource at the same time.
+            results = parallel.byresource(
+                jobs, parallel.groupbyresource(jobs),
+                lambda item: _submitjob(jobs, item, full, outcomes))
+
+    finally:
+
+        # Jobs may have been submitted before staging failed for another.
+        if len(results) > 0:
+
+            _saverecovery(jobs)
+
+    for item in results:
 
-        # Some sort of error in submitting the job.
-        except exceptions.JobsubmitError as err:
+        if results[item] == "Queued":
 
-            LOG.error(err)
+            submitted += 1
 
-            job["laststatus"] = "Submit Error"
+        elif results[item] == "Submit Error":
 
             error += 1
 
-        # Hit maximum slots on resource, Longbow will sub-schedule these.
-        except exceptions.QueuemaxError:
+        else:
 
-            for item in [a for a in jobs if "lbowconf" not in a]:
+            queued += 1
 
-                if "laststatus" not in jobs[item]:
+    LOG.info("%s Submitted, %s Held due to queue limits and %s Failed.",
+             submitted, queued, error)
 
-                    LOG.info("The job '%s' has been held back by Longbow due "
-                             "to reaching queue slot limit, it will be "
-                             "submitted when a slot opens up.", item)
 
-                    # We will set a flag so that we can inform the user that
-                    # it is handled.
-                    jobs[item]["laststatus"] = "Waiting Submission"
+def _checkresource(job):
+    """Find the scheduler and handler for a resource if the user hasn't.
 
-                    queued += 1
+    Returns a dictionary of any parameters that were found, so that they can be
+    saved to the host configuration file.
 
-            break
+    """
+    saveparams = {}
+
+    # If we have no scheduler defined by the user then find it.
+    if job["scheduler"] == "":
+
+        _testscheduler(job)
+        saveparams["scheduler"] = job["scheduler"]
+
+    else:
+
+        LOG.info("The environment on host '%s' is '%s'",
+                 job["resource"], job["scheduler"])
+
+    # If we have no job handler defined by the user then find it.
+    if job["handler"] == "":
 
-        # We want to find out what the maximum number of slots we have are.
-        if int(jobs["lbowconf"][job["resource"] + "-" + "queue-slots"]) > \
-                int(jobs["lbowconf"][job["resource"] + "-" + "queue-max"]):
+        _testhandler(job)
+        saveparams["handler"] = job["handler"]
 
-            jobs["lbowconf"][job["resource"] + "-" + "queue-max"] = \
-                jobs["lbowconf"][job["resource"] + "-" + "queue-slots"]
+    else:
 
-    # Save out the recovery files.
+        LOG.info("The handler on host '%s' is '%s'",
+                 job["resource"], job["handler"])
+
+    return saveparams
+
+
+def _saverecovery(jobs):
+    """Save out the recovery file, if there is somewhere to put it."""
     if (os.path.isdir(os.path.expanduser('~/.longbow')) and
             jobs["lbowconf"]["recoveryfile"] != ""):
 
@@ -443,7 +591,7 @@ def submit(jobs):
             LOG.info("Recovery file will be placed at path '%s'",
                      recoveryfile)
 
-            configuration.saveini(recoveryfile, jobs)
+            configuration.saverecovery(recoveryfile, jobs)
 
         except (OSError, IOError):
 
@@ -451,8 +599,195 @@ def submit(jobs):
                 "Could not write recovery file, possibly due to permissions "
                 "on the ~/.longbow directory.")
 
-    LOG.info("%s Submitted, %s Held due to queue limits and %s Failed.",
-             submitted, queued, error)
+
+def _deletemany(jobs, item):
+    """Delete a job, or a group of jobs (a tuple of names) in one go."""
+    if not isinstance(item, tuple):
+
+        delete(jobs[item])
+
+        return
+
+    joblist = [jobs[a] for a in item]
+    plugin = getattr(schedulers, joblist[0]["scheduler"].lower())
+
+    try:
+
+        LOG.info("Deleting the jobs '%s'", "', '".join(
+            job["jobname"] for job in joblist))
+
+        plugin.delete_many(joblist)
+
+    except exceptions.JobdeleteError:
+
+        LOG.info("Unable to delete the jobs on resource '%s'",
+                 joblist[0]["resource"])
+
+        return
+
+    LOG.info("Deletion successful")
+
+
+def _submitjob(jobs, item, full, outcomes=None):
+    """Submit a single job.
+
+    Once a resource has told us its queue is full (it is added to the full
+    list) the rest of its jobs are held back by Longbow. Jobs that have
+    already been submitted along with the others on their resource have their
+    outcome (None or the exception raised) given in outcomes. Returns the
+    status of the job.
+
+    """
+    job = jobs[item]
+    scheduler = job["scheduler"]
+    resource = job["resource"]
+
+    # Try and submit.
+    try:
+
+        if outcomes is not None and item in outcomes:
+
+            if outcomes[item] is not None:
+
+                raise outcomes[item]
+
+        elif resource in full:
+
+            raise exceptions.QueuemaxError("Queue is full.")
+
+        else:
+
+            getattr(schedulers, scheduler.lower()).submit(job)
+
+        LOG.info("Job '%s' submitted with id '%s'", item, job["jobid"])
+
+        job["laststatus"] = "Queued"
+
+        qslots = resource + "-" + "queue-slots"
+        qmax = resource + "-" + "queue-max"
+
+        with parallel.LOCK:
+
+            # Increment the queue counter by one (used to count the slots).
+            jobs["lbowconf"][qslots] = str(
+                jobset.getint(jobs["lbowconf"], qslots) + 1)
+
+            # We want to find out what the maximum number of slots we have
+            # are.
+            if (jobset.getint(jobs["lbowconf"], qslots) >
+                    jobset.getint(jobs["lbowconf"], qmax)):
+
+                jobs["lbowconf"][qmax] = jobs["lbowconf"][qslots]
+
+    # Submit method can't be found.
+    except AttributeError:
+
+        raise exceptions.PluginattributeError(
+            "submit method cannot be found in plugin '{0}'"
+            .format(scheduler))
+
+    # Some sort of error in submitting the job.
+    except exceptions.JobsubmitError as err:
+
+        LOG.error(err)
+
+        job["laststatus"] = "Submit Error"
+
+    # Hit maximum slots on resource, Longbow will sub-schedule these.
+    except exceptions.QueuemaxError:
+
+        with parallel.LOCK:
+
+            if resource not in full:
+
+                full.append(resource)
+
+        LOG.info("The job '%s' has been held back by Longbow due to reaching "
+                 "queue slot limit, it will be submitted when a slot opens "
+                 "up.", item)
+
+        # We will set a flag so that we can inform the user that it is
+        # handled.
+        job["laststatus"] = "Waiting Submission"
+
+    return job["laststatus"]
+
+
+def _submitgroups(jobs, joblist=None):
+    """Group the jobs that can be submitted in one go, by resource.
+
+    These are jobs with batched submission switched on whose scheduler plugin
+    provides submit_many. Each resource gets one group (a tuple of job names).
+
+    """
+    groups = {}
+
+    if joblist is None:
+
+        joblist = jobset.joblist(jobs)
+
+    for item in joblist:
+
+        job = jobs[item]
+
+        if ("submit-batch" in job and job["submit-batch"] == "true" and
+                hasattr(getattr(schedulers, job["scheduler"].lower(), None),
+                        "submit_many")):
+
+            groups.setdefault(job["resource"], []).append(item)
+
+    return dict((resource, [tuple(groups[resource])]) for resource in groups)
+
+
+def _submitmany(jobs, group):
+    """Submit a group of jobs in one go.
+
+    Returns the outcome for each job keyed on job name. If the resource could
+    not be reached at all, nothing is returned and the jobs are submitted one
+    at a time instead.
+
+    """
+    joblist = [jobs[item] for item in group]
+    plugin = getattr(schedulers, joblist[0]["scheduler"].lower())
+
+    LOG.info("Submitting %s jobs to resource '%s' in one go.", len(group),
+             joblist[0]["resource"])
+
+    try:
+
+        errors = plugin.submit_many(joblist)
+
+    except exceptions.SSHError:
+
+        LOG.warning("Submitting the jobs on resource '%s' in one go - failed, "
+                    "trying each job on its own.", joblist[0]["resource"])
+
+        return {}
+
+    return dict(zip(group, errors))
+
+
+def _submitstaged(jobs, group, full, results):
+    """Submit a group of jobs whose files have just been staged.
+
+    The status of each job is added to results. Returns False once the
+    resource is full, so that no more of its jobs are staged for now.
+
+    """
+    outcomes = {}
+    resource = jobs[group[0]]["resource"]
+
+    if len(group) > 1 and resource not in full:
+
+        for batch in _submitgroups(jobs, group).get(resource, []):
+
+            outcomes.update(_submitmany(jobs, batch))
+
+    for item in group:
+
+        results[item] = _submitjob(jobs, item, full, outcomes)
+
+    return resource not in full
 
 
 def _testscheduler(job):
@@ -534,22 +869,23 @@ def _monitorinitialise(jobs):
     stageinterval = 0
 
     # Sort out some defaults.
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    for job in jobset.joblist(jobs):
 
         # This should always be present.
         if "laststatus" not in jobs[job]:
 
             jobs[job]["laststatus"] = ""
 
-        # Set the file transfer interval.
-        if stageinterval < int(jobs[job]["staging-frequency"]):
+        # Set the file transfer interval, jobs with adaptive staging keep
+        # their own.
+        if _adaptivestaging(jobs[job]) is False:
 
-            stageinterval = int(jobs[job]["staging-frequency"])
+            stageinterval = max(stageinterval, jobset.getint(
+                jobs[job], "staging-frequency"))
 
         # Attempt to grab a polling frequency that might have been set
-        if pollinterval < int(jobs[job]["polling-frequency"]):
-
-            pollinterval = int(jobs[job]["polling-frequency"])
+        pollinterval = max(pollinterval, jobset.getint(
+            jobs[job], "polling-frequency"))
 
     # If somehow the polling interval parameter is still zero, reduce the
     # polling to once every 5 minutes.
@@ -560,32 +896,101 @@ def _monitorinitialise(jobs):
     return stageinterval, pollinterval
 
 
-def _polljobs(jobs, save):
+def _pollintervals(jobs, pollinterval):
+    """Get the polling interval for each resource.
+
+    This is the longest polling-frequency of the jobs on the resource, or the
+    interval for all jobs where the jobs don't give one.
+
+    """
+    intervals = {}
+
+    for job in jobset.joblist(jobs):
+
+        resource = jobs[job]["resource"]
+
+        if "polling-frequency" in jobs[job]:
+
+            intervals[resource] = max(
+                intervals.get(resource, 0),
+                jobset.getint(jobs[job], "polling-frequency"))
+
+        else:
+
+            intervals.setdefault(resource, 0)
+
+    for resource in intervals:
+
+        if intervals[resource] == 0:
+
+            intervals[resource] = int(pollinterval)
+
+    return intervals
+
+
+def _schedule(events, deadlines, when, kind, key):
+    """Add something to be done to the monitor timetable.
+
+    If the same thing is already due sooner it is left as it is, otherwise
+    the earlier entry is left in the queue but ignored when it comes up.
+
+    """
+    if (kind, key) in deadlines and deadlines[(kind, key)] <= when:
+
+        return
+
+    deadlines[(kind, key)] = when
+    heapq.heappush(events, (when, kind, key))
+
+
+def _dueevents(events, deadlines, now):
+    """Take everything that is due off the monitor timetable."""
+    due = {"poll": [], "stage": []}
+
+    while len(events) > 0 and events[0][0] <= now:
+
+        when, kind, key = heapq.heappop(events)
+
+        if deadlines.get((kind, key)) == when:
+
+            del deadlines[(kind, key)]
+            due[kind].append(key)
+
+    return due
+
+
+def _polljobs(jobs, save, resources=None):
     """Poll the status of all jobs.
 
     Poll the status of all jobs that are not in error states, queued or
-    finihed.
+    finihed. Jobs are grouped by resource, so that scheduler plugins providing
+    a status_many method are queried once per resource rather than once per
+    job. Only the jobs on the given resources are polled if these are given.
 
     """
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    joblist = [a for a in jobset.joblist(jobs, resources=resources)
+               if _pollactive(jobs[a]) is True]
 
-        if (jobs[job]["laststatus"] != "Finished" and
-                jobs[job]["laststatus"] != "Complete" and
-                jobs[job]["laststatus"] != "Submit Error" and
-                jobs[job]["laststatus"] != "Waiting Submission"):
+    resources = parallel.groupbyresource(jobs, joblist)
 
-            # Get the job status.
-            try:
+    # Query each resource at the same time.
+    results = parallel.byresource(
+        jobs, dict((resource, [resource]) for resource in resources),
+        lambda resource: _pollresource(jobs, resources[resource]))
 
-                status = getattr(
-                    schedulers, jobs[job]["scheduler"].lower()).status(
-                        jobs[job])
+    for resource in resources:
 
-            except AttributeError:
+        states = results[resource]
 
-                raise exceptions.PluginattributeError(
-                    "Status method cannot be"
-                    "found in plugin '{0}'".format(jobs[job]["scheduler"]))
+        # A resource that can't be reached shouldn't stop the others being
+        # polled, its jobs keep their last status until next time.
+        if states is None:
+
+            continue
+
+        for job in resources[resource]:
+
+            status = states[jobs[job]["jobid"]]
 
             # If the last status is different then change the flag (stops
             # logfile getting flooded!)
@@ -598,8 +1003,8 @@ def _polljobs(jobs, save):
                 if status == "Finished":
 
                     qslots = jobs[job]["resource"] + "-" + "queue-slots"
-                    jobs["lbowconf"][qslots] = str(int(
-                        jobs["lbowconf"][qslots]) - 1)
+                    jobs["lbowconf"][qslots] = str(
+                        jobset.getint(jobs["lbowconf"], qslots) - 1)
 
                 LOG.info("Status of job '%s' with id '%s' is '%s'", job,
                          jobs[job]["jobid"], status)
@@ -607,44 +1012,362 @@ def _polljobs(jobs, save):
     return save
 
 
-def _stagejobfiles(jobs, save):
+def _adaptivepolling(job):
+    """Check if a job has adaptive polling switched on."""
+    return "polling-adaptive" in job and job["polling-adaptive"] == "true"
+
+
+def _pollactive(job):
+    """Check if a job is still to be polled."""
+    return job["laststatus"] not in ("Finished", "Complete", "Submit Error",
+                                     "Waiting Submission")
+
+
+def _pollingupdate(jobs, now, resources):
+    """Work out when each job with adaptive polling is next due.
+
+    Jobs waiting in the queue have the time between polls doubled each time
+    they are seen in the same state on a poll of their own. Jobs that are not
+    yet due, and have not changed state, keep their timetable. Running jobs
+    are polled more often as they near their maxtime, at half the time they
+    have left. Otherwise jobs are polled at their polling-frequency, all
+    within the bounds set for the job.
+
+    """
+    for job in jobset.joblist(jobs, resources=resources):
+
+        if (_adaptivepolling(jobs[job]) is False or
+                _pollactive(jobs[job]) is False):
+
+            continue
+
+        status = jobs[job]["laststatus"]
+        interval = jobset.getint(jobs[job], "polling-frequency")
+        lower = jobset.getint(jobs[job], "polling-frequency-min")
+        upper = jobset.getint(jobs[job], "polling-frequency-max")
+        last = POLLING.get(job)
+        count = 0
+        started = None
+
+        if last is not None and last["status"] == status:
+
+            # The resource may have been polled for another of its jobs.
+            if now < last["next"]:
+
+                continue
+
+            count = last["count"] + 1
+
+        if status == "Running" or status == "Subjob(s) running":
+
+            # Jobs picked up from a recovery file are taken to have started
+            # when they are first seen running.
+            started = now
+
+            if last is not None and last["started"] is not None:
+
+                started = last["started"]
+
+            try:
+
+                hours, minutes = jobs[job]["maxtime"].split(":")
+                remaining = started + int(hours) * 3600 + int(minutes) * 60
+
+                interval = min(interval, (remaining - now) / 2.0)
+
+            except ValueError:
+
+                pass
+
+        elif status in POLLQUEUED:
+
+            interval = interval * 2 ** min(count, POLLBACKOFF)
+
+        interval = min(max(interval, lower), upper)
+
+        POLLING[job] = {"count": count, "next": now + interval,
+                        "started": started, "status": status}
+
+        LOG.debug("Job '%s' will next be polled in %d seconds.", job,
+                  interval)
+
+
+def _pollnext(jobs, resource, now, interval):
+    """Find when a resource is next due to be polled.
+
+    This is when the first of its jobs is due, jobs without adaptive polling
+    being due at the polling interval for the resource. Jobs waiting to be
+    submitted don't count, as queue slots are only freed up by the others.
+
+    """
+    due = []
+
+    for job in jobset.joblist(jobs, resources=[resource]):
+
+        if _pollactive(jobs[job]) is False:
+
+            continue
+
+        if _adaptivepolling(jobs[job]) is True and job in POLLING:
+
+            due.append(POLLING[job]["next"])
+
+        else:
+
+            due.append(now + interval)
+
+    if len(due) == 0:
+
+        return now + interval
+
+    return min(due)
+
+
+def _pollresource(jobs, joblist):
+    """Get the status of a list of jobs that share a resource.
+
+    Returns a dictionary of job states keyed on job id, or None if the resource
+    could not be reached.
+
+    """
+    scheduler = jobs[joblist[0]]["scheduler"]
+    states = {}
+
+    try:
+
+        plugin = getattr(schedulers, scheduler.lower())
+
+        # One query for every job on this resource.
+        if hasattr(plugin, "status_many"):
+
+            states = plugin.status_many([jobs[job] for job in joblist])
+
+        # Plugins without the batched query get asked about each job.
+        else:
+
+            for job in joblist:
+
+                states[jobs[job]["jobid"]] = plugin.status(jobs[job])
+
+    except AttributeError:
+
+        raise exceptions.PluginattributeError(
+            "Status method cannot be"
+            "found in plugin '{0}'".format(scheduler))
+
+    except exceptions.SSHError:
+
+        LOG.warning("Could not poll the jobs on resource '%s', will try "
+                    "again later.", jobs[joblist[0]]["resource"])
+
+        return None
+
+    return states
+
+
+def _stagejobfiles(jobs, save, due=None):
     """Stage all files for each running job.
 
     Stage all files for each running job. For jobs that are finished, stage
     and remove them from the QUEUEINFO data and then change their status to
-    complete. This will stop future staging.
+    complete. This will stop future staging. Only the jobs in due are staged
+    if it is given, otherwise all jobs without adaptive staging.
 
     """
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    joblist = []
+    states = ["Running", "Subjob(s) running", "Finished"]
+
+    if due is None:
+
+        due = [a for a in jobset.joblist(jobs, states)
+               if _adaptivestaging(jobs[a]) is False]
+
+    for job in due:
 
         if (jobs[job]["laststatus"] == "Running" or
                 jobs[job]["laststatus"] == "Subjob(s) running" or
                 jobs[job]["laststatus"] == "Finished"):
 
-            staging.stage_downstream(jobs[job])
+            joblist.append(job)
 
-            if jobs[job]["laststatus"] == "Finished":
+    # Transfer from each resource at the same time.
+    failed = staging.stage_downstream_many(jobs, joblist)
 
-                jobs[job]["laststatus"] = "Complete"
+    for job in joblist:
 
-                save = True
+        # A failed transfer is tried again at the next staging interval.
+        if job not in failed and jobs[job]["laststatus"] == "Finished":
+
+            jobs[job]["laststatus"] = "Complete"
+
+            save = True
 
     return save
 
 
-def _checkwaitingjobs(jobs, save):
-    """Check if any jobs marked as "Waiting Submission" can be submitted."""
-    for job in [a for a in jobs if "lbowconf" not in a]:
+def _adaptivestaging(job):
+    """Check if a job has adaptive staging switched on."""
+    return "staging-adaptive" in job and job["staging-adaptive"] == "true"
+
+
+def _stagingdue(jobs, now, joblist=None):
+    """Find the jobs with adaptive staging that are due to be staged.
+
+    Jobs are due when they are first seen running, when their next staging
+    time has passed, or as soon as they have finished. Only the jobs in
+    joblist are looked at if it is given.
+
+    """
+    due = []
+
+    if joblist is None:
+
+        joblist = jobset.joblist(
+            jobs, ["Running", "Subjob(s) running", "Finished"])
+
+    for job in joblist:
+
+        if _adaptivestaging(jobs[job]) is False:
+
+            continue
+
+        # Finished jobs that failed to stage wait before trying again.
+        if jobs[job]["laststatus"] == "Finished":
+
+            if (job not in STAGING or STAGING[job]["finished"] is False or
+                    now >= STAGING[job]["next"]):
+
+                due.append(job)
+
+        elif (jobs[job]["laststatus"] == "Running" or
+              jobs[job]["laststatus"] == "Subjob(s) running"):
+
+            if job not in STAGING or now >= STAGING[job]["next"]:
+
+                due.append(job)
+
+    return due
+
+
+def _stagingupdate(jobs, due, now):
+    """Work out when each staged job with adaptive staging is next due.
+
+    The rate at which the local copy of a job has been growing is used to
+    pick an interval over which about STAGINGBYTES of new output would build
+    up, within the bounds set for the job. Jobs seen for the first time start
+    out at their staging-frequency.
+
+    """
+    for job in due:
+
+        size = _localbytes(jobs[job]["localworkdir"])
+        lower = jobset.getint(jobs[job], "staging-frequency-min")
+        upper = jobset.getint(jobs[job], "staging-frequency-max")
+
+        if job not in STAGING:
+
+            interval = jobset.getint(jobs[job], "staging-frequency")
+            rate = None
+
+        else:
+
+            last = STAGING[job]
+            rate = max(size - last["bytes"], 0) / max(now - last["time"], 1.0)
+
+            # Smooth the rate so a single burst doesn't swing it too far.
+            if last["rate"] is not None:
+
+                rate = 0.5 * (rate + last["rate"])
+
+            if rate > 0:
+
+                interval = STAGINGBYTES / rate
+
+            else:
+
+                interval = upper
+
+        interval = min(max(interval, lower), upper)
+        finished = jobs[job]["laststatus"] == "Finished"
+
+        if finished is True:
+
+            interval = lower
+
+        STAGING[job] = {"bytes": size, "finished": finished,
+                        "next": now + interval, "rate": rate, "time": now}
+
+        LOG.debug("Job '%s' will next be staged in %d seconds.", job,
+                  interval)
+
+
+def _stagingschedule(jobs, events, deadlines, now, resources):
+    """Set when the jobs with adaptive staging on some resources are staged.
+
+    Called once the resources have been polled, so that jobs that have just
+    started running or have just finished are staged straight away. Other
+    running jobs keep the time they were given at their last staging.
+
+    """
+    joblist = [a for a in jobset.joblist(jobs, resources=resources)
+               if _adaptivestaging(jobs[a]) is True]
+
+    due = _stagingdue(jobs, now, joblist)
+
+    for job in joblist:
+
+        if job in due:
+
+            _schedule(events, deadlines, now, "stage", job)
+
+        elif job in STAGING and jobs[job]["laststatus"] != "Complete":
+
+            _schedule(events, deadlines, STAGING[job]["next"], "stage", job)
+
+
+def _localbytes(localdir):
+    """Add up the size of the files in a local directory."""
+    size = 0
+
+    for root, _, files in os.walk(os.path.expanduser(localdir)):
+
+        for name in files:
+
+            path = os.path.join(root, name)
+
+            if os.path.isfile(path):
+
+                size = size + os.path.getsize(path)
+
+    return size
+
+
+def _checkwaitingjobs(jobs, save, resources=None):
+    """Check if any jobs marked as "Waiting Submission" can be submitted.
+
+    Only the jobs on the given resources are checked if these are given.
+
+    """
+    for job in jobset.joblist(jobs, ["Waiting Submission"], resources):
 
         # Check if we can submit any further jobs.
-        resource = jobs[job]["resource"]
-        if (jobs[job]["laststatus"] == "Waiting Submission" and
-                int(jobs["lbowconf"][resource + "-" + "queue-slots"]) <
-                int(jobs["lbowconf"][resource + "-" + "queue-max"])):
+        qslots = jobs[job]["resource"] + "-" + "queue-slots"
+        qmax = jobs[job]["resource"] + "-" + "queue-max"
+
+        if (jobset.getint(jobs["lbowconf"], qslots) <
+                jobset.getint(jobs["lbowconf"], qmax)):
 
             # Try and submit this job.
             try:
 
+                # Stage the files that were put off until there was a slot.
+                if ("upload-deferred" in jobs[job] and
+                        jobs[job]["upload-deferred"] == "true"):
+
+                    staging.stage_upstream(jobs, [job])
+
+                    jobs[job]["upload-deferred"] = "false"
+
                 getattr(schedulers,
                         jobs[job]["scheduler"].lower()).submit(jobs[job])
 
@@ -654,8 +1377,8 @@ def _checkwaitingjobs(jobs, save):
                          jobs[job]["jobid"])
 
                 # Increment the queue counter by one (used to count the slots).
-                jobs["lbowconf"][resource + "-" + "queue-slots"] = str(int(
-                    jobs["lbowconf"][resource + "-" + "queue-slots"]) + 1)
+                jobs["lbowconf"][qslots] = str(
+                    jobset.getint(jobs["lbowconf"], qslots) + 1)
 
                 save = True
 
@@ -667,7 +1390,8 @@ def _checkwaitingjobs(jobs, save):
                     .format(jobs[job]["scheduler"]))
 
             # Some sort of error in submitting the job.
-            except exceptions.JobsubmitError as err:
+            except (exceptions.JobsubmitError,
+                    exceptions.StagingError) as err:
 
                 LOG.error(err)
 
@@ -691,35 +1415,40 @@ def _checkcomplete(jobs):
     # Initialise variables
     allcomplete = False
     allfinished = False
-    complete = []
-    error = []
-    finished = []
-
-    for job in [a for a in jobs if "lbowconf" not in a]:
+    total = jobset.count(jobs)
+    error = jobset.count(jobs, ["Submit Error"])
+    complete = jobset.count(jobs, ["Complete"])
+    finished = jobset.count(jobs, ["Finished"])
 
-        if jobs[job]["laststatus"] != "Submit Error":
+    # Jobs with submit errors don't count towards the others.
+    if complete + error == total and complete != 0:
 
-            complete.append(jobs[job]["laststatus"])
+        allcomplete = True
 
-        if (jobs[job]["laststatus"] != "Submit Error" and
-                jobs[job]["laststatus"] != "Complete"):
+    if error == total:
 
-            finished.append(jobs[job]["laststatus"])
+        allcomplete = True
 
-        if jobs[job]["laststatus"] == "Submit Error":
+    if finished + complete + error == total and finished != 0:
 
-            error.append(jobs[job]["laststatus"])
+        allfinished = True
 
-    if all(state == "Complete" for state in complete) and len(complete) != 0:
+    return allcomplete, allfinished
 
-        allcomplete = True
 
-    if len(error) == len([a for a in jobs if "lbowconf" not in a]):
+def _transfersummary(jobs):
+    """Log the jobs that spent the longest time staging files."""
+    staged = [a for a in jobset.joblist(jobs)
+              if "transfer-seconds" in jobs[a]]
 
-        allcomplete = True
+    staged.sort(key=lambda a: float(jobs[a]["transfer-seconds"]),
+                reverse=True)
 
-    if all(state == "Finished" for state in finished) and len(finished) != 0:
+    for job in staged[:TRANSFERSUMMARY]:
 
-        allfinished = True
+        seconds = float(jobs[job]["transfer-seconds"])
+        size = float(jobs[job]["transfer-bytes"]) / 1048576.0
 
-    return allcomplete, allfinished
+        LOG.info("Staging for job '%s' - %s files - %.1f MB - %.1f seconds - "
+                 "%.2f MB/s.", job, jobs[job]["transfer-files"], size,
+                 seconds, size / max(seconds, 0.001))
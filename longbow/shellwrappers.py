@@ -44,7 +44,7 @@ testconnections(jobs)
     badly configured hosts, networking problems, or even system maintenance/
     downtime on the HPC host.
 
-sendtoshell(cmd)
+sendtoshell(cmd, timeout=None, stream=None)
     This method is responsible for handing off commands to the Unix shell, it
     makes use of the subprocess library from the Python standard library.
 
@@ -52,10 +52,19 @@ sendtossh(job, args)
     This method constructs a string containing commands to be executed via SSH.
     This string is then handed off to the sendtoshell() method for execution.
 
-sendtorsync(job, src, dst, includemask, excludemask)
+sendtosshmany(job, commands)
+    This method runs several lots of commands on a remote host in one script
+    sent over a single SSH call, and returns the output of each lot separately.
+
+sendtorsync(job, src, dst, includemask, excludemask, options=None)
     This method constructs a string that forms an rsync command, this string is
     then handed off to the sendtoshell() method for execution.
 
+sendtotar(job, localdir, remotedir, direction, includemask, excludemask,
+          maxsize=None, options=None)
+    This method constructs a compressed tar stream piped through a single SSH
+    channel, this is then handed off to the sendtoshell() method for execution.
+
 localcopy(src, dst)
     This method is for copying a file/directory between two local paths, this
     method relies on the Python standard library to perform operations.
@@ -77,29 +86,134 @@ remotedelete(job)
     This method is for deleting a file/directory from a path on a remote host,
     this is done via passing a delete command to the sendtossh() method.
 
+remotedelete_many(jobs, background=False)
+    This method is for deleting the directories of many jobs on one remote
+    host with a single remote script, which reports back on each directory.
+
 remotelist(job)
     This method is for listing the contents of a directory on a remote host,
     this is done via passing a list command to the sendtoshell() method.
 
-upload(job)
+calibrate(job)
+    This method will time transfers to the remote host of a job with each of
+    the compression profiles that rsync supports at both ends, and return the
+    quickest.
+
+connectionsummary()
+    This method will log the retry, timeout and failure counts for connections
+    to each remote host made during the session, along with the amount of data
+    transferred and the rate it moved at.
+
+closeconnections()
+    This method will shut down the shared SSH connections that have been opened
+    to each remote host during the session.
+
+upload(job, options=None)
     This method is for uploading files to a remote host, this method is
     responsible for specifying the direction that the transfer takes place.
 
-download(job)
+download(job, options=None)
     This method is for downloading files from a remote host, this method is
     responsible for specifying the direction that the transfer takes place.
+
+uploadmany(joblist, options=None)
+    This method is for uploading the files for several jobs on the same remote
+    host in a single rsync transfer.
+
+downloadmany(joblist)
+    This method is for downloading the files for several jobs on the same
+    remote host in a single rsync transfer.
+
+quotepath(path)
+    This method quotes a path for use in a remote command, leaving a leading ~
+    to be expanded by the remote shell.
 """
 
+import collections
+import hashlib
 import os
+import select
 import shutil
 import subprocess
 import logging
+import random
+import re
+import tempfile
+import threading
 import time
+import uuid
+import zlib
+
+try:
+
+    from shlex import quote
+
+except ImportError:
+
+    from pipes import quote
 
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
+import longbow.parallel as parallel
 
 LOG = logging.getLogger("longbow.shellwrappers")
 
+# Shared SSH connections (OpenSSH ControlMaster), the control socket path is
+# stored against the (user, host, port) of each remote resource.
+SSHMASTERS = {}
+
+# Long lived remote shells (ssh host bash -s) that commands are written to,
+# stored against the (user, host, port) of each remote resource.
+SSHSHELLS = {}
+
+# Circuit breakers for each remote resource, stored against the (user, host,
+# port). Each holds the count of back to back connection failures and the time
+# at which the breaker was opened (None whilst closed).
+CIRCUITS = {}
+
+# Counts of calls, retries, timeouts and failures for each remote host, these
+# are reported at the end of a session.
+STATS = {}
+
+# Appended to stderr of commands that were killed for taking too long.
+TIMEOUTMSG = "Longbow: command timed out and was killed."
+
+# Guards the module level dictionaries above, as jobs on several resources can
+# be worked on at once (see the parallel module).
+SSHLOCK = threading.Lock()
+
+# Locks that allow only one thread at a time to start or check the shared
+# connection and remote shell for a host, stored against (user, host, port).
+HOSTLOCKS = {}
+
+# rsync exit codes that mean the remote host could not be reached (socket IO,
+# protocol stream, timeouts and ssh failures), as opposed to file problems.
+RSYNCCONNECTION = [10, 12, 30, 35, 255]
+
+# With the tarstream transfer mode, files of at least this size (in bytes) are
+# uploaded with rsync, so that they are only sent again if they change.
+TARMAXSIZE = 1048576
+
+# Bytes at the end of the local copy of an append only file that are checked
+# against the remote file, before its new data is added on.
+APPENDOVERLAP = 65536
+
+# The compression profiles (algorithm and level) tried by calibrate(), along
+# with the amount of data sent with each.
+PROFILES = [("none", ""), ("lz4", ""), ("zstd", "1"), ("zstd", "3"),
+            ("zlib", "1"), ("zlib", "6")]
+CALIBRATESIZE = 8388608
+
+# Lines kept from the end of streamed output, and how often (in seconds) the
+# progress of an rsync transfer is logged.
+STREAMTAIL = 20
+PROGRESSINTERVAL = 10
+
+# The version and compression algorithms of the local rsync, and whether files
+# with a given extension were found not to compress (keyed on extension).
+RSYNCINFO = {}
+EXTENSIONS = {}
+
 
 def checkconnections(jobs):
     """Test that connections to HPC machines can be established.
@@ -124,50 +238,19 @@ def checkconnections(jobs):
     """
     LOG.info("Performing basic connection and environment tests for all "
              "machines referenced in jobs.")
-    checked = []
 
     # Test all of the computers listed in jobs in the job configuration
     # file, there is no need to check all the ones listed in host
-    # configuration each time if they are not used.
-    for item in [a for a in jobs if "lbowconf" not in a]:
-
-        # Have we checked this connection already?
-        if jobs[item]["resource"] not in checked:
-
-            # Make sure we don't check this again.
-            checked.extend([jobs[item]["resource"]])
-
-            LOG.debug("Testing connection to '%s'", jobs[item]["resource"])
-
-            # Test that the connection works.
-            sendtossh(jobs[item], ["ls"])
-
-            LOG.info("Test connection to '%s' - passed",
-                     jobs[item]["resource"])
-
-            # Test that basic enviroment looks ok.
-            try:
-
-                sendtossh(jobs[item], ["module avail"])
-
-            except exceptions.SSHError as err:
-
-                # If the module command is not found, then it is highly likely
-                # that the non-login shells do not source the /etc/profile in
-                # which the system loads a lot of the environment.
-                if ("bash: module: command not found" in err.stdout or
-                        "bash: module: command not found" in err.stderr):
+    # configuration each time if they are not used. Each resource is checked
+    # at the same time.
+    resources = parallel.groupbyresource(jobs)
 
-                    # Go over all jobs referencing this machine and switch on
-                    # the environment fix.
-                    for job in [a for a in jobs if "lbowconf" not in a]:
+    parallel.byresource(
+        jobs, dict((resource, [resource]) for resource in resources),
+        lambda resource: _checkconnection(jobs, resources[resource]))
 
-                        if jobs[job]["resource"] == jobs[item]["resource"]:
 
-                            jobs[job]["env-fix"] = "true"
-
-
-def sendtoshell(cmd):
+def sendtoshell(cmd, timeout=None, stream=None):
     """Send assembled commands to the Unix shell.
 
     This method is responsible for handing off commands to the Unix shell, it
@@ -177,6 +260,18 @@ def sendtoshell(cmd):
 
     cmd (string) - A fully qualified Unix command.
 
+    Optional arguments are:
+
+    timeout (int) - The number of seconds the command is allowed to run for.
+                    Commands that run over are killed and given the exit code
+                    255, the same as a dropped SSH connection, so that they
+                    will be retried.
+
+    stream (function) - Called with each line of the standard output as it
+                        arrives, lines ended by a carriage return (such as
+                        progress updates) included. Only the last few lines
+                        are kept and returned, rather than all of the output.
+
     Return parameters are:
 
     stdout (string) - Contains the output from the standard output of the Unix
@@ -191,12 +286,51 @@ def sendtoshell(cmd):
     """
     LOG.debug("Sending the following to subprocess '%s'", cmd)
 
-    handle = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE)
+    errfile = None
+
+    if stream is None:
+
+        handle = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+
+    else:
+
+        # Standard error goes to a file whilst standard output is read, so
+        # that neither pipe can fill up and stall the command.
+        errfile = tempfile.TemporaryFile()
+
+        handle = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=errfile)
+
+    expired = []
+    timer = None
 
-    stdout, stderr = handle.communicate()
+    # Kill commands that hang (such as on a host that has stopped responding)
+    # rather than waiting on them forever.
+    if timeout is not None:
+
+        timer = threading.Timer(float(timeout), _expire, [handle, expired])
+        timer.start()
+
+    if stream is None:
+
+        stdout, stderr = handle.communicate()
+
+    else:
+
+        stdout = _readstream(handle, stream)
+        handle.wait()
+        errfile.seek(0)
+        stderr = errfile.read()
+        errfile.close()
+
+    if timer is not None:
+
+        timer.cancel()
 
     # Format stdout to utf-8 for python 3, python 2 should be untouched.
     if not isinstance(stdout, str):
@@ -211,6 +345,13 @@ def sendtoshell(cmd):
     # Grab the return code.
     errorstate = handle.returncode
 
+    if len(expired) > 0:
+
+        LOG.debug("Command '%s' timed out after %s seconds.", cmd, timeout)
+
+        stderr = stderr + TIMEOUTMSG
+        errorstate = 255
+
     return stdout, stderr, errorstate
 
 
@@ -235,62 +376,180 @@ def sendtossh(job, args):
                                   output, standard error and the exit code.
 
     """
-    # basic ssh command.
-    cmd = ["ssh", "-p " + job["port"], job["user"] + "@" + job["host"]]
-
-    # Source the /etc/profile on machines where problems have been detected
-    # with the environment.
-    if job["env-fix"] == "true":
+    cmd = _sshcommand(job, args)
+    policy = _retrypolicy(job)
+    timeout = policy["ssh-timeout"] or None
 
-        cmd.append("source /etc/profile;")
-
-    # add the commands to be sent to ssh.
-    cmd.extend(args)
+    # Don't keep a dead host tying up the session.
+    _breakercheck(job, policy, exceptions.SSHError)
+    _count(job, "calls")
 
     i = 0
 
-    # This loop is essentially so we can do 3 retries on commands that fail,
+    # This loop is essentially so we can retry commands that fail to connect,
     # this is to catch when things go wrong over SSH like dropped connections,
-    # issues with latency etc.
-    while i is not 3:
+    # hung hosts, issues with latency etc.
+    while True:
 
-        # Send to ssh.
-        shellout = sendtoshell(cmd)
+        # Send down the persistent remote shell if there is one, otherwise
+        # send to ssh.
+        shellout = _shellsend(job, args, timeout)
+
+        if shellout is None:
+
+            shellout = sendtoshell(cmd, timeout=timeout)
 
         errorstate = shellout[2]
 
         # If no error exit loop, if errorcode is not 0 raise exception unless
         # code is 255
-        if errorstate is 0:
+        if errorstate == 0:
 
             break
 
-        elif errorstate is 255:
+        elif errorstate == 255:
 
             i = i + 1
 
+            if TIMEOUTMSG in shellout[1]:
+
+                _count(job, "timeouts")
+
+            # The shared connection might be the thing that has broken.
+            _sshmastercheck(job)
+
         else:
 
+            # The host answered, so the connection itself is fine.
+            _breakerupdate(job, policy, False)
+
             raise exceptions.SSHError(
                 "SSH failed, make sure a normal terminal can connect to SSH "
                 "to be sure there are no connection issues.", shellout)
 
-        # If number of retries hits 3 then give up.
-        if i is 3:
+        # If number of retries is used up then give up.
+        if i >= policy["retry-attempts"]:
+
+            _count(job, "failures")
+            _breakerupdate(job, policy, True)
 
             raise exceptions.SSHError(
                 "SSH failed, make sure a normal terminal can connect to SSH "
                 "to be sure there are no connection issues.", shellout)
 
-        LOG.debug("Retry SSH after 10 second wait.")
+        delay = _retrydelay(policy, i)
+        _count(job, "retries")
+
+        LOG.debug("Retry SSH after %.1f second wait.", delay)
 
-        # Wait 10 seconds to see if problem goes away before trying again.
-        time.sleep(10)
+        # Wait to see if problem goes away before trying again.
+        time.sleep(delay)
+
+    _breakerupdate(job, policy, False)
 
     return shellout
 
 
-def sendtorsync(job, src, dst, includemask, excludemask):
+def sendtosshmany(job, commands):
+    """Run several lots of commands on a remote host in one SSH call.
+
+    This method is for running commands that would otherwise each need an SSH
+    call of their own, such as submitting many jobs on the same resource. Each
+    lot of commands is run in a subshell by one remote script, which writes
+    the standard output, standard error and exit code of each lot between
+    marker lines so that they can be split apart again.
+
+    Required arguments are:
+
+    job (dictionary) - A single job dictionary, this is often simply passed in
+                       as a subset of the main jobs dictionary.
+
+    commands (list) - A list of lists of commands, each as would be given to
+                      the sendtossh() method.
+
+    Return parameters are:
+
+    shellouts (list) - The standard output, standard error and exit code of
+                       each lot of commands, in the order they were given. Lots
+                       that the script did not get to have the exit code 255.
+
+    The commands (such as submitting jobs) need not be safe to run twice, so
+    unlike sendtossh() there is no timeout. If the connection drops part way
+    through, only the lots that the script did not report on are sent again.
+
+    """
+    marker = "LONGBOW-" + uuid.uuid4().hex
+    shellouts = [("", "Longbow: no output for these commands.", 255)
+                 for _ in commands]
+    pending = list(range(len(commands)))
+    policy = _retrypolicy(job)
+
+    _breakercheck(job, policy, exceptions.SSHError)
+    _count(job, "calls")
+
+    i = 0
+
+    while True:
+
+        args = ["sh -c " + quote(_batchscript(marker, commands, pending))]
+        shellout = _shellsend(job, args)
+
+        if shellout is None:
+
+            shellout = sendtoshell(_sshcommand(job, args))
+
+        parts = re.split(r"\n" + marker + r" (\d+) (\d+)\n", shellout[0])
+
+        for j in range(1, len(parts) - 2, 3):
+
+            stdout, _, stderr = parts[j + 2].partition(
+                "\n" + marker + "-stderr\n")
+
+            shellouts[int(parts[j])] = (stdout, stderr, int(parts[j + 1]))
+
+            if int(parts[j]) in pending:
+
+                pending.remove(int(parts[j]))
+
+        if shellout[2] == 0 or len(pending) == 0:
+
+            break
+
+        elif shellout[2] != 255:
+
+            _breakerupdate(job, policy, False)
+
+            raise exceptions.SSHError(
+                "SSH failed, make sure a normal terminal can connect to SSH "
+                "to be sure there are no connection issues.", shellout)
+
+        i = i + 1
+
+        _sshmastercheck(job)
+
+        if i >= policy["retry-attempts"]:
+
+            _count(job, "failures")
+            _breakerupdate(job, policy, True)
+
+            raise exceptions.SSHError(
+                "SSH failed, make sure a normal terminal can connect to SSH "
+                "to be sure there are no connection issues.", shellout)
+
+        delay = _retrydelay(policy, i)
+        _count(job, "retries")
+
+        LOG.debug("Retry the %d lot/s of commands that did not run after "
+                  "%.1f second wait.", len(pending), delay)
+
+        time.sleep(delay)
+
+    _breakerupdate(job, policy, False)
+
+    return shellouts
+
+
+def sendtorsync(job, src, dst, includemask, excludemask, options=None):
     """Construct Rsync commands and hand them off to the shell.
 
     This method constructs a string that forms an rsync command, this string is
@@ -318,85 +577,140 @@ def sendtorsync(job, src, dst, includemask, excludemask):
                            should be excluded from rsync transfer, this is
                            useful for not transfering large unwanted files.
 
+    Optional arguments are:
+
+    options (list) - Extra options to pass to rsync, these are placed before
+                     any file masks.
+
+    Return parameters are:
+
+    transfer (dictionary) - The bytes sent over the wire, the number of files
+                            transferred and the seconds the transfer took, as
+                            reported by rsync. These are also added to the
+                            totals for the job and its host.
+
     """
     # Initialise variables.
-    include = []
-    exclude = []
-    port = job["port"]
+    rsh = " ".join(["ssh"] + _sshmultiplex(job) + ["-p", job["port"]])
+    policy = _retrypolicy(job)
 
-    # Figure out if we are using masks to specify files.
-    if excludemask is not "" and includemask is "":
+    # Only sample the files if they are on this machine.
+    if job["user"] + "@" + job["host"] + ":" in src:
 
-        # Exclude masks are a comma separated list.
-        for mask in excludemask.split(","):
+        compress = _compressargs(job)
 
-            mask = mask.replace(" ", "")
-            exclude.append("--exclude")
-            exclude.append(mask)
+    else:
 
-        cmd = ["rsync", "-azP"]
-        cmd.extend(exclude)
-        cmd.extend(["-e", "ssh -p " + port, src, dst])
+        compress = _compressargs(job, src)
 
-    elif excludemask is not "" and includemask is not "":
+    # Compression is switched on in the usual way, anything else about it is
+    # given as options.
+    if len(compress) > 0 and compress[0] == "-z":
 
-        # Exclude masks are a comma separated list.
-        for mask in excludemask.split(","):
+        cmd = ["rsync", "-azP"] + compress[1:]
 
-            mask = mask.replace(" ", "")
-            exclude.append("--exclude")
-            exclude.append(mask)
+    else:
 
-        # Exclude masks are a comma separated list.
-        for mask in includemask.split(","):
+        cmd = ["rsync", "-aP"] + compress
 
-            mask = mask.replace(" ", "")
-            include.append("--include")
-            include.append(mask)
+    # Have rsync give up on transfers that stall.
+    if policy["ssh-timeout"] > 0:
 
-        cmd = ["rsync", "-azP"]
-        cmd.extend(include)
-        cmd.extend(exclude)
-        cmd.extend(["-e", "ssh -p " + port, src, dst])
+        cmd.append("--timeout=" + str(policy["ssh-timeout"]))
 
-    else:
+    # Have rsync report what it transferred.
+    cmd.append("--stats")
 
-        # Just normal rsync
-        cmd = ["rsync", "-azP", "-e", "ssh -p " + port, src, dst]
+    if options is not None:
 
-    i = 0
+        cmd.extend(options)
 
-    # This loop is essentially so we can do 3 retries on commands that fail,
-    # this is to catch when things go wrong over SSH like dropped connections,
-    # issues with latency etc.
-    while i is not 3:
+    # The masks go to rsync in a file of filter rules, rather than on the
+    # command-line where they can grow past the limits for its length.
+    rules = _filterrules(includemask, excludemask)
+    tmpdir = None
 
-        # Send to SSH.
-        shellout = sendtoshell(cmd)
+    if len(rules) > 0:
 
-        errorstate = shellout[2]
+        tmpdir = tempfile.mkdtemp(prefix="longbow-")
 
-        # If no error exit loop, if errorcode is not 0 raise exception unless
-        # code is 255
-        if errorstate is 0:
+        with open(os.path.join(tmpdir, "filter"), "w") as filterfile:
 
-            break
+            filterfile.write("".join([a + "\n" for a in rules]))
 
-        else:
+        cmd.append("--filter=merge " + os.path.join(tmpdir, "filter"))
 
-            i = i + 1
+    cmd.extend(["-e", rsh, src, dst])
 
-        # If number of retries hits 3 then give up.
-        if i is 3:
+    try:
 
-            raise exceptions.RsyncError(
-                "rsync failed, make sure a normal terminal can connect to "
-                "rsync to be sure there are no connection issues.", shellout)
+        return _sendrsync(job, policy, cmd)
+
+    finally:
+
+        if tmpdir is not None:
+
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def sendtotar(job, localdir, remotedir, direction, includemask, excludemask,
+              maxsize=None, options=None):
+    """Construct a tar stream over SSH and hand it off to the shell.
+
+    This method constructs a shell pipeline that packs files into a compressed
+    tar stream at one end, sends it through a single SSH channel and unpacks it
+    at the other. This avoids the per file overhead of rsync for directories
+    with many small files. The pipeline is handed off to the sendtoshell()
+    method for execution.
+
+    Required arguments are:
+
+    job (dictionary) - A single job dictionary, this is often simply passed in
+                       as a subset of the main jobs dictionary.
+
+    localdir (string) - The directory on the local machine.
 
-        LOG.debug("Retry rsync after 10 second wait.")
+    remotedir (string) - The directory on the remote host.
 
-        # Wait 10 seconds to see if problem goes away before trying again.
-        time.sleep(10)
+    direction (string) - Either "upload" or "download".
+
+    includemask (string) - This is a string that should contain a comma
+                           separated list of files for transfer.
+
+    excludemask (string) - This is a string that should specify which files
+                           should be excluded from transfer, masks are used in
+                           the same way as for the sendtorsync() method.
+
+    Optional arguments are:
+
+    maxsize (int) - Only files smaller than this number of bytes are sent.
+
+    options (list) - Extra rsync style options, only "--exclude" options are
+                     used (these are placed before any file masks).
+
+    """
+    ssh = _sshpipe(job)
+
+    files = ("find . " + " ".join(
+        [quote(a) for a in _tarselect(includemask, excludemask, maxsize,
+                                      options)]) +
+             " | tar -czf - -T -")
+
+    if direction == "upload":
+
+        cmd = ("cd " + quotepath(localdir) + " && " + files + " | " + ssh +
+               " " + quote("mkdir -p " + quotepath(remotedir) +
+                           " && tar -xzf - -C " + quotepath(remotedir)))
+
+    else:
+
+        cmd = ("mkdir -p " + quotepath(localdir) + " && " + ssh + " " +
+               quote("cd " + quotepath(remotedir) + " && " + files) +
+               " | tar -xzf - -C " + quotepath(localdir))
+
+    _sendpipeline(job, cmd, "tar stream transfer failed, make sure a normal "
+                  "terminal can connect to SSH and that tar is available on "
+                  "the remote host.")
 
 
 def localcopy(src, dst):
@@ -648,6 +962,88 @@ def remotedelete(job):
             job["destdir"])
 
 
+def remotedelete_many(jobs, background=False):
+    """Delete the directories of many jobs on a remote HPC machine.
+
+    This method is for deleting the job directories of many jobs that are all
+    on the same remote host. A single remote script is passed to the
+    sendtossh() method, this checks that each directory exists and removes it,
+    then reports back what happened to each one.
+
+    Required arguments are:
+
+    jobs (list) - A list of job dictionaries, these must all be on the same
+                  remote host.
+
+    Optional arguments are:
+
+    background (boolean) - Leave the directories being removed in the
+                           background on the remote host, so that this returns
+                           as soon as they have been found.
+
+    Return parameters are:
+
+    results (list) - For each job in turn, "deleted" if its directory was
+                     removed (or is being removed in the background), "missing"
+                     if it does not exist or "failed" if it could not be
+                     removed.
+
+    """
+    script = ["set --\n"]
+
+    for i, job in enumerate(jobs):
+
+        # Are paths absolute.
+        if os.path.isabs(job["destdir"]) is False and \
+                job["destdir"][0] != "~":
+
+            raise exceptions.AbsolutepathError(
+                "The source path is not absolute ", job["destdir"])
+
+        path = quotepath(job["destdir"])
+
+        if background is True:
+
+            found = 'set -- "$@" ' + path + "; echo '" + str(i) + " deleted'"
+
+        else:
+
+            found = ("if rm -rf " + path + "; then echo '" + str(i) +
+                     " deleted'; else echo '" + str(i) + " failed'; fi")
+
+        script.append("if [ -d " + path + " ]; then " + found +
+                      "; else echo '" + str(i) + " missing'; fi\n")
+
+    if background is True:
+
+        script.append('[ $# -eq 0 ] || nohup rm -rf "$@" >/dev/null 2>&1 &\n')
+
+    LOG.debug("Deleting '%s'", "', '".join(job["destdir"] for job in jobs))
+
+    # Send to subprocess.
+    try:
+
+        shellout = sendtossh(jobs[0], ["sh -c " + quote("".join(script))])
+
+    except exceptions.SSHError:
+
+        raise exceptions.RemotedeleteError(
+            "Could not delete the directories on remote host",
+            ", ".join(job["destdir"] for job in jobs))
+
+    results = ["failed" for _ in jobs]
+
+    for line in shellout[0].splitlines():
+
+        line = line.split()
+
+        if len(line) == 2 and line[0].isdigit() and int(line[0]) < len(jobs):
+
+            results[int(line[0])] = line[1]
+
+    return results
+
+
 def remotelist(job):
     """List the contents of a directory on a remote HPC machine.
 
@@ -688,72 +1084,274 @@ def remotelist(job):
     return filelist
 
 
-def upload(job):
-    """Upload a file/s to a remote machine.
+def calibrate(job):
+    """Find the quickest compression profile for transfers to a host.
 
-    This method is for uploading files to a remote host, this method is
-    responsible for specifying the direction that the transfer takes place.
+    This method will time the upload of a test directory, holding a mix of
+    text and incompressible data, to the remote host of a job with each of the
+    compression profiles (algorithm and level) that rsync supports at both
+    ends. The test directory is removed from the remote host afterwards.
 
     Required arguments are:
 
     job (dictionary) - A single job dictionary, this is often simply passed in
                        as a subset of the main jobs dictionary.
 
-    """
-    # Are paths absolute.
-    if os.path.isabs(job["localworkdir"]) is False and \
-            job["localworkdir"][0] != "~":
+    Return parameters are:
 
-        raise exceptions.AbsolutepathError(
-            "The source path is not absolute", job["localworkdir"])
+    best (tuple) - The quickest profile as (compression, compression-level).
 
-    # We want to transfer whole directory.
-    if job["localworkdir"].endswith("/") is not True:
+    timings (dictionary) - The seconds taken with each profile tried.
 
-        job["localworkdir"] = job["localworkdir"] + "/"
+    """
+    shellout = sendtossh(job, ["rsync --version"])
+    remote = _rsyncparse(shellout[0])
+    local = _rsyncinfo()
+    choices = [a for a in local["compress"] if a in remote["compress"]]
+    tmpdir = tempfile.mkdtemp(prefix="longbow-")
+    dst = (job["user"] + "@" + job["host"] + ":" +
+           job["remoteworkdir"].rstrip("/") + "/.longbow-calibrate/")
+    timings = {}
 
-    if os.path.isabs(job["destdir"]) is False and job["destdir"][0] != "~":
+    try:
 
-        raise exceptions.AbsolutepathError(
-            "The destination path is not absolute", job["destdir"])
+        with open(os.path.join(tmpdir, "text"), "w") as textfile:
 
-    dst = (job["user"] + "@" + job["host"] + ":" + job["destdir"])
+            line = "Longbow calibration data, line {0} of the test file.\n"
+            i = 0
 
-    LOG.debug("Copying '%s' to '%s'", job["localworkdir"], dst)
+            while textfile.tell() < CALIBRATESIZE // 2:
 
-    # Send command to subprocess.
-    try:
+                textfile.write(line.format(i))
+                i = i + 1
 
-        sendtorsync(job, job["localworkdir"], dst, job["upload-include"],
-                    job["upload-exclude"])
+        with open(os.path.join(tmpdir, "data"), "wb") as datafile:
 
-    except exceptions.RsyncError:
+            datafile.write(os.urandom(CALIBRATESIZE // 2))
 
-        raise
+        for profile in [a for a in PROFILES if a[0] in choices]:
 
+            test = dict(job)
+            test["compression"] = profile[0]
+            test["compression-level"] = profile[1]
+            test["skip-compress"] = ""
 
-def download(job):
-    """Download file/s from a remote machine.
+            start = time.time()
 
-    This method is for downloading files from a remote host, this method is
-    responsible for specifying the direction that the transfer takes place.
-    This method will make the appropriate call to the rsync method based on
-    data for a given job, the rsync method should not be called directly and
-    this method should be used instead.
+            # Send everything every time, rather than just the differences.
+            sendtorsync(test, tmpdir + "/", dst, "", "",
+                        ["--whole-file", "--ignore-times"])
 
-    Required arguments are:
+            timings[profile] = time.time() - start
 
-    job (dictionary) - A single job dictionary, this is often simply passed in
-                       as a subset of the main jobs dictionary.
+            LOG.info("Transfer to '%s' with compression '%s' (level '%s') "
+                     "took %.2f seconds.", job["host"], profile[0],
+                     profile[1] or "default", timings[profile])
 
-    """
-    # Are paths absolute.
-    if os.path.isabs(job["destdir"]) is False and job["destdir"][0] != "~":
+    finally:
 
-        raise exceptions.AbsolutepathError(
-            "The source path is not absolute", job["destdir"])
+        shutil.rmtree(tmpdir, ignore_errors=True)
 
-    # We want to transfer whole directory.
+        try:
+
+            sendtossh(job, ["rm -rf " + job["remoteworkdir"].rstrip("/") +
+                            "/.longbow-calibrate"])
+
+        except exceptions.SSHError:
+
+            LOG.debug("Could not remove the calibration files from '%s'.",
+                      job["host"])
+
+    best = min(timings, key=lambda a: timings[a])
+
+    return best, timings
+
+
+def connectionsummary():
+    """Log the connection statistics for the session.
+
+    This method will log the number of calls made to each remote host along
+    with how many of these needed retries, timed out or failed outright, and
+    how many times the circuit breaker for the host was tripped. The amount of
+    data rsync moved to and from each host, and how quickly, is also logged.
+
+    """
+    for host in sorted(STATS):
+
+        stats = STATS[host]
+
+        LOG.info("Connections to '%s' - %s calls - %s retries - %s timeouts - "
+                 "%s failures - %s circuit breaker trips.", host,
+                 stats["calls"], stats["retries"], stats["timeouts"],
+                 stats["failures"], stats["trips"])
+
+        if stats["transfers"] > 0:
+
+            LOG.info("Transfers with '%s' - %s transfers - %s files - %.1f MB "
+                     "- %.1f seconds - %.2f MB/s.", host, stats["transfers"],
+                     stats["files"], stats["bytes"] / 1048576.0,
+                     stats["seconds"], stats["bytes"] / 1048576.0 /
+                     max(stats["seconds"], 0.001))
+
+
+def closeconnections():
+    """Close the shared SSH connections to all remote hosts.
+
+    This method will shut down any persistent remote shells and shared SSH
+    connections (ControlMaster) that have been opened to remote hosts during
+    this session. This should be called once Longbow has finished talking to
+    the remote hosts, if another command is sent afterwards then a new shared
+    connection will simply be opened.
+
+    """
+    for key in list(SSHSHELLS):
+
+        shell = SSHSHELLS.pop(key)
+
+        if shell is not None:
+
+            LOG.debug("Closing the remote shell on '%s'", key[1])
+
+            _shellclose(shell)
+
+    for key in list(SSHMASTERS):
+
+        controlpath = SSHMASTERS.pop(key)
+
+        if controlpath is not None:
+
+            LOG.debug("Closing the shared connection to '%s'", key[1])
+
+            sendtoshell(["ssh", "-O", "exit", "-o", "ControlPath=" +
+                         controlpath, "-p", key[2], key[0] + "@" + key[1]])
+
+            # Stale sockets would stop the next master from starting.
+            if os.path.exists(controlpath):
+
+                os.remove(controlpath)
+
+
+def upload(job, options=None):
+    """Upload a file/s to a remote machine.
+
+    This method is for uploading files to a remote host, this method is
+    responsible for specifying the direction that the transfer takes place.
+
+    Required arguments are:
+
+    job (dictionary) - A single job dictionary, this is often simply passed in
+                       as a subset of the main jobs dictionary.
+
+    Optional arguments are:
+
+    options (list) - Extra options to pass to rsync, such as excludes for
+                     files that are already in place on the remote host.
+
+    """
+    # Are paths absolute.
+    if os.path.isabs(job["localworkdir"]) is False and \
+            job["localworkdir"][0] != "~":
+
+        raise exceptions.AbsolutepathError(
+            "The source path is not absolute", job["localworkdir"])
+
+    # We want to transfer whole directory.
+    if job["localworkdir"].endswith("/") is not True:
+
+        job["localworkdir"] = job["localworkdir"] + "/"
+
+    if os.path.isabs(job["destdir"]) is False and job["destdir"][0] != "~":
+
+        raise exceptions.AbsolutepathError(
+            "The destination path is not absolute", job["destdir"])
+
+    dst = (job["user"] + "@" + job["host"] + ":" + job["destdir"])
+
+    LOG.debug("Copying '%s' to '%s'", job["localworkdir"], dst)
+
+    # Send command to subprocess.
+    try:
+
+        if "transfer-mode" in job and job["transfer-mode"] == "tarstream":
+
+            # Small files go in one compressed stream, large files are left to
+            # rsync so that they are only sent again if they have changed.
+            sendtotar(job, job["localworkdir"], job["destdir"], "upload",
+                      job["upload-include"], job["upload-exclude"],
+                      TARMAXSIZE, options)
+
+            if _haslargefiles(job["localworkdir"], TARMAXSIZE):
+
+                sendtorsync(job, job["localworkdir"], dst,
+                            job["upload-include"], job["upload-exclude"],
+                            list(options or []) +
+                            ["--min-size=" + str(TARMAXSIZE)])
+
+        else:
+
+            # The job directory is made as rsync is started on the remote
+            # host, rather than in an SSH call of its own.
+            options = list(options or []) + [_mkdirpath(job["destdir"])]
+            files = _uploadmanifest(job)
+
+            if files is None:
+
+                sendtorsync(job, job["localworkdir"], dst,
+                            job["upload-include"], job["upload-exclude"],
+                            options)
+
+            else:
+
+                # A list of the files saves rsync from checking each file in
+                # the job directory against the masks.
+                tmpdir = tempfile.mkdtemp(prefix="longbow-")
+
+                try:
+
+                    with open(os.path.join(tmpdir, "files"), "w") as listfile:
+
+                        listfile.write("".join([a + "\n" for a in files]))
+
+                    sendtorsync(job, job["localworkdir"], dst, "", "",
+                                options + ["--files-from=" +
+                                           os.path.join(tmpdir, "files")])
+
+                finally:
+
+                    shutil.rmtree(tmpdir, ignore_errors=True)
+
+    except exceptions.RsyncError:
+
+        raise
+
+
+def download(job, options=None):
+    """Download file/s from a remote machine.
+
+    This method is for downloading files from a remote host, this method is
+    responsible for specifying the direction that the transfer takes place.
+    This method will make the appropriate call to the rsync method based on
+    data for a given job, the rsync method should not be called directly and
+    this method should be used instead.
+
+    Required arguments are:
+
+    job (dictionary) - A single job dictionary, this is often simply passed in
+                       as a subset of the main jobs dictionary.
+
+    Optional arguments are:
+
+    options (list) - Extra options to pass to rsync, such as a list of the
+                     files to transfer.
+
+    """
+    # Are paths absolute.
+    if os.path.isabs(job["destdir"]) is False and job["destdir"][0] != "~":
+
+        raise exceptions.AbsolutepathError(
+            "The source path is not absolute", job["destdir"])
+
+    # We want to transfer whole directory.
     if job["destdir"].endswith("/") is not True:
 
         job["destdir"] = job["destdir"] + "/"
@@ -771,9 +1369,1480 @@ def download(job):
     # Send command to subprocess.
     try:
 
-        sendtorsync(job, src, job["localworkdir"], job["download-include"],
-                    job["download-exclude"])
+        # Finished jobs are fetched in one compressed stream, whilst jobs that
+        # are running are synced by rsync as only their changes are needed.
+        if ("transfer-mode" in job and job["transfer-mode"] == "tarstream" and
+                "laststatus" in job and job["laststatus"] == "Finished"):
+
+            sendtotar(job, job["localworkdir"], job["destdir"], "download",
+                      job["download-include"], job["download-exclude"])
+
+        # Jobs staged in tiers only fetch the new data in their progress files
+        # whilst they run, everything else waits until they have finished.
+        elif _progresstier(job):
+
+            _downloadappend(job, src, [
+                a.replace(" ", "") for a in job["download-running"].split(",")
+                if a.replace(" ", "") != ""])
+
+        else:
+
+            append = []
+
+            if "download-append" in job:
+
+                append = [a.replace(" ", "") for a in
+                          job["download-append"].split(",")
+                          if a.replace(" ", "") != ""]
+
+            # Files that only ever grow are left out here and only their new
+            # data is fetched afterwards.
+            sendtorsync(job, src, job["localworkdir"],
+                        job["download-include"], job["download-exclude"],
+                        list(options or []) +
+                        [a for mask in append for a in ["--exclude", mask]])
+
+            if len(append) > 0:
+
+                _downloadappend(job, src, append)
 
     except exceptions.RsyncError:
 
         raise
+
+
+def uploadmany(joblist, options=None):
+    """Upload the files for several jobs to a remote machine in one go.
+
+    This method is for uploading the files for several jobs in a single rsync
+    transfer, rather than a transfer per job. All of the jobs must be on the
+    same remote host, have the same parent directory for their destdir and
+    have the same upload masks.
+
+    Required arguments are:
+
+    joblist (list) - A list of job dictionaries.
+
+    Optional arguments are:
+
+    options (list) - Extra options to pass to rsync, paths in these are
+                     relative to the parent of the job directories.
+
+    """
+    job = joblist[0]
+
+    for item in joblist:
+
+        # Are paths absolute.
+        if os.path.isabs(item["localworkdir"]) is False and \
+                item["localworkdir"][0] != "~":
+
+            raise exceptions.AbsolutepathError(
+                "The source path is not absolute", item["localworkdir"])
+
+        if os.path.isabs(item["destdir"]) is False and \
+                item["destdir"][0] != "~":
+
+            raise exceptions.AbsolutepathError(
+                "The destination path is not absolute", item["destdir"])
+
+    dst = (job["user"] + "@" + job["host"] + ":" +
+           os.path.dirname(job["destdir"].rstrip("/")) + "/")
+
+    # The parent directory is made as rsync is started on the remote host,
+    # rather than in an SSH call of its own.
+    _sendmany(joblist, dst, "upload", list(options or []) + [
+        _mkdirpath(os.path.dirname(job["destdir"].rstrip("/")))])
+
+
+def downloadmany(joblist):
+    """Download the files for several jobs from a remote machine in one go.
+
+    This method is for downloading the files for several jobs in a single
+    rsync transfer, rather than a transfer per job. All of the jobs must be on
+    the same remote host, have the same parent directory for their destdir and
+    have the same download masks.
+
+    Required arguments are:
+
+    joblist (list) - A list of job dictionaries.
+
+    """
+    job = joblist[0]
+
+    for item in joblist:
+
+        # Are paths absolute.
+        if os.path.isabs(item["destdir"]) is False and \
+                item["destdir"][0] != "~":
+
+            raise exceptions.AbsolutepathError(
+                "The source path is not absolute", item["destdir"])
+
+        if os.path.isabs(item["localworkdir"]) is False and \
+                item["localworkdir"][0] != "~":
+
+            raise exceptions.AbsolutepathError(
+                "The destination path is not absolute", item["localworkdir"])
+
+    src = (job["user"] + "@" + job["host"] + ":" +
+           os.path.dirname(job["destdir"].rstrip("/")) + "/")
+
+    _sendmany(joblist, src, "download")
+
+
+def quotepath(path):
+    """Quote a path for the shell, leaving a leading ~ to be expanded.
+
+    Required arguments are:
+
+    path (string) - The path to be used in a remote command.
+
+    Return parameters are:
+
+    path (string) - The path with any shell characters quoted.
+
+    """
+    if path.startswith("~/"):
+
+        return "~/" + quote(path[2:])
+
+    return quote(path)
+
+
+def _checkconnection(jobs, joblist):
+    """Test the connection and environment for the jobs on one resource."""
+    job = jobs[joblist[0]]
+
+    LOG.debug("Testing connection to '%s'", job["resource"])
+
+    # Test that the connection works.
+    sendtossh(job, ["ls"])
+
+    LOG.info("Test connection to '%s' - passed", job["resource"])
+
+    # Test that basic enviroment looks ok.
+    try:
+
+        sendtossh(job, ["module avail"])
+
+    except exceptions.SSHError as err:
+
+        # If the module command is not found, then it is highly likely that
+        # the non-login shells do not source the /etc/profile in which the
+        # system loads a lot of the environment.
+        if ("bash: module: command not found" in err.stdout or
+                "bash: module: command not found" in err.stderr):
+
+            # Go over all jobs referencing this machine and switch on the
+            # environment fix.
+            for item in joblist:
+
+                jobs[item]["env-fix"] = "true"
+
+
+def _batchscript(marker, commands, lots):
+    """Build a script that runs the given lots and marks each one's output."""
+    script = ['out=$(mktemp) && err=$(mktemp) || exit 1\n']
+
+    for i in lots:
+
+        script.append("(\n" + " ".join(commands[i]) + '\n) >"$out" 2>"$err"\n')
+        script.append("printf '\\n%s %s %s\\n' " + marker + " " + str(i) +
+                      ' $?; cat "$out"; printf \'\\n%s\\n\' ' + marker +
+                      '-stderr; cat "$err"\n')
+
+    script.append('rm -f "$out" "$err"\n')
+
+    return "".join(script)
+
+
+def _sshcommand(job, args):
+    """Build the ssh command that runs args on the job's host."""
+    # basic ssh command.
+    cmd = ["ssh"]
+    cmd.extend(_sshmultiplex(job))
+    cmd.extend(["-p " + job["port"], job["user"] + "@" + job["host"]])
+
+    # Source the /etc/profile on machines where problems have been detected
+    # with the environment.
+    if job["env-fix"] == "true":
+
+        cmd.append("source /etc/profile;")
+
+    # add the commands to be sent to ssh.
+    cmd.extend(args)
+
+    return cmd
+
+
+def _sshmultiplex(job):
+    """Get the ssh options that share a connection to the job's host."""
+    if "ssh-multiplex" not in job or job["ssh-multiplex"] != "true":
+
+        return []
+
+    key = (job["user"], job["host"], job["port"])
+
+    with _hostlock(key):
+
+        # If a master failed to start then don't keep trying.
+        if key in SSHMASTERS and SSHMASTERS[key] is None:
+
+            return []
+
+        # Start a master if there isn't one or its socket has gone.
+        if key not in SSHMASTERS or not os.path.exists(SSHMASTERS[key]):
+
+            SSHMASTERS[key] = _sshmasterstart(job)
+
+            if SSHMASTERS[key] is None:
+
+                return []
+
+        return ["-o", "ControlPath=" + SSHMASTERS[key]]
+
+
+def _sshmasterstart(job):
+    """Start a shared connection to the job's host."""
+    socketdir = os.path.join(tempfile.gettempdir(),
+                             "longbow-" + str(os.getpid()))
+
+    # Masters for other hosts may be starting at the same time.
+    try:
+
+        os.makedirs(socketdir, 0o700)
+
+    except OSError:
+
+        if not os.path.isdir(socketdir):
+
+            raise
+
+    # Socket paths have a short length limit, so hash the connection details.
+    controlpath = os.path.join(socketdir, hashlib.sha1(
+        (job["user"] + "@" + job["host"] + ":" + job["port"]).encode(
+            "utf-8")).hexdigest()[:16])
+
+    cmd = ["ssh", "-M", "-N", "-f", "-o", "ControlPath=" + controlpath,
+           "-o", "ControlPersist=1800", "-p", job["port"],
+           job["user"] + "@" + job["host"]]
+
+    LOG.debug("Opening a shared connection to '%s'", job["host"])
+
+    # The master runs on in the background, so it must not hold our pipes.
+    devnull = open(os.devnull, "w")
+
+    try:
+
+        errorstate = subprocess.call(cmd, stdin=devnull, stdout=devnull,
+                                     stderr=devnull)
+
+    finally:
+
+        devnull.close()
+
+    if errorstate != 0:
+
+        LOG.debug("Could not open a shared connection to '%s', a new "
+                  "connection will be made for each command.", job["host"])
+
+        return None
+
+    return controlpath
+
+
+def _sshmastercheck(job):
+    """Check a shared connection is healthy and drop it if it isn't."""
+    key = (job["user"], job["host"], job["port"])
+
+    with _hostlock(key):
+
+        if key not in SSHMASTERS or SSHMASTERS[key] is None:
+
+            return
+
+        controlpath = SSHMASTERS[key]
+
+        shellout = sendtoshell(["ssh", "-O", "check", "-o", "ControlPath=" +
+                                controlpath, "-p", job["port"],
+                                job["user"] + "@" + job["host"]])
+
+        if shellout[2] != 0:
+
+            LOG.debug("The shared connection to '%s' has gone down, it will "
+                      "be restarted.", job["host"])
+
+            del SSHMASTERS[key]
+
+            if os.path.exists(controlpath):
+
+                os.remove(controlpath)
+
+
+def _shellsend(job, args, timeout=None):
+    """Run a command in the persistent remote shell for the job's host.
+
+    Returns None if persistent shells are switched off or the command could
+    not be sent down the shell, in which case the caller should fall back to a
+    one-shot ssh call. This is also the case if the shell is busy with a
+    command from another thread. If the shell fails once the command has been
+    sent, it may already have run, so the shell is closed and the command is
+    given as timed out for the caller's retry policy to deal with.
+
+    """
+    if "persistent-shell" not in job or job["persistent-shell"] != "true":
+
+        return None
+
+    key = (job["user"], job["host"], job["port"])
+
+    with _hostlock(key):
+
+        # If a shell failed to start then don't keep trying.
+        if key in SSHSHELLS and SSHSHELLS[key] is None:
+
+            return None
+
+        if key not in SSHSHELLS:
+
+            SSHSHELLS[key] = _shellstart(job, timeout)
+
+            if SSHSHELLS[key] is None:
+
+                return None
+
+        shell = SSHSHELLS[key]
+
+    # Only one command at a time can go down the shell.
+    if shell["lock"].acquire(False) is False:
+
+        return None
+
+    try:
+
+        # Source the /etc/profile once per shell rather than per command.
+        if job["env-fix"] == "true" and shell["env-fix"] is False:
+
+            _shellrun(shell, "source /etc/profile", timeout)
+            shell["env-fix"] = True
+
+        shellout = _shellrun(shell, " ".join(args), timeout)
+
+    except (IOError, OSError, ValueError):
+
+        LOG.debug("The remote shell on '%s' has failed, falling back to a new "
+                  "SSH connection for each command.", job["host"])
+
+        with _hostlock(key):
+
+            if key in SSHSHELLS and SSHSHELLS[key] is shell:
+
+                del SSHSHELLS[key]
+
+        _shellclose(shell)
+
+        if shell["sent"] == " ".join(args):
+
+            return ("", TIMEOUTMSG, 255)
+
+        return None
+
+    finally:
+
+        shell["lock"].release()
+
+    return shellout
+
+
+def _shellstart(job, timeout=None):
+    """Start a persistent remote shell on the job's host."""
+    cmd = ["ssh"]
+    cmd.extend(_sshmultiplex(job))
+    cmd.extend(["-p " + job["port"], job["user"] + "@" + job["host"],
+                "bash -s"])
+
+    LOG.debug("Starting a remote shell on '%s'", job["host"])
+
+    try:
+
+        handle = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE)
+
+    except OSError:
+
+        handle = None
+
+    shell = {"env-fix": False, "handle": handle, "lock": threading.Lock(),
+             "sent": None}
+
+    # Make sure the shell is actually there before we trust it.
+    try:
+
+        if handle is None or _shellrun(shell, "true", timeout)[2] != 0:
+
+            raise IOError("The remote shell did not start.")
+
+    except (IOError, OSError, ValueError):
+
+        LOG.debug("Could not start a remote shell on '%s', a new SSH "
+                  "connection will be made for each command.", job["host"])
+
+        _shellclose(shell)
+
+        return None
+
+    return shell
+
+
+def _shellrun(shell, command, timeout=None):
+    """Write a framed command to a remote shell and read back its output.
+
+    The command runs in a subshell (so that cd etc does not leak into the next
+    command) with stdin closed (so it can't eat the commands that follow). A
+    unique marker is then written to stdout along with the exit code, and to
+    stderr, so that the output of this command can be separated from the next.
+    If the command runs for longer than timeout an IOError is raised, the shell
+    is then in an unknown state and should be closed. Once the command has
+    been written it is recorded in shell["sent"].
+
+    """
+    handle = shell["handle"]
+    marker = "LONGBOW-" + uuid.uuid4().hex
+
+    script = ("( " + command + "\n) < /dev/null\n"
+              "printf '\\n%s %d\\n' " + marker + " $?\n"
+              "printf '\\n%s\\n' " + marker + " >&2\n")
+
+    shell["sent"] = None
+    handle.stdin.write(script.encode("utf-8"))
+    handle.stdin.flush()
+    shell["sent"] = command
+
+    outfd = handle.stdout.fileno()
+    errfd = handle.stderr.fileno()
+    outend = ("\n" + marker + " ").encode("utf-8")
+    errend = ("\n" + marker + "\n").encode("utf-8")
+    buffers = {outfd: b"", errfd: b""}
+    pending = [outfd, errfd]
+
+    if timeout is not None:
+
+        deadline = time.time() + float(timeout)
+
+    # Read both pipes together so neither can fill up and block the shell.
+    while len(pending) > 0:
+
+        if timeout is None:
+
+            ready, _, _ = select.select(pending, [], [])
+
+        else:
+
+            ready, _, _ = select.select(
+                pending, [], [], max(deadline - time.time(), 0))
+
+            if len(ready) == 0:
+
+                raise IOError("The remote shell timed out.")
+
+        for fd in ready:
+
+            data = os.read(fd, 65536)
+
+            if data == b"":
+
+                raise IOError("The remote shell has closed.")
+
+            buffers[fd] = buffers[fd] + data
+
+        if (outfd in pending and outend in buffers[outfd] and
+                buffers[outfd].endswith(b"\n")):
+
+            pending.remove(outfd)
+
+        if errfd in pending and buffers[errfd].endswith(errend):
+
+            pending.remove(errfd)
+
+    stdout, _, errorstate = buffers[outfd].rpartition(outend)
+    stderr = buffers[errfd][:-len(errend)]
+
+    return (stdout.decode("utf-8"), stderr.decode("utf-8"),
+            int(errorstate.strip()))
+
+
+def _shellclose(shell):
+    """Shut down a persistent remote shell."""
+    if shell is None or shell["handle"] is None:
+
+        return
+
+    handle = shell["handle"]
+
+    try:
+
+        handle.stdin.write(b"exit\n")
+        handle.stdin.close()
+
+    except (IOError, OSError, ValueError):
+
+        pass
+
+    if handle.poll() is None:
+
+        handle.terminate()
+
+    handle.wait()
+
+
+def _expire(handle, expired):
+    """Kill a command that has run for too long."""
+    expired.append(True)
+
+    try:
+
+        handle.kill()
+
+    except OSError:
+
+        pass
+
+
+def _retrypolicy(job):
+    """Get the retry, timeout and circuit breaker settings for a job.
+
+    Job dictionaries without these parameters (such as from older recovery
+    files) get the original behaviour of 3 attempts 10 seconds apart with no
+    timeouts or circuit breaker.
+
+    """
+    policy = {}
+    defaults = [("retry-attempts", 3), ("retry-delay", 10),
+                ("ssh-timeout", 0), ("breaker-threshold", 0),
+                ("breaker-cooldown", 0)]
+
+    for param, default in defaults:
+
+        try:
+
+            policy[param] = jobset.getint(job, param)
+
+        except (KeyError, ValueError):
+
+            policy[param] = default
+
+    policy["retry-attempts"] = max(policy["retry-attempts"], 1)
+
+    return policy
+
+
+def _retrydelay(policy, attempt):
+    """Get the wait before the next retry.
+
+    The wait doubles with each attempt (capped at 64 times the base delay) and
+    has jitter applied so that jobs sharing a host don't all retry at once.
+
+    """
+    delay = policy["retry-delay"] * 2 ** min(attempt - 1, 6)
+
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _count(job, stat):
+    """Add one to a connection statistic for the job's host."""
+    with SSHLOCK:
+
+        if job["host"] not in STATS:
+
+            STATS[job["host"]] = {"calls": 0, "retries": 0, "timeouts": 0,
+                                  "failures": 0, "trips": 0, "transfers": 0,
+                                  "bytes": 0, "files": 0, "seconds": 0.0}
+
+        STATS[job["host"]][stat] = STATS[job["host"]][stat] + 1
+
+
+def _breakercheck(job, policy, error):
+    """Fail fast if the circuit breaker for the job's host is open.
+
+    Once the cool down has passed a single attempt is let through, if that
+    fails the breaker opens again straight away.
+
+    """
+    key = (job["user"], job["host"], job["port"])
+
+    with _hostlock(key):
+
+        if (policy["breaker-threshold"] < 1 or key not in CIRCUITS or
+                CIRCUITS[key]["opened"] is None):
+
+            return
+
+        circuit = CIRCUITS[key]
+        remaining = policy["breaker-cooldown"] - (
+            time.time() - circuit["opened"])
+
+        if remaining > 0:
+
+            raise error(
+                "Connections to '{0}' have been failing, not trying again "
+                "for another {1} seconds.".format(job["host"],
+                                                  int(remaining)),
+                ("", "", 255))
+
+        circuit["opened"] = None
+        circuit["failures"] = policy["breaker-threshold"] - 1
+
+
+def _breakerupdate(job, policy, failed):
+    """Record the outcome of a call against the job's host circuit breaker."""
+    key = (job["user"], job["host"], job["port"])
+
+    with _hostlock(key):
+
+        if key not in CIRCUITS:
+
+            CIRCUITS[key] = {"failures": 0, "opened": None}
+
+        circuit = CIRCUITS[key]
+
+        if failed is False:
+
+            circuit["failures"] = 0
+
+            return
+
+        circuit["failures"] = circuit["failures"] + 1
+
+        if (policy["breaker-threshold"] > 0 and circuit["opened"] is None and
+                circuit["failures"] >= policy["breaker-threshold"]):
+
+            circuit["opened"] = time.time()
+            _count(job, "trips")
+
+            LOG.warning("Connections to '%s' have failed %s times in a row, "
+                        "pausing calls to it for %s seconds.", job["host"],
+                        circuit["failures"], policy["breaker-cooldown"])
+
+
+def _hostlock(key):
+    """Get the lock for a (user, host, port)."""
+    with SSHLOCK:
+
+        if key not in HOSTLOCKS:
+
+            HOSTLOCKS[key] = threading.RLock()
+
+        return HOSTLOCKS[key]
+
+
+def _sendmany(joblist, remote, direction, options=None):
+    """Transfer the directories of several jobs in a single rsync call.
+
+    The remote job directories are named differently to the local ones, so a
+    temporary directory of symlinks, named as on the remote side and pointing
+    at each local directory, stands in for the local end of the transfer. The
+    list of job directories is given to rsync with --files-from.
+
+    """
+    job = joblist[0]
+    tmpdir = tempfile.mkdtemp(prefix="longbow-")
+    links = os.path.join(tmpdir, "jobs")
+    manifest = os.path.join(tmpdir, "manifest")
+    dirfilter = os.path.join(tmpdir, "filter")
+    options = list(options or []) + ["-r", "--files-from=" + manifest,
+                                     "--filter=merge " + dirfilter]
+
+    # Follow the symlinks as if they were the directories themselves.
+    if direction == "upload":
+
+        options.append("--copy-dirlinks")
+
+    else:
+
+        options.append("--keep-dirlinks")
+
+    try:
+
+        os.mkdir(links)
+
+        with open(manifest, "w") as listfile, \
+                open(dirfilter, "w") as filterfile:
+
+            for item in joblist:
+
+                name = os.path.basename(item["destdir"].rstrip("/"))
+                localdir = os.path.abspath(
+                    os.path.expanduser(item["localworkdir"]))
+
+                os.symlink(localdir, os.path.join(links, name))
+                listfile.write(name + "\n")
+
+                # Make sure masks don't filter out the job directories.
+                filterfile.write("+ /" + name + "/\n")
+
+        LOG.debug("Transferring the files for %s jobs on '%s' in one go.",
+                  len(joblist), job["host"])
+
+        # The transfer is shared out between the jobs afterwards, rather than
+        # all being put down to the first job.
+        if direction == "upload":
+
+            transfer = sendtorsync(dict(job), links + "/", remote,
+                                   job["upload-include"],
+                                   job["upload-exclude"], options)
+
+        else:
+
+            transfer = sendtorsync(dict(job), remote, links + "/",
+                                   job["download-include"],
+                                   job["download-exclude"], options)
+
+        for item in joblist:
+
+            _sharetransfer(item, transfer, len(joblist))
+
+    finally:
+
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _sendrsync(job, policy, cmd):
+    """Run an rsync command, retrying it if it fails.
+
+    The output of rsync is read as it arrives, its progress is logged every
+    so often and the statistics it gives at the end are recorded.
+
+    """
+    # Don't keep a dead host tying up the session.
+    _breakercheck(job, policy, exceptions.RsyncError)
+    _count(job, "calls")
+
+    i = 0
+    start = time.time()
+    stats = {}
+
+    # This loop is essentially so we can retry commands that fail, this is to
+    # catch when things go wrong over SSH like dropped connections, issues
+    # with latency etc.
+    while True:
+
+        # Send to SSH.
+        stats.clear()
+        shellout = sendtoshell(
+            cmd, stream=lambda line: _rsyncprogress(job, stats, line))
+
+        errorstate = shellout[2]
+
+        # If no error exit loop, otherwise retry.
+        if errorstate == 0:
+
+            break
+
+        else:
+
+            i = i + 1
+
+            if errorstate == 30:
+
+                _count(job, "timeouts")
+
+            # The shared connection might be the thing that has broken.
+            _sshmastercheck(job)
+
+        # If number of retries is used up then give up.
+        if i >= policy["retry-attempts"]:
+
+            # Only connection problems count towards the circuit breaker.
+            _count(job, "failures")
+            _breakerupdate(job, policy, errorstate in RSYNCCONNECTION)
+
+            raise exceptions.RsyncError(
+                "rsync failed, make sure a normal terminal can connect to "
+                "rsync to be sure there are no connection issues.", shellout)
+
+        delay = _retrydelay(policy, i)
+        _count(job, "retries")
+
+        LOG.debug("Retry rsync after %.1f second wait.", delay)
+
+        # Wait to see if problem goes away before trying again.
+        time.sleep(delay)
+
+    _breakerupdate(job, policy, False)
+
+    transfer = {"bytes": stats.get("sent", 0) + stats.get("received", 0),
+                "files": stats.get("files", 0),
+                "seconds": time.time() - start}
+
+    _recordtransfer(job, transfer)
+
+    return transfer
+
+
+def _readstream(handle, stream):
+    """Hand the output of a command to a function line by line.
+
+    Lines are ended by either a new line or a carriage return. The last
+    STREAMTAIL lines are returned.
+
+    """
+    tail = collections.deque(maxlen=STREAMTAIL)
+    partial = b""
+
+    while True:
+
+        data = os.read(handle.stdout.fileno(), 65536)
+
+        if len(data) == 0:
+
+            break
+
+        lines = re.split(b"[\r\n]", partial + data)
+        partial = lines.pop()
+
+        for line in lines:
+
+            if len(line.strip()) > 0:
+
+                line = line.decode("utf-8", "replace")
+                tail.append(line)
+                stream(line)
+
+    if len(partial.strip()) > 0:
+
+        tail.append(partial.decode("utf-8", "replace"))
+        stream(tail[-1])
+
+    handle.stdout.close()
+
+    return "\n".join(tail)
+
+
+def _rsyncprogress(job, stats, line):
+    """Pick out the progress and statistics from a line of rsync output.
+
+    Progress lines (from -P) are logged at most every PROGRESSINTERVAL
+    seconds. The --stats lines at the end give the bytes sent and received
+    and the number of files transferred, older versions of rsync leave out
+    "regular" and the thousands separators.
+
+    """
+    progress = re.match(r"\s*([\d,]+)\s+(\d+)%\s+(\S+/s)\s+\S+"
+                        r"(?:\s+\(xf\w+#(\d+), \w+-\w+=(\d+)/(\d+)\))?",
+                        line)
+
+    if progress is not None:
+
+        if time.time() - stats.get("logged", 0) >= PROGRESSINTERVAL:
+
+            stats["logged"] = time.time()
+
+            if progress.group(4) is not None:
+
+                LOG.debug("Transfer for '%s' - %s files sent - %s of %s files "
+                          "left to check - %s.", job["host"],
+                          progress.group(4), progress.group(5),
+                          progress.group(6), progress.group(3))
+
+        return
+
+    for key, prefix in (("files", "Number of regular files transferred:"),
+                        ("files", "Number of files transferred:"),
+                        ("sent", "Total bytes sent:"),
+                        ("received", "Total bytes received:")):
+
+        if line.startswith(prefix):
+
+            try:
+
+                stats[key] = int(
+                    line[len(prefix):].split()[0].replace(",", ""))
+
+            except (IndexError, ValueError):
+
+                pass
+
+
+def _recordtransfer(job, transfer):
+    """Add a transfer to the totals for the job and its host."""
+    LOG.debug("Transferred %s files (%s bytes) with '%s' in %.1f seconds.",
+              transfer["files"], transfer["bytes"], job["host"],
+              transfer["seconds"])
+
+    _count(job, "transfers")
+
+    with SSHLOCK:
+
+        stats = STATS[job["host"]]
+        stats["bytes"] = stats["bytes"] + transfer["bytes"]
+        stats["files"] = stats["files"] + transfer["files"]
+        stats["seconds"] = stats["seconds"] + transfer["seconds"]
+
+    _sharetransfer(job, transfer, 1)
+
+
+def _sharetransfer(job, transfer, count):
+    """Add a share of a transfer to the totals for a job.
+
+    Totals are kept as strings, like the rest of the job record, so that they
+    survive in the recovery file.
+
+    """
+    for key in ("bytes", "files", "seconds"):
+
+        total = 0.0
+
+        if "transfer-" + key in job:
+
+            total = float(job["transfer-" + key])
+
+        total = total + float(transfer[key]) / count
+
+        if key == "seconds":
+
+            job["transfer-" + key] = str(round(total, 1))
+
+        else:
+
+            job["transfer-" + key] = str(int(round(total)))
+
+
+def _filterrules(includemask, excludemask):
+    """Turn the comma separated masks into rsync filter rules.
+
+    As on the command-line, include masks are only used alongside exclude
+    masks and come before them, as the first rule that matches a file wins.
+
+    """
+    rules = []
+
+    if excludemask != "":
+
+        if includemask != "":
+
+            rules.extend(["+ " + a.replace(" ", "")
+                          for a in includemask.split(",")])
+
+        rules.extend(["- " + a.replace(" ", "")
+                      for a in excludemask.split(",")])
+
+    return rules
+
+
+def _uploadmanifest(job):
+    """List the files to upload for a job, if its masks name them exactly.
+
+    This is the case when everything is excluded apart from a list of file
+    names, as set up for jobs using an application plugin. Names that don't
+    exist locally are left out. Returns None when the masks can't be turned
+    into a list of files.
+
+    """
+    if job["upload-exclude"].replace(" ", "") != "*":
+
+        return None
+
+    localdir = os.path.expanduser(job["localworkdir"])
+    files = []
+
+    for mask in job["upload-include"].split(","):
+
+        mask = mask.replace(" ", "").lstrip("/")
+
+        if mask == "":
+
+            continue
+
+        if "*" in mask or "?" in mask or "[" in mask:
+
+            return None
+
+        if mask not in files and os.path.exists(os.path.join(localdir, mask)):
+
+            files.append(mask)
+
+    if len(files) == 0:
+
+        return None
+
+    return files
+
+
+def _tarselect(includemask, excludemask, maxsize=None, options=None):
+    """Build the find arguments that pick the files for a tar stream.
+
+    Masks are treated as in the sendtorsync() method, include masks are only
+    used alongside exclude masks and win over them. Excludes given in rsync
+    style options win over both.
+
+    """
+    args = ["!", "-type", "d"]
+
+    if maxsize is not None:
+
+        args.extend(["-size", "-" + str(maxsize) + "c"])
+
+    options = list(options or [])
+    anchored = [options[i + 1] for i in range(len(options) - 1)
+                if options[i] == "--exclude"]
+
+    if len(anchored) > 0:
+
+        args.extend(["!"] + _findmasks(anchored))
+
+    excludes = [a.replace(" ", "") for a in excludemask.split(",")
+                if a.replace(" ", "") != ""]
+    includes = [a.replace(" ", "") for a in includemask.split(",")
+                if a.replace(" ", "") != ""]
+
+    if len(excludes) > 0 and len(includes) > 0:
+
+        args.extend(["("] + _findmasks(includes) + ["-o", "!"] +
+                    _findmasks(excludes) + [")"])
+
+    elif len(excludes) > 0:
+
+        args.extend(["!"] + _findmasks(excludes))
+
+    return args
+
+
+def _findmasks(masks):
+    """Turn rsync style masks into a find expression matching any of them."""
+    args = ["("]
+
+    for mask in masks:
+
+        if len(args) > 1:
+
+            args.append("-o")
+
+        # Masks without a slash match on the name, a leading slash anchors the
+        # mask to the top of the transfer, and anything under a matching
+        # directory also matches.
+        if mask.startswith("/"):
+
+            args.extend(["-path", "." + mask.rstrip("/")])
+            path = "." + mask.rstrip("/")
+
+        elif "/" in mask.rstrip("/"):
+
+            args.extend(["-path", "*/" + mask.rstrip("/")])
+            path = "*/" + mask.rstrip("/")
+
+        else:
+
+            args.extend(["-name", mask.rstrip("/")])
+            path = "*/" + mask.rstrip("/")
+
+        args.extend(["-o", "-path", path + "/*"])
+
+    return args + [")"]
+
+
+def _mkdirpath(path):
+    """The rsync option that makes a remote directory before rsync starts."""
+    return ("--rsync-path=mkdir -p " + quotepath(path.rstrip("/")) +
+            " && rsync")
+
+
+def _haslargefiles(localdir, size):
+    """Check if a local directory holds any files of at least size bytes."""
+    for root, _, files in os.walk(os.path.expanduser(localdir)):
+
+        for name in files:
+
+            path = os.path.join(root, name)
+
+            if os.path.isfile(path) and os.path.getsize(path) >= size:
+
+                return True
+
+    return False
+
+
+def _downloadappend(job, src, masks):
+    """Fetch just the new data at the end of files that only ever grow.
+
+    The remote files matching the masks are listed with their sizes. For each
+    that is longer than the local copy, a checksum of the last bytes that the
+    two have in common is fetched along with the bytes that are new, all files
+    for the job coming in one stream. The new bytes are only added where the
+    checksums match. New files, files that have shrunk and those whose
+    checksum does not match are sent in full by rsync.
+
+    """
+    localdir = os.path.expanduser(job["localworkdir"])
+
+    try:
+
+        shellout = sendtossh(job, [
+            "cd " + quotepath(job["destdir"].rstrip("/")) +
+            " && find . -type f " + " ".join(
+                [quote(a) for a in _findmasks(masks)]) +
+            " -printf '%P\\t%s\\t%T@\\n'"])
+
+    except exceptions.SSHError as err:
+
+        raise exceptions.RsyncError(
+            "Could not list the append only files.",
+            (err.stdout, err.stderr, err.errorcode))
+
+    full = []
+    tails = []
+
+    for line in shellout[0].splitlines():
+
+        if line.count("\t") < 2:
+
+            continue
+
+        path, size, mtime = line.rsplit("\t", 2)
+        local = os.path.join(localdir, path)
+        length = -1
+
+        if os.path.isfile(local):
+
+            length = os.path.getsize(local)
+
+        if length == int(size):
+
+            continue
+
+        elif length <= 0 or length > int(size):
+
+            full.append(path)
+
+        else:
+
+            tails.append((path, length, int(size), float(mtime)))
+
+    if len(tails) > 0:
+
+        full.extend(_fetchtails(job, localdir, tails))
+
+    if len(full) > 0:
+
+        LOG.debug("Sending %s append only files in full.", len(full))
+
+        tmpdir = tempfile.mkdtemp(prefix="longbow-")
+
+        try:
+
+            with open(os.path.join(tmpdir, "files"), "w") as listfile:
+
+                listfile.write("".join([a + "\n" for a in full]))
+
+            sendtorsync(job, src, job["localworkdir"], "", "",
+                        ["--files-from=" + os.path.join(tmpdir, "files")])
+
+        finally:
+
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _progresstier(job):
+    """Whether only the progress files for a job are to be fetched."""
+    return ("staging-tiers" in job and job["staging-tiers"] == "true" and
+            "laststatus" in job and job["laststatus"] != "Finished" and
+            "download-running" in job and
+            job["download-running"].replace(",", "").strip() != "")
+
+
+def _fetchtails(job, localdir, tails):
+    """Fetch and add on the new data of files, returns those that failed."""
+    cmd = []
+
+    for path, length, size, _ in tails:
+
+        overlap = min(APPENDOVERLAP, length)
+
+        cmd.append(
+            "tail -c +" + str(length - overlap + 1) + " " + quote(path) +
+            " | head -c " + str(overlap) + " | md5sum | cut -c 1-32; " +
+            "tail -c +" + str(length + 1) + " " + quote(path) +
+            " | head -c " + str(size - length) + ";")
+
+    tmpdir = tempfile.mkdtemp(prefix="longbow-")
+    stream = os.path.join(tmpdir, "tails")
+    failed = []
+
+    try:
+
+        _sendpipeline(
+            job, _sshpipe(job) + " " + quote(
+                "cd " + quotepath(job["destdir"].rstrip("/")) + " && " +
+                " ".join(cmd)) + " > " + quote(stream),
+            "Could not fetch the new data of the append only files.")
+
+        with open(stream, "rb") as tailfile:
+
+            for path, length, size, mtime in tails:
+
+                local = os.path.join(localdir, path)
+                overlap = min(APPENDOVERLAP, length)
+                remotesum = tailfile.read(33)
+
+                with open(local, "rb") as localfile:
+
+                    localfile.seek(length - overlap)
+                    localsum = hashlib.md5(localfile.read(overlap)).hexdigest()
+
+                if remotesum.decode("ascii", "replace").strip() != localsum:
+
+                    LOG.debug("File '%s' does not match the remote copy.",
+                              path)
+
+                    failed.append(path)
+                    tailfile.seek(size - length, 1)
+
+                    continue
+
+                with open(local, "ab") as localfile:
+
+                    remaining = size - length
+
+                    while remaining > 0:
+
+                        data = tailfile.read(min(remaining, 1048576))
+
+                        if len(data) == 0:
+
+                            break
+
+                        localfile.write(data)
+                        remaining = remaining - len(data)
+
+                # A short stream means the rest of it can't be trusted.
+                if remaining > 0:
+
+                    failed.extend([a[0] for a in tails[tails.index(
+                        (path, length, size, mtime)):]])
+
+                    break
+
+                os.utime(local, (time.time(), mtime))
+
+    finally:
+
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return failed
+
+
+def _sshpipe(job):
+    """Build the ssh command (as a shell string) for use in a pipeline."""
+    ssh = ["ssh"] + _sshmultiplex(job) + ["-p", job["port"]]
+    policy = _retrypolicy(job)
+
+    # Have ssh give up on connections that stall.
+    if policy["ssh-timeout"] > 0:
+
+        ssh.extend(["-o", "ServerAliveInterval=" +
+                    str(max(policy["ssh-timeout"] // 3, 1)),
+                    "-o", "ServerAliveCountMax=3"])
+
+    ssh.append(job["user"] + "@" + job["host"])
+
+    return " ".join([quote(a) for a in ssh])
+
+
+def _sendpipeline(job, cmd, message):
+    """Run a shell pipeline that uses ssh, retrying it if it fails."""
+    policy = _retrypolicy(job)
+
+    # Don't keep a dead host tying up the session.
+    _breakercheck(job, policy, exceptions.RsyncError)
+    _count(job, "calls")
+
+    i = 0
+
+    # This loop is essentially so we can retry transfers that fail, this is to
+    # catch when things go wrong over SSH like dropped connections, issues
+    # with latency etc.
+    while True:
+
+        shellout = sendtoshell(["sh", "-c", cmd])
+
+        errorstate = shellout[2]
+
+        if errorstate == 0:
+
+            break
+
+        i = i + 1
+
+        # The shared connection might be the thing that has broken.
+        _sshmastercheck(job)
+
+        # If number of retries is used up then give up.
+        if i >= policy["retry-attempts"]:
+
+            _count(job, "failures")
+            _breakerupdate(job, policy, errorstate == 255)
+
+            raise exceptions.RsyncError(message, shellout)
+
+        delay = _retrydelay(policy, i)
+        _count(job, "retries")
+
+        LOG.debug("Retry transfer after %.1f second wait.", delay)
+
+        # Wait to see if problem goes away before trying again.
+        time.sleep(delay)
+
+    _breakerupdate(job, policy, False)
+
+
+def _compressargs(job, localdir=None):
+    """Work out the rsync options for the compression profile of a job.
+
+    Jobs without a profile get rsync's usual compression. Algorithms and
+    options that the local rsync doesn't have are left out. If a local
+    directory is given, its files are sampled for types of file that don't
+    compress, to be added to the list of extensions to skip.
+
+    """
+    if "compression" not in job:
+
+        return ["-z"]
+
+    if job["compression"] == "none":
+
+        return []
+
+    info = _rsyncinfo()
+    args = ["-z"]
+
+    if job["compression"] != "zlib":
+
+        if job["compression"] in info["compress"]:
+
+            args.append("--compress-choice=" + job["compression"])
+
+        else:
+
+            LOG.debug("rsync here does not have '%s' compression, using "
+                      "zlib.", job["compression"])
+
+    if "compression-level" in job and job["compression-level"] != "":
+
+        args.append("--compress-level=" + job["compression-level"])
+
+    skip = []
+
+    if "skip-compress" in job:
+
+        skip = [a.replace(" ", "").lstrip(".").lower() for a in
+                job["skip-compress"].split(",") if a.replace(" ", "") != ""]
+
+    if localdir is not None:
+
+        skip.extend([a for a in _sampleextensions(localdir, skip)
+                     if a not in skip])
+
+    if len(skip) > 0 and info["version"] >= (3, 0):
+
+        args.append("--skip-compress=" + "/".join(skip))
+
+    return args
+
+
+def _sampleextensions(localdir, skip):
+    """Find extensions of large local files that don't compress.
+
+    A sample from the start of one file of each extension not seen before is
+    compressed, if it barely shrinks then files of that type are not worth
+    compressing. Results are remembered for the rest of the session.
+
+    """
+    found = []
+
+    for root, _, files in os.walk(os.path.expanduser(localdir)):
+
+        for name in files:
+
+            ext = os.path.splitext(name)[1].lstrip(".").lower()
+            path = os.path.join(root, name)
+
+            if (ext == "" or ext in skip or ext in found or
+                    not os.path.isfile(path) or
+                    os.path.getsize(path) < TARMAXSIZE):
+
+                continue
+
+            with SSHLOCK:
+
+                known = EXTENSIONS.get(ext)
+
+            if known is None:
+
+                with open(path, "rb") as sample:
+
+                    data = sample.read(APPENDOVERLAP)
+
+                known = len(zlib.compress(data, 1)) > 0.95 * len(data)
+
+                with SSHLOCK:
+
+                    EXTENSIONS[ext] = known
+
+            if known is True:
+
+                found.append(ext)
+
+    return found
+
+
+def _rsyncinfo():
+    """Get the version and compression algorithms of the local rsync."""
+    with SSHLOCK:
+
+        if "version" in RSYNCINFO:
+
+            return RSYNCINFO
+
+    try:
+
+        shellout = sendtoshell(["rsync", "--version"])
+
+    except OSError:
+
+        shellout = ("", "", 1)
+
+    info = _rsyncparse(shellout[0])
+
+    with SSHLOCK:
+
+        RSYNCINFO.update(info)
+
+    return RSYNCINFO
+
+
+def _rsyncparse(output):
+    """Get the version and compression algorithms from rsync --version."""
+    version = (0, 0)
+    compress = ["none", "zlib"]
+    lines = output.splitlines()
+
+    for i, line in enumerate(lines):
+
+        if line.startswith("rsync") and "version" in line.split():
+
+            try:
+
+                version = tuple([int(a) for a in line.split()[
+                    line.split().index("version") + 1].split(".")[:2]])
+
+            except ValueError:
+
+                pass
+
+        # rsync 3.2 and later list the algorithms they have.
+        elif line.strip() == "Compress list:" and i + 1 < len(lines):
+
+            compress = lines[i + 1].split()
+
+    return {"version": version, "compress": compress}
@@ -37,36 +37,75 @@ between the local host and the remote host job directories.
 
 The following methods are contained within this module:
 
-stage_upstream(jobs)
+stage_upstream(jobs, joblist=None, then=None)
     A method for staging files for each job to the target HPC host. The
     underlying utility behind this transfer is rsync, thus it is possible
     to supply rsync file masks to blacklist unwanted large files. By default
     rsync is configured to transfer blockwise and only transfer the
     newest/changed blocks, this saves a lot of time during persistant staging.
+    Each lot of jobs can be handed on (for submission) as soon as it has been
+    staged.
 
-stage_downstream(job)
+stage_downstream(job, files=None)
     A method for staging files for each job to from target HPC host. The
     underlying utility behind this transfer is rsync, thus it is possible
     to supply rsync file masks to blacklist unwanted large files. By default
     rsync is configured to transfer blockwise and only transfer the
     newest/changed blocks, this saves a lot of time during persistant staging.
 
+stage_downstream_many(jobs, joblist)
+    A method for staging files for a list of jobs back from their HPC hosts.
+    Resources are staged at the same time, and jobs that have bulk staging
+    switched on are grouped into one transfer per resource. Running jobs that
+    have not changed since they were last staged are skipped.
+
 cleanup(jobs)
     A method for cleaning up the working directory on the HPC host, this method
     will only delete job directories that are valid for the given Longbow
-    instance, thus avoid data loss.
+    instance, thus avoid data loss. The directories on each resource are
+    removed by a single remote script.
+
+prunecache(job, days)
+    A method for removing files from the input cache on the HPC host of a job
+    that have not been used for a given number of days.
 """
 
+import fnmatch
+import hashlib
 import logging
 import os
+import shutil
+import tempfile
+import threading
 
+import longbow.configuration as configuration
 import longbow.exceptions as exceptions
+import longbow.jobset as jobset
+import longbow.parallel as parallel
 import longbow.shellwrappers as shellwrappers
 
 LOG = logging.getLogger("longbow.staging")
 
+# Input files at least this size (bytes) go through the input cache, smaller
+# files are not worth the extra round trips.
+CACHEMINSIZE = 65536
+
+# The remote input cache lives in this directory under remoteworkdir.
+CACHEDIR = ".longbow-cache"
+
+# Content hashes of local files keyed on absolute path, along with the size
+# and modification time they were hashed at. This is kept in ~/.longbow so
+# that files are only hashed again when they change.
+HASHINDEX = {"loaded": False, "changed": False, "files": {}}
+HASHLOCK = threading.Lock()
+
+# The remote files (path, size and modification time) of each running job as
+# they were when it was last staged downstream, keyed on (host, destdir).
+MANIFESTS = {}
+MANIFESTLOCK = threading.Lock()
+
 
-def stage_upstream(jobs):
+def stage_upstream(jobs, joblist=None, then=None):
     """Transfer files for all jobs, to a remote HPC machine.
 
     A method for staging files for each job to the target HPC host. The
@@ -75,55 +114,61 @@ def stage_upstream(jobs):
     rsync is configured to transfer blockwise and only transfer the
     newest/changed blocks, this saves a lot of time during persistant staging.
 
+    If then is given, it is called with each group of jobs (a tuple of job
+    names) as soon as their files are in place, this is how jobs are submitted
+    whilst the files for the others are still being staged. If it returns
+    False, the rest of the jobs on that resource are not staged and their
+    names are returned instead, so that they can be staged later. Once a
+    transfer has failed no new ones are started, as Longbow will be stopping.
+
     Required arguments are:
 
     jobs (dictionary) - The Longbow jobs data structure, see configuration.py
                         for more information about the format of this
                         structure.
 
-    """
-    LOG.info("Staging files for job/s.")
-
-    for item in [a for a in jobs if "lbowconf" not in a]:
+    Optional arguments are:
 
-        job = jobs[item]
-        destdir = job["destdir"]
+    joblist (list) - The names of the jobs to stage, all jobs are staged if
+                     this is not given.
 
-        LOG.info("Transfering files for job '%s' to host '%s'",
-                 item, job["resource"])
+    then (method) - The method to call with each group of jobs once staged.
 
-        try:
+    Return parameters are:
 
-            shellwrappers.sendtossh(job, ["mkdir -p " + destdir + "\n"])
+    held (list) - The names of the jobs that were not staged because then
+                  returned False.
 
-            LOG.info("Creation of directory '%s' - successful.", destdir)
+    """
+    LOG.info("Staging files for job/s.")
 
-        except exceptions.SSHError:
+    if joblist is None:
 
-            LOG.error(
-                "Creation of directory '%s' - failed. Make sure that you "
-                "have write permissions at the top level of the path given.",
-                destdir)
+        joblist = jobset.joblist(jobs)
 
-            raise
+    held = []
+    stopped = []
 
-        # Transfer files upstream.
-        try:
+    # Transfer to each resource at the same time, a failed job is reported
+    # without stopping the transfers for the others unless they are being
+    # handed on.
+    try:
 
-            shellwrappers.upload(job)
+        parallel.byresource(
+            jobs, _stagegroups(jobs, joblist, "upload"),
+            lambda group: _stageupthen(jobs, group, then, held, stopped),
+            "staging-concurrency", then is not None)
 
-        except exceptions.RsyncError:
+    finally:
 
-            raise exceptions.StagingError(
-                "Could not stage '{0}' upstream, make sure that you have "
-                "supplied the correct remote working directory and that you "
-                "have chosen a path that you can write to."
-                .format(job["localworkdir"]))
+        _savehashindex()
 
     LOG.info("Staging files upstream - complete.")
 
+    return [a for a in joblist if a in held]
+
 
-def stage_downstream(job):
+def stage_downstream(job, files=None):
     """Transfer all files for a job, back from the HPC machine.
 
     A method for staging files for each job to from target HPC host. The
@@ -137,13 +182,33 @@ def stage_downstream(job):
     job (dictionary) - A single job dictionary, this is often simply passed in
                        as a subset of the main jobs dictionary.
 
+    Optional arguments are:
+
+    files (list) - Only transfer these files, given as paths relative to the
+                   job directory. The whole directory is transferred if this
+                   is not given.
+
     """
     LOG.info("For job '%s' staging files downstream.", job["jobname"])
 
+    tmpdir = None
+    options = None
+
     # Download the whole directory with rsync.
     try:
 
-        shellwrappers.download(job)
+        # Hand rsync the list of files rather than have it walk the remote
+        # directory to find them.
+        if files is not None:
+
+            tmpdir = tempfile.mkdtemp(prefix="longbow-")
+            options = ["--files-from=" + os.path.join(tmpdir, "files")]
+
+            with open(os.path.join(tmpdir, "files"), "w") as listfile:
+
+                listfile.write("".join([a + "\n" for a in files]))
+
+        shellwrappers.download(job, options)
 
     except exceptions.RsyncError:
 
@@ -151,9 +216,73 @@ def stage_downstream(job):
             "Could not download a file from '{0}' to '{1}'".format(
                 job["destdir"], job["localworkdir"]))
 
+    finally:
+
+        if tmpdir is not None:
+
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
     LOG.info("Staging complete.")
 
 
+def stage_downstream_many(jobs, joblist):
+    """Transfer all files for a list of jobs, back from their HPC machines.
+
+    A method for staging files for many jobs back from their HPC hosts. Each
+    resource is staged at the same time, with up to "staging-concurrency"
+    transfers at once on each. Jobs with "bulk-staging" switched on that share
+    a remote host, parent directory and download masks are staged in a single
+    rsync transfer. A failed transfer is reported and does not stop the
+    others.
+
+    For running jobs with "staging-manifest" switched on, a listing of the
+    files in every job directory on a resource is fetched with a single SSH
+    call. This is compared with the listing from when each job was last
+    staged, jobs that have not changed are skipped and only the files that
+    have changed are transferred for the rest.
+
+    Required arguments are:
+
+    jobs (dictionary) - The Longbow jobs data structure, see configuration.py
+                        for more information about the format of this
+                        structure.
+
+    joblist (list) - The names of the jobs to stage.
+
+    Return parameters are:
+
+    failed (list) - The names of the jobs that could not be staged.
+
+    """
+    changes = _manifestchanges(jobs, joblist)
+
+    # Jobs that have not changed since they were last staged are left alone.
+    results = parallel.byresource(
+        jobs, _stagegroups(jobs, [a for a in joblist if a not in changes or
+                                  changes[a][0] is None or
+                                  len(changes[a][0]) > 0], "download"),
+        lambda group: _stagedowngroup(jobs, group, changes),
+        "staging-concurrency", False)
+
+    failed = []
+
+    for group in results:
+
+        failed.extend(results[group])
+
+    # Only remember what the remote files looked like once they are here.
+    with MANIFESTLOCK:
+
+        for item in changes:
+
+            if item not in failed:
+
+                MANIFESTS[(jobs[item]["host"], jobs[item]["destdir"])] = \
+                    changes[item][1]
+
+    return failed
+
+
 def cleanup(jobs):
     """Clean up the working directory on the HPC machine.
 
@@ -164,6 +293,11 @@ def cleanup(jobs):
     This method also contains the code for cleaning up the recovery file used
     in the session.
 
+    The directories of all the jobs on a resource are checked and removed by a
+    single remote script, and resources are cleaned up at the same time. Jobs
+    with "cleanup-background" switched on leave their directories being
+    removed on the remote host, so that Longbow can exit sooner.
+
     Required arguments are:
 
     jobs (dictionary) - The Longbow jobs data structure, see configuration.py
@@ -173,53 +307,56 @@ def cleanup(jobs):
     """
     LOG.info("Cleaning up the work directories.")
 
-    for item in [a for a in jobs if "lbowconf" not in a]:
+    groups = {}
+    order = []
+
+    for item in jobset.joblist(jobs):
 
         job = jobs[item]
-        destdir = job["destdir"]
-        remotedir = job["remoteworkdir"]
 
         try:
 
-            shellwrappers.remotelist(job)
-
-            if destdir != remotedir:
-
-                LOG.info("Deleting directory for job '%s' - '%s'",
-                         item, destdir)
-
-                shellwrappers.remotedelete(job)
-
-            else:
+            if job["destdir"] == job["remoteworkdir"]:
 
                 raise exceptions.RemoteworkdirError(
                     "Subdirectory of remoteworkdir not yet created")
 
+            key = (job["resource"], job["user"], job["host"], job["port"],
+                   "cleanup-background" in job and
+                   job["cleanup-background"] == "true")
+
         except exceptions.RemoteworkdirError:
 
             LOG.debug("For job '%s', cleanup not required because the "
                       "'%sxxxxx' subdirectory of '%s' in which the job "
                       "would have run has not yet been created on the remote "
-                      "resource.", item, item, remotedir)
-
-        except exceptions.RemotelistError:
-
-            # Directory doesn't exist.
-            LOG.debug("Directory on path '%s' does not exist - skipping.",
-                      destdir)
+                      "resource.", item, item, job["remoteworkdir"])
 
         except KeyError:
 
             LOG.debug("For job '%s', cleanup not required - skipping.", item)
 
-        except exceptions.RemotedeleteError:
+        else:
+
+            if key not in groups:
+
+                groups[key] = []
+                order.append(key)
+
+            groups[key].append(item)
 
-            LOG.debug("For job '%s', cannot delete directory '%s' - skipping.",
-                      item, destdir)
+    tasks = {}
 
-        except NameError:
+    for key in order:
 
-            pass
+        tasks.setdefault(key[0], []).append(tuple(groups[key]))
+
+    parallel.byresource(jobs, tasks,
+                        lambda group: _cleanupgroup(jobs, group),
+                        stoponerror=False)
+
+    # Nothing else needs to be sent to the remote hosts.
+    shellwrappers.closeconnections()
 
     recfile = jobs["lbowconf"]["recoveryfile"]
     fpath = os.path.expanduser('~/.longbow')
@@ -228,6 +365,668 @@ def cleanup(jobs):
 
         LOG.info("Removing the recovery file.")
 
-        os.remove(os.path.join(fpath, recfile))
+        configuration.removerecovery(os.path.join(fpath, recfile))
 
     LOG.info("Cleaning up complete.")
+
+
+def _cleanupgroup(jobs, group):
+    """Remove the job directories for a group of jobs on one resource."""
+    joblist = [jobs[item] for item in group]
+    background = ("cleanup-background" in joblist[0] and
+                  joblist[0]["cleanup-background"] == "true")
+
+    try:
+
+        results = shellwrappers.remotedelete_many(joblist, background)
+
+    except exceptions.RemotedeleteError:
+
+        results = ["failed" for _ in group]
+
+    for item, result in zip(group, results):
+
+        destdir = jobs[item]["destdir"]
+
+        if result == "deleted":
+
+            LOG.info("Deleting directory for job '%s' - '%s'", item, destdir)
+
+        elif result == "missing":
+
+            # Directory doesn't exist.
+            LOG.debug("Directory on path '%s' does not exist - skipping.",
+                      destdir)
+
+        else:
+
+            LOG.debug("For job '%s', cannot delete directory '%s' - "
+                      "skipping.", item, destdir)
+
+
+def _stageupjob(item, job):
+    """Transfer the files for a job, creating its remote directory."""
+    LOG.info("Transfering files for job '%s' to host '%s'",
+             item, job["resource"])
+
+    # Put the large input files in place from the remote cache, then leave
+    # them out of the transfer. The transfer makes the job directory.
+    options = None
+
+    if "input-cache" in job and job["input-cache"] == "true":
+
+        options = []
+
+        for path in _cacheinputs(job):
+
+            options.extend(["--exclude", "/" + path])
+
+    # Transfer files upstream.
+    try:
+
+        shellwrappers.upload(job, options)
+
+    except exceptions.RsyncError:
+
+        LOG.error("Transfer of files for job '%s' - failed.", item)
+
+        raise exceptions.StagingError(
+            "Could not stage '{0}' upstream, make sure that you have "
+            "supplied the correct remote working directory and that you "
+            "have chosen a path that you can write to."
+            .format(job["localworkdir"]))
+
+
+def prunecache(job, days):
+    """Remove files from a remote input cache that are no longer being used.
+
+    A method for removing files from the input cache (see the input-cache
+    parameter) on the HPC host of a job, where the file has not been used by a
+    job for the given number of days. Job directories hold hard links to the
+    files in the cache, so removing a file from the cache will not affect jobs
+    that are already using it.
+
+    Required arguments are:
+
+    job (dictionary) - A single job dictionary, only the host details and
+                       remoteworkdir are used.
+
+    days (int) - Cached files not used for this many days are removed.
+
+    Return parameters are:
+
+    removed (int) - The number of files that were removed from the cache.
+
+    """
+    cachedir = os.path.join(job["remoteworkdir"], CACHEDIR)
+    days = str(int(days))
+
+    LOG.info("Removing files not used for %s days from the input cache "
+             "'%s' on '%s'", days, cachedir, job["resource"])
+
+    # Each cached file has a ".used" stamp touched whenever a job uses it.
+    # Files that never got a stamp (such as from an interrupted upload) are
+    # judged on when they were uploaded instead.
+    shellout = shellwrappers.sendtossh(job, [
+        "cd " + shellwrappers.quotepath(cachedir) + " 2>/dev/null || exit 0;",
+        "find . -maxdepth 1 -name '*.used' -mtime +" + days + " | while read "
+        "stamp; do rm -f \"${stamp%.used}\" \"$stamp\"; "
+        "echo \"${stamp%.used}\"; done;",
+        "find . -maxdepth 1 -type f ! -name '*.used' -ctime +" + days +
+        " | while read blob; do if [ ! -f \"$blob.used\" ]; then rm -f "
+        "\"$blob\"; echo \"$blob\"; fi; done"])
+
+    removed = len(shellout[0].split())
+
+    LOG.info("Removed %s files from the input cache on '%s'", removed,
+             job["resource"])
+
+    return removed
+
+
+def _stagegroups(jobs, joblist, direction):
+    """Group jobs into the transfers that will be made for them.
+
+    Jobs with bulk staging switched on are grouped if they share a remote
+    host, the parent of their destdir and their masks for the direction of
+    transfer. All other jobs get a transfer each. Returns a dictionary of
+    lists of groups (tuples of job names) keyed on resource.
+
+    """
+    groups = {}
+    order = []
+
+    for item in joblist:
+
+        job = jobs[item]
+
+        # Tar streams, append only files and progress files are dealt with per
+        # job, so these jobs are not grouped.
+        if ("bulk-staging" in job and job["bulk-staging"] == "true" and not
+                ("transfer-mode" in job and
+                 job["transfer-mode"] == "tarstream" and
+                 (direction == "upload" or job["laststatus"] == "Finished"))
+                and not (direction == "download" and
+                         (("download-append" in job and
+                           job["download-append"] != "") or
+                          ("staging-tiers" in job and
+                           job["staging-tiers"] == "true" and
+                           job["laststatus"] != "Finished")))):
+
+            key = (job["resource"], job["user"], job["host"], job["port"],
+                   os.path.dirname(job["destdir"].rstrip("/")),
+                   job[direction + "-include"], job[direction + "-exclude"])
+
+        else:
+
+            key = item
+
+        if key not in groups:
+
+            groups[key] = []
+            order.append(key)
+
+        groups[key].append(item)
+
+    tasks = {}
+
+    for key in order:
+
+        tasks.setdefault(jobs[groups[key][0]]["resource"], []).append(
+            tuple(groups[key]))
+
+    return tasks
+
+
+def _stageupgroup(jobs, group):
+    """Stage a group of jobs upstream, in one transfer if there are many."""
+    if len(group) == 1:
+
+        _stageupjob(group[0], jobs[group[0]])
+
+        return
+
+    joblist = [jobs[item] for item in group]
+
+    LOG.info("Transfering files for jobs '%s' to host '%s' in one go.",
+             "', '".join(group), joblist[0]["resource"])
+
+    try:
+
+        options = []
+
+        for job in joblist:
+
+            if "input-cache" in job and job["input-cache"] == "true":
+
+                name = os.path.basename(job["destdir"].rstrip("/"))
+
+                for path in _cacheinputs(job):
+
+                    options.extend(["--exclude", "/" + name + "/" + path])
+
+        shellwrappers.uploadmany(joblist, options)
+
+        return
+
+    except (exceptions.SSHError, exceptions.RsyncError):
+
+        LOG.warning("Transfer of files for jobs '%s' in one go - failed, "
+                    "trying each job on its own.", "', '".join(group))
+
+    error = None
+
+    for item in group:
+
+        try:
+
+            _stageupjob(item, jobs[item])
+
+        except (exceptions.SSHError, exceptions.StagingError) as err:
+
+            if error is None:
+
+                error = err
+
+    if error is not None:
+
+        raise error
+
+
+def _stageupthen(jobs, group, then, held, stopped):
+    """Stage a group of jobs upstream and hand it on, unless it is held."""
+    resource = jobs[group[0]]["resource"]
+
+    with parallel.LOCK:
+
+        if resource in stopped:
+
+            held.extend(group)
+
+            return
+
+    _stageupgroup(jobs, group)
+
+    if then is not None and then(group) is False:
+
+        with parallel.LOCK:
+
+            if resource not in stopped:
+
+                stopped.append(resource)
+
+
+def _stagedowngroup(jobs, group, changes):
+    """Stage a group of jobs downstream, returns the jobs that failed."""
+    if len(group) > 1:
+
+        joblist = [jobs[item] for item in group]
+
+        LOG.info("For jobs '%s' staging files downstream in one go.",
+                 "', '".join(group))
+
+        try:
+
+            shellwrappers.downloadmany(joblist)
+
+            LOG.info("Staging complete.")
+
+            return []
+
+        except exceptions.RsyncError:
+
+            LOG.warning("Staging files for jobs '%s' in one go - failed, "
+                        "trying each job on its own.", "', '".join(group))
+
+    failed = []
+
+    for item in group:
+
+        try:
+
+            if item in changes:
+
+                stage_downstream(jobs[item], changes[item][0])
+
+            else:
+
+                stage_downstream(jobs[item])
+
+        except exceptions.StagingError:
+
+            LOG.warning("Could not stage the files for job '%s', will try "
+                        "again later.", item)
+
+            failed.append(item)
+
+    return failed
+
+
+def _manifestchanges(jobs, joblist):
+    """Find the files that have changed for each running job.
+
+    Returns a dictionary keyed on job name of tuples holding the list of
+    changed files (None if the job has not been staged before) and the new
+    listing of its directory. Jobs that could not be listed are left out, so
+    that they get a normal transfer.
+
+    """
+    groups = {}
+
+    for item in joblist:
+
+        job = jobs[item]
+
+        if ("staging-manifest" in job and job["staging-manifest"] == "true" and
+                job["laststatus"] != "Finished"):
+
+            groups.setdefault(
+                (job["resource"], job["user"], job["host"], job["port"]),
+                []).append(item)
+
+    tasks = {}
+
+    for key in groups:
+
+        tasks.setdefault(key[0], []).append(tuple(groups[key]))
+
+    results = parallel.byresource(
+        jobs, tasks, lambda group: _fetchmanifests(jobs, group),
+        "resource-workers", False)
+
+    changes = {}
+
+    for group in results:
+
+        for item in results[group]:
+
+            manifest = results[group][item]
+
+            with MANIFESTLOCK:
+
+                old = MANIFESTS.get((jobs[item]["host"],
+                                     jobs[item]["destdir"]))
+
+            if old is None:
+
+                changes[item] = (None, manifest)
+
+            else:
+
+                changes[item] = (sorted([a for a in manifest
+                                         if old.get(a) != manifest[a]]),
+                                 manifest)
+
+    return changes
+
+
+def _fetchmanifests(jobs, group):
+    """List the files of a group of jobs on one host with one SSH call."""
+    job = jobs[group[0]]
+    cmd = []
+
+    # A line with just a slash (never a relative path) ends each listing.
+    for item in group:
+
+        cmd.append("find " +
+                   shellwrappers.quotepath(jobs[item]["destdir"].rstrip("/")) +
+                   " -type f -printf '%P\\t%s\\t%T@\\n' 2>/dev/null; "
+                   "echo /;")
+
+    try:
+
+        shellout = shellwrappers.sendtossh(job, [" ".join(cmd)])
+
+    except exceptions.SSHError:
+
+        LOG.warning("Could not list the files for jobs on '%s', staging "
+                    "them in full.", job["resource"])
+
+        return {}
+
+    manifests = {}
+    listing = {}
+    index = 0
+
+    for line in shellout[0].splitlines():
+
+        if index >= len(group):
+
+            break
+
+        if line == "/":
+
+            # An empty listing means there is no directory to go by.
+            if len(listing) > 0:
+
+                manifests[group[index]] = listing
+
+            listing = {}
+            index = index + 1
+
+        elif line.count("\t") >= 2:
+
+            path, size, mtime = line.rsplit("\t", 2)
+            listing[path] = (size, mtime)
+
+    return manifests
+
+
+def _cacheinputs(job):
+    """Put the large input files for a job in place from the remote cache.
+
+    Files are stored in the cache named by the hash of their contents, so that
+    jobs (and later sessions) using the same file share one copy. Only files
+    missing from the cache are uploaded, these are then hard linked into the
+    job directory (or copied if a hard link can't be made). The cached copies
+    are made read only first, so that a job writing to a linked file can't
+    change the file for other jobs. Returns the paths, relative to the job
+    directory, of files that are now in place.
+
+    """
+    localdir = os.path.expanduser(job["localworkdir"])
+    hashes = {}
+
+    for path in _cachecandidates(job):
+
+        hashes[path] = _filehash(os.path.join(localdir, path))
+
+    if len(hashes) == 0:
+
+        return []
+
+    cachedir = os.path.join(job["remoteworkdir"], CACHEDIR)
+    blobs = sorted(set(hashes.values()))
+    quoted = shellwrappers.quotepath(cachedir)
+
+    try:
+
+        # Find out which files the cache is missing.
+        shellout = shellwrappers.sendtossh(job, [
+            "mkdir -p " + quoted + " && cd " + quoted + " && for blob in",
+            " ".join(blobs) + "; do [ -f $blob ] || echo $blob; done"])
+
+        missing = shellout[0].split()
+
+        LOG.info("The input cache on '%s' has %s of %s files for job '%s'",
+                 job["resource"], len(blobs) - len(missing), len(blobs),
+                 job["jobname"])
+
+        if len(missing) > 0:
+
+            _cacheupload(job, cachedir, missing, hashes)
+
+        # Link the files into the job directory and mark them as used.
+        cmd = []
+
+        for path in sorted(hashes):
+
+            blob = shellwrappers.quotepath(
+                os.path.join(cachedir, hashes[path]))
+            dst = os.path.join(job["destdir"], path)
+            dstdir = shellwrappers.quotepath(os.path.dirname(dst))
+            dst = shellwrappers.quotepath(dst)
+
+            cmd.append("mkdir -p " + dstdir + " && chmod a-w " + blob +
+                       " && { ln -f " + blob + " " + dst + " 2>/dev/null || "
+                       "cp -p " + blob + " " + dst + "; } && "
+                       "touch " + blob + ".used")
+
+        shellwrappers.sendtossh(job, [" && ".join(cmd)])
+
+    except (exceptions.SSHError, exceptions.RsyncError):
+
+        LOG.warning("The input cache on '%s' could not be used for job '%s', "
+                    "its files will be transferred as normal.",
+                    job["resource"], job["jobname"])
+
+        return []
+
+    return sorted(hashes)
+
+
+def _cacheupload(job, cachedir, missing, hashes):
+    """Upload files that are missing from the remote cache.
+
+    Symlinks named by hash stand in for the local files, rsync follows these
+    and so the file contents (and modification times) arrive in the cache.
+
+    """
+    localdir = os.path.expanduser(job["localworkdir"])
+    tmpdir = tempfile.mkdtemp(prefix="longbow-")
+
+    try:
+
+        for path in hashes:
+
+            if (hashes[path] in missing and not os.path.lexists(
+                    os.path.join(tmpdir, hashes[path]))):
+
+                os.symlink(os.path.abspath(os.path.join(localdir, path)),
+                           os.path.join(tmpdir, hashes[path]))
+
+        shellwrappers.sendtorsync(
+            job, tmpdir + "/",
+            job["user"] + "@" + job["host"] + ":" + cachedir + "/", "", "",
+            ["--copy-links"])
+
+    finally:
+
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def _cachecandidates(job):
+    """Find the files in a job directory that should go through the cache.
+
+    These are files at least CACHEMINSIZE in size that the upload masks would
+    let through. Paths are returned relative to the job directory.
+
+    """
+    localdir = os.path.expanduser(job["localworkdir"])
+    includes = []
+    excludes = []
+    candidates = []
+
+    # Masks work as in sendtorsync, includes only count alongside excludes.
+    if job["upload-exclude"] != "":
+
+        excludes = [a.strip() for a in job["upload-exclude"].split(",")]
+
+        if job["upload-include"] != "":
+
+            includes = [a.strip() for a in job["upload-include"].split(",")]
+
+    for root, dirs, files in os.walk(localdir):
+
+        rel = os.path.relpath(root, localdir)
+
+        # Don't go into directories the masks leave out.
+        dirs[:] = [a for a in dirs if _maskallows(
+            os.path.normpath(os.path.join(rel, a)), includes, excludes)]
+
+        for name in files:
+
+            path = os.path.normpath(os.path.join(rel, name))
+
+            if (os.path.isfile(os.path.join(localdir, path)) and
+                    os.path.getsize(os.path.join(localdir, path)) >=
+                    CACHEMINSIZE and _maskallows(path, includes, excludes)):
+
+                candidates.append(path)
+
+    return sorted(candidates)
+
+
+def _maskallows(path, includes, excludes):
+    """Check a path against rsync style masks, the first match wins."""
+    for mask in includes + excludes:
+
+        # Masks without a slash match on the name, otherwise the whole path.
+        if "/" in mask.strip("/"):
+
+            target = path
+
+        else:
+
+            target = os.path.basename(path)
+
+        if fnmatch.fnmatch(target, mask.strip("/")):
+
+            return mask in includes
+
+    return True
+
+
+def _filehash(path):
+    """Get the content hash of a local file, hashing it only if it changed."""
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+
+    with HASHLOCK:
+
+        if HASHINDEX["loaded"] is False:
+
+            _loadhashindex()
+
+        if key in HASHINDEX["files"]:
+
+            size, mtime, digest = HASHINDEX["files"][key]
+
+            if size == stat.st_size and mtime == repr(stat.st_mtime):
+
+                return digest
+
+    sha = hashlib.sha256()
+
+    with open(path, "rb") as hashfile:
+
+        for block in iter(lambda: hashfile.read(1048576), b""):
+
+            sha.update(block)
+
+    with HASHLOCK:
+
+        HASHINDEX["files"][key] = (stat.st_size, repr(stat.st_mtime),
+                                   sha.hexdigest())
+        HASHINDEX["changed"] = True
+
+    return sha.hexdigest()
+
+
+def _loadhashindex():
+    """Load the hash index from ~/.longbow/hashindex."""
+    HASHINDEX["loaded"] = True
+    indexfile = os.path.join(os.path.expanduser("~/.longbow"), "hashindex")
+
+    if not os.path.isfile(indexfile):
+
+        return
+
+    try:
+
+        with open(indexfile, "r") as index:
+
+            for line in index:
+
+                entry = line.rstrip("\n").split("\t")
+
+                if len(entry) == 4:
+
+                    HASHINDEX["files"][entry[3]] = (int(entry[1]), entry[2],
+                                                    entry[0])
+
+    except (IOError, OSError, ValueError):
+
+        LOG.debug("Could not read the hash index '%s', files will be hashed "
+                  "again.", indexfile)
+
+
+def _savehashindex():
+    """Save the hash index to ~/.longbow/hashindex if it has changed."""
+    basepath = os.path.expanduser("~/.longbow")
+    indexfile = os.path.join(basepath, "hashindex")
+
+    with HASHLOCK:
+
+        if HASHINDEX["changed"] is False or not os.path.isdir(basepath):
+
+            return
+
+        # Write to a temporary file first so a crash can't leave half a file.
+        try:
+
+            with open(indexfile + ".tmp", "w") as index:
+
+                for key in sorted(HASHINDEX["files"]):
+
+                    size, mtime, digest = HASHINDEX["files"][key]
+                    index.write("\t".join([digest, str(size), mtime, key]) +
+                                "\n")
+
+            os.rename(indexfile + ".tmp", indexfile)
+
+            HASHINDEX["changed"] = False
+
+        except (IOError, OSError):
+
+            LOG.debug("Could not write the hash index '%s'", indexfile)
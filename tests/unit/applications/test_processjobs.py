@@ -253,6 +253,46 @@ def test_processjobs_include(m_validator, m_proccommandline):
         "test.file, input, coords, topol"
 
 
+@mock.patch('longbow.applications._proccommandline')
+@mock.patch('longbow.applications._flagvalidator')
+def test_processjobs_progressfiles(m_validator, m_proccommandline):
+
+    """Test that the progress files come from the plugin unless the user has
+    provided their own.
+    """
+
+    jobs = {
+        "jobone": {
+            "executableargs": ["-i", "input", "-c", "coords", "-p", "topol"],
+            "localworkdir": os.path.join(os.getcwd(),
+                                         "tests/standards/jobs/single"),
+            "executable": "pmemd.MPI",
+            "upload-include": "",
+            "upload-exclude": "",
+            "download-running": ""
+        }
+    }
+
+    m_proccommandline.side_effect = _proccommandline
+
+    m_validator.return_value = None
+
+    processjobs(jobs)
+
+    assert jobs["jobone"]["download-running"] == \
+        "mdinfo, mdout, *.mdout, *.out, *.log"
+
+    jobs["jobone"]["executableargs"] = ["-i", "input", "-c", "coords", "-p",
+                                        "topol"]
+    jobs["jobone"]["localworkdir"] = os.path.join(
+        os.getcwd(), "tests/standards/jobs/single")
+    jobs["jobone"]["download-running"] = "md.out"
+
+    processjobs(jobs)
+
+    assert jobs["jobone"]["download-running"] == "md.out"
+
+
 def test_processjobs_genericexec1():
 
     """
@@ -0,0 +1,109 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the loadrecovery method within the
+configuration module.
+"""
+
+import json
+
+from longbow.configuration import loadrecovery, saveini, saverecovery
+
+
+def test_loadrecovery_journal(tmpdir):
+
+    """
+    Test that the changes in the journal are applied over the recovery file.
+    """
+
+    recfile = str(tmpdir.join("rec.file"))
+    jobs = {
+        "lbowconf": {"recoveryfile": "rec.file"},
+        "jobone": {"jobid": "1", "laststatus": "Queued"},
+        "jobtwo": {"jobid": "2", "laststatus": "Queued"}
+    }
+
+    saverecovery(recfile, jobs)
+
+    jobs["jobone"]["laststatus"] = "Running"
+    saverecovery(recfile, jobs)
+    jobs["jobone"]["laststatus"] = "Finished"
+    jobs["jobtwo"]["laststatus"] = "Running"
+    saverecovery(recfile, jobs)
+
+    assert loadrecovery(recfile) == {
+        "lbowconf": {"recoveryfile": "rec.file"},
+        "jobone": {"jobid": "1", "laststatus": "Finished"},
+        "jobtwo": {"jobid": "2", "laststatus": "Running"}
+    }
+
+
+def test_loadrecovery_stale(tmpdir):
+
+    """
+    Test that changes already in the recovery file and lines that were only
+    part written are left out.
+    """
+
+    recfile = str(tmpdir.join("rec.file"))
+
+    saveini(recfile, {
+        "lbowconf": {"recovery-sequence": "2"},
+        "jobone": {"laststatus": "Finished"}
+    })
+
+    tmpdir.join("rec.file.journal").write("\n".join([
+        json.dumps({"sequence": 2, "section": "jobone",
+                    "params": {"laststatus": "Running"}}),
+        json.dumps({"sequence": 3, "section": "jobone",
+                    "params": {"laststatus": "Complete"}}),
+        '{"sequence": 4, "section": "jobone", "par']))
+
+    assert loadrecovery(recfile) == {
+        "lbowconf": {},
+        "jobone": {"laststatus": "Complete"}
+    }
+
+
+def test_loadrecovery_nojournal(tmpdir):
+
+    """
+    Test that recovery files from before the journal still load.
+    """
+
+    recfile = str(tmpdir.join("rec.file"))
+
+    saveini(recfile, {"jobone": {"laststatus": "Running"}})
+
+    assert loadrecovery(recfile) == {"jobone": {"laststatus": "Running"}}
@@ -34,7 +34,8 @@
 This testing module contains the tests for the configuration module methods.
 """
 
-from longbow.configuration import _processconfigsparams
+from longbow.configuration import JOBTEMPLATE, _processconfigsparams
+from longbow.jobset import JobRecord, JobSet
 
 
 def test_processconfigsparams_test1():
@@ -395,3 +396,47 @@ def test_processconfigsparams_test3():
 
     assert jobs["jobone"]["cores"] == "48"
     assert jobs["jobtwo"]["cores"] == "96"
+
+
+def test_processconfigsparams_layers():
+
+    """
+    Test that job records get the same priority ordering, with the hosts file
+    values shared rather than copied into each job.
+    """
+
+    jobs = JobSet()
+    jobs["jobone"] = JobRecord({"resource": "host1"}, (JOBTEMPLATE,))
+    jobs["jobtwo"] = JobRecord({"resource": "host1"}, (JOBTEMPLATE,))
+
+    parameters = {
+        "cores": "48",
+        "executable": "",
+        "resource": ""
+    }
+
+    hostdata = {
+        "host1": {
+            "executable": "host1.exec",
+            "queue": "",
+            "user": "juan"
+        }
+    }
+
+    jobdata = {
+        "jobone": {
+            "executable": "job1.exec"
+        },
+        "jobtwo": {}
+    }
+
+    _processconfigsparams(jobs, parameters, jobdata, hostdata)
+
+    assert jobs["jobone"]["cores"] == "48"
+    assert jobs["jobone"]["executable"] == "job1.exec"
+    assert jobs["jobtwo"]["executable"] == "host1.exec"
+    assert jobs["jobtwo"]["user"] == "juan"
+    assert jobs["jobtwo"]["queue"] == ""
+    assert jobs["jobtwo"]["maxtime"] == JOBTEMPLATE["maxtime"]
+    assert sorted(jobs["jobone"]) == sorted(JOBTEMPLATE)
+    assert "user" not in jobs["jobtwo"]._values
@@ -0,0 +1,132 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the saverecovery method within the
+configuration module.
+"""
+
+import json
+
+import longbow.configuration as configuration
+from longbow.configuration import loadconfigs, saverecovery
+
+
+def _jobs():
+
+    return {
+        "lbowconf": {
+            "recoveryfile": "rec.file",
+            "update": False
+        },
+        "jobone": {
+            "jobid": "1",
+            "laststatus": "Queued"
+        },
+        "jobtwo": {
+            "jobid": "2",
+            "laststatus": "Queued"
+        }
+    }
+
+
+def test_saverecovery_journal(tmpdir):
+
+    """
+    Test that the recovery file is written in full the first time, then only
+    the jobs that change are added to the journal.
+    """
+
+    recfile = str(tmpdir.join("rec.file"))
+    jobs = _jobs()
+
+    saverecovery(recfile, jobs)
+
+    _, _, params = loadconfigs(recfile)
+
+    assert params["jobone"] == {"jobid": "1", "laststatus": "Queued"}
+    assert params["lbowconf"]["recovery-sequence"] == "0"
+    assert tmpdir.join("rec.file.journal").read() == ""
+
+    # Nothing changed, nothing written.
+    saverecovery(recfile, jobs)
+
+    assert tmpdir.join("rec.file.journal").read() == ""
+
+    jobs["jobtwo"]["laststatus"] = "Running"
+
+    saverecovery(recfile, jobs)
+
+    lines = tmpdir.join("rec.file.journal").read().splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"sequence": 1, "section": "jobtwo",
+         "params": {"laststatus": "Running"}}]
+
+    # The recovery file itself is left alone.
+    _, _, params = loadconfigs(recfile)
+
+    assert params["jobtwo"]["laststatus"] == "Queued"
+
+
+def test_saverecovery_compact(tmpdir):
+
+    """
+    Test that the recovery file is written in full again once the journal
+    holds more changes than there are jobs.
+    """
+
+    recfile = str(tmpdir.join("rec.file"))
+    jobs = _jobs()
+
+    saverecovery(recfile, jobs)
+
+    for status in ("Running", "Finished", "Complete"):
+
+        jobs["jobone"]["laststatus"] = status
+
+        saverecovery(recfile, jobs)
+
+    assert configuration.RECOVERY[recfile]["changes"] == 3
+
+    jobs["jobtwo"]["laststatus"] = "Running"
+
+    saverecovery(recfile, jobs)
+
+    _, _, params = loadconfigs(recfile)
+
+    assert params["jobone"]["laststatus"] == "Complete"
+    assert params["jobtwo"]["laststatus"] == "Running"
+    assert params["lbowconf"]["recovery-sequence"] == "3"
+    assert tmpdir.join("rec.file.journal").read() == ""
+    assert not tmpdir.join("rec.file.tmp").check()
@@ -361,11 +361,10 @@ def test_main_test8(m_isfile, m_longbowmain, m_recovery):
 
 
 @mock.patch('longbow.staging.cleanup')
-@mock.patch('longbow.staging.stage_downstream')
-@mock.patch('longbow.scheduling.delete')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -374,7 +373,7 @@ def test_main_test8(m_isfile, m_longbowmain, m_recovery):
 @mock.patch('longbow.configuration.processconfigs')
 @mock.patch('os.path.isfile')
 def test_main_test9(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
-                    m_procjob, m_schedprep, m_stagup, m_sub, m_mon, m_del,
+                    m_procjob, m_schedprep, m_sub, m_mon, m_del,
                     m_stagdown, m_clean):
 
     """Test the keyboard interrupt feature with running jobs."""
@@ -397,20 +396,20 @@ def test_main_test9(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
     assert m_mon.call_count == 1
-    assert m_del.call_count == 2
-    assert m_stagdown.call_count == 2
+    assert m_del.call_count == 1
+    assert len(m_del.call_args[0][1]) == 2
+    assert m_stagdown.call_count == 1
+    assert len(m_stagdown.call_args[0][1]) == 2
     assert m_clean.call_count == 1
 
 
 @mock.patch('longbow.staging.cleanup')
-@mock.patch('longbow.staging.stage_downstream')
-@mock.patch('longbow.scheduling.delete')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -419,7 +418,7 @@ def test_main_test9(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.configuration.processconfigs')
 @mock.patch('os.path.isfile')
 def test_main_test10(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
-                     m_procjob, m_schedprep, m_stagup, m_sub, m_mon, m_del,
+                     m_procjob, m_schedprep, m_sub, m_mon, m_del,
                      m_stagdown, m_clean):
 
     """Test the keyboard interrupt feature with running jobs."""
@@ -442,20 +441,64 @@ def test_main_test10(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
     assert m_mon.call_count == 1
     assert m_del.call_count == 0
-    assert m_stagdown.call_count == 2
+    assert m_stagdown.call_count == 1
+    assert len(m_stagdown.call_args[0][1]) == 2
     assert m_clean.call_count == 1
 
 
 @mock.patch('longbow.staging.cleanup')
-@mock.patch('longbow.staging.stage_downstream')
-@mock.patch('longbow.scheduling.delete')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
+@mock.patch('longbow.scheduling.monitor')
+@mock.patch('longbow.scheduling.submit')
+@mock.patch('longbow.scheduling.prepare')
+@mock.patch('longbow.applications.processjobs')
+@mock.patch('longbow.applications.checkapp')
+@mock.patch('longbow.scheduling.checkenv')
+@mock.patch('longbow.shellwrappers.checkconnections')
+@mock.patch('longbow.configuration.processconfigs')
+@mock.patch('os.path.isfile')
+def test_main_fetchfailed(m_isfile, m_procconf, m_testcon, m_testenv,
+                          m_testapp, m_procjob, m_schedprep, m_sub, m_mon,
+                          m_del, m_stagdown, m_clean):
+
+    """Test that nothing is cleaned up if any job could not be fetched."""
+
+    m_isfile.return_value = True
+
+    args = ["longbow", "--job", "testjob", "--resource", "big-machine",
+            "--debug"]
+
+    m_procconf.side_effect = _finishedjobs
+    m_mon.side_effect = KeyboardInterrupt
+    m_stagdown.return_value = ["job2"]
+
+    with mock.patch('sys.argv', args):
+
+        launcher()
+
+    assert m_procconf.call_count == 1
+    assert m_testcon.call_count == 1
+    assert m_testenv.call_count == 1
+    assert m_testapp.call_count == 1
+    assert m_procjob.call_count == 1
+    assert m_schedprep.call_count == 1
+    assert m_sub.call_count == 1
+    assert m_mon.call_count == 1
+    assert m_del.call_count == 0
+    assert m_stagdown.call_count == 1
+    assert len(m_stagdown.call_args[0][1]) == 2
+    assert m_clean.call_count == 0
+
+
+@mock.patch('longbow.staging.cleanup')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -464,7 +507,7 @@ def test_main_test10(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.configuration.processconfigs')
 @mock.patch('os.path.isfile')
 def test_main_test11(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
-                     m_procjob, m_schedprep, m_stagup, m_sub, m_mon, m_del,
+                     m_procjob, m_schedprep, m_sub, m_mon, m_del,
                      m_stagdown, m_clean):
 
     """Test the keyboard interrupt feature with complete jobs."""
@@ -487,20 +530,19 @@ def test_main_test11(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
     assert m_mon.call_count == 1
     assert m_del.call_count == 0
-    assert m_stagdown.call_count == 2
+    assert m_stagdown.call_count == 1
+    assert len(m_stagdown.call_args[0][1]) == 2
     assert m_clean.call_count == 1
 
 
 @mock.patch('longbow.staging.cleanup')
-@mock.patch('longbow.staging.stage_downstream')
-@mock.patch('longbow.scheduling.delete')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -509,7 +551,7 @@ def test_main_test11(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.configuration.processconfigs')
 @mock.patch('os.path.isfile')
 def test_main_test12(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
-                     m_procjob, m_schedprep, m_stagup, m_sub, m_mon, m_del,
+                     m_procjob, m_schedprep, m_sub, m_mon, m_del,
                      m_stagdown, m_clean):
 
     """Test the disconnect feature with complete jobs."""
@@ -530,7 +572,6 @@ def test_main_test12(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
     assert m_mon.call_count == 0
     assert m_del.call_count == 0
@@ -539,11 +580,10 @@ def test_main_test12(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
 
 
 @mock.patch('longbow.staging.cleanup')
-@mock.patch('longbow.staging.stage_downstream')
-@mock.patch('longbow.scheduling.delete')
+@mock.patch('longbow.staging.stage_downstream_many')
+@mock.patch('longbow.scheduling.delete_many')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -552,7 +592,7 @@ def test_main_test12(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.configuration.processconfigs')
 @mock.patch('os.path.isfile')
 def test_main_test13(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
-                     m_procjob, m_schedprep, m_stagup, m_sub, m_mon, m_del,
+                     m_procjob, m_schedprep, m_sub, m_mon, m_del,
                      m_stagdown, m_clean):
 
     """Test the keyboard interrupt feature with complete jobs."""
@@ -575,7 +615,6 @@ def test_main_test13(m_isfile, m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
     assert m_mon.call_count == 1
     assert m_del.call_count == 0
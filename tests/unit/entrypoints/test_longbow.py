@@ -50,7 +50,6 @@ from longbow.entrypoints import longbow
 
 @mock.patch('longbow.staging.cleanup')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -58,7 +57,7 @@ from longbow.entrypoints import longbow
 @mock.patch('longbow.shellwrappers.checkconnections')
 @mock.patch('longbow.configuration.processconfigs')
 def test_longbowmain_disconnect(m_procconf, m_testcon, m_testenv, m_testapp,
-                                m_procjob, m_schedprep, m_stagup, m_sub,
+                                m_procjob, m_schedprep, m_sub,
                                 m_clean):
 
     """
@@ -80,15 +79,14 @@ def test_longbowmain_disconnect(m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
+    assert m_sub.call_args[1]["stage"] is True
     assert m_clean.call_count == 0
 
 
 @mock.patch('longbow.staging.cleanup')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -96,7 +94,7 @@ def test_longbowmain_disconnect(m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.shellwrappers.checkconnections')
 @mock.patch('longbow.configuration.processconfigs')
 def test_longbowmain_testcalls1(m_procconf, m_testcon, m_testenv, m_testapp,
-                                m_procjob, m_schedprep, m_stagup, m_sub, m_mon,
+                                m_procjob, m_schedprep, m_sub, m_mon,
                                 m_clean):
 
     """
@@ -117,8 +115,8 @@ def test_longbowmain_testcalls1(m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 1
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
+    assert m_sub.call_args[1]["stage"] is True
     assert m_mon.call_count == 1
     assert m_clean.call_count == 1
 
@@ -126,7 +124,6 @@ def test_longbowmain_testcalls1(m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.staging.cleanup')
 @mock.patch('longbow.scheduling.monitor')
 @mock.patch('longbow.scheduling.submit')
-@mock.patch('longbow.staging.stage_upstream')
 @mock.patch('longbow.scheduling.prepare')
 @mock.patch('longbow.applications.processjobs')
 @mock.patch('longbow.applications.checkapp')
@@ -134,7 +131,7 @@ def test_longbowmain_testcalls1(m_procconf, m_testcon, m_testenv, m_testapp,
 @mock.patch('longbow.shellwrappers.checkconnections')
 @mock.patch('longbow.configuration.processconfigs')
 def test_longbowmain_testcalls2(m_procconf, m_testcon, m_testenv, m_testapp,
-                                m_procjob, m_schedprep, m_stagup, m_sub, m_mon,
+                                m_procjob, m_schedprep, m_sub, m_mon,
                                 m_clean):
 
     """
@@ -155,8 +152,8 @@ def test_longbowmain_testcalls2(m_procconf, m_testcon, m_testenv, m_testapp,
     assert m_testapp.call_count == 0
     assert m_procjob.call_count == 1
     assert m_schedprep.call_count == 1
-    assert m_stagup.call_count == 1
     assert m_sub.call_count == 1
+    assert m_sub.call_args[1]["stage"] is True
     assert m_mon.call_count == 1
     assert m_clean.call_count == 1
 
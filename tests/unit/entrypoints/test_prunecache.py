@@ -0,0 +1,100 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the prunecache method within the
+entrypoints module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.entrypoints import prunecache
+
+
+@mock.patch('longbow.staging.prunecache')
+@mock.patch('longbow.configuration.loadconfigs')
+def test_prunecache_all(mock_load, mock_prune):
+
+    """
+    Test that every usable resource in the hosts file gets pruned.
+    """
+
+    mock_load.return_value = ([], ["machine1", "machine2", "machine3"], {
+        "machine1": {"host": "m1", "remoteworkdir": "/work"},
+        "machine2": {"host": "m2", "remoteworkdir": "/work"},
+        "machine3": {"host": "m3"}})
+
+    prunecache({"hosts": "hosts.conf", "prunecache": "30", "resource": ""})
+
+    assert mock_prune.call_count == 2
+    assert mock_prune.call_args[0][1] == 30
+
+
+@mock.patch('longbow.staging.prunecache')
+@mock.patch('longbow.configuration.loadconfigs')
+def test_prunecache_resource(mock_load, mock_prune):
+
+    """
+    Test that only the given resource is pruned.
+    """
+
+    mock_load.return_value = ([], ["machine1", "machine2"], {
+        "machine1": {"host": "m1", "remoteworkdir": "/work"},
+        "machine2": {"host": "m2", "remoteworkdir": "/work"}})
+
+    prunecache({"hosts": "hosts.conf", "prunecache": "7",
+                "resource": "machine2"})
+
+    assert mock_prune.call_count == 1
+    assert mock_prune.call_args[0][0]["host"] == "m2"
+
+
+def test_prunecache_baddays():
+
+    """
+    Test that a bad number of days is refused.
+    """
+
+    with pytest.raises(exceptions.CommandlineargsError):
+
+        prunecache({"hosts": "hosts.conf", "prunecache": "old",
+                    "resource": ""})
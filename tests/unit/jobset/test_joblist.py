@@ -0,0 +1,80 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the joblist method within the
+jobset module.
+"""
+
+from longbow.jobset import JobSet, joblist
+
+
+def _jobs():
+
+    return {
+        "lbowconf": {},
+        "jobone": {"laststatus": "Queued", "resource": "lab"},
+        "jobtwo": {"laststatus": "Running", "resource": "lab"},
+        "jobthree": {"resource": "hpc"}
+    }
+
+
+def test_joblist_dict():
+
+    """
+    Test that plain dictionaries are still listed correctly.
+    """
+
+    jobs = _jobs()
+
+    assert sorted(joblist(jobs)) == ["jobone", "jobthree", "jobtwo"]
+    assert joblist(jobs, ["Running"]) == ["jobtwo"]
+    assert sorted(joblist(jobs, resources=["lab"])) == ["jobone", "jobtwo"]
+    assert joblist(jobs, ["Queued"], ["hpc"]) == []
+
+
+def test_joblist_jobset():
+
+    """
+    Test that a JobSet gives the same lists as a plain dictionary.
+    """
+
+    jobs = _jobs()
+    indexed = JobSet(jobs)
+
+    for states in (None, ["Running"], ["Queued", "Running"], ["Finished"]):
+
+        for resources in (None, ["lab"], ["hpc"]):
+
+            assert (sorted(joblist(indexed, states, resources)) ==
+                    sorted(joblist(jobs, states, resources)))
@@ -0,0 +1,130 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the JobRecord class within the
+jobset module.
+"""
+
+import pytest
+
+from longbow.jobset import JobRecord, JobSet, getint, inherit
+
+
+def test_jobrecord_layers():
+
+    """
+    Test that parameters set for the job come before those in its layers,
+    which are looked at in turn.
+    """
+
+    template = {"cores": "24", "maxtime": "24:00", "queue": ""}
+    host = {"queue": "short"}
+    job = JobRecord({"cores": "48"}, (template,))
+
+    inherit(job, host)
+
+    assert job["cores"] == "48"
+    assert job["queue"] == "short"
+    assert job["maxtime"] == "24:00"
+    assert len(job) == 3
+    assert dict(job) == {"cores": "48", "maxtime": "24:00", "queue": "short"}
+
+    job["queue"] = "long"
+
+    assert job["queue"] == "long"
+    assert host["queue"] == "short"
+
+    del job["queue"]
+
+    assert job["queue"] == "short"
+
+    with pytest.raises(KeyError):
+
+        job["missing"]
+
+
+def test_jobrecord_getint():
+
+    """
+    Test that integer parameters are parsed once, and again once changed.
+    """
+
+    job = JobRecord({"cores": "48"})
+
+    assert job.getint("cores") == 48
+    assert job._typed == {"cores": 48}
+
+    job["cores"] = "96"
+
+    assert getint(job, "cores") == 96
+    assert getint({"cores": "12"}, "cores") == 12
+
+
+def test_jobrecord_jobset():
+
+    """
+    Test that a JobSet indexes the layered parameters of its jobs.
+    """
+
+    hosts = {"resource": "lab"}
+    jobs = JobSet()
+    jobs["jobone"] = JobRecord({"laststatus": "Queued"}, (hosts,))
+
+    assert jobs.select(["Queued"], ["lab"]) == ["jobone"]
+
+    inherit(jobs["jobone"], {"resource": "hpc"})
+
+    assert jobs.select(resources=["hpc"]) == ["jobone"]
+    assert jobs.select(resources=["lab"]) == []
+
+    # Records already in a JobSet are copied along with their layers.
+    other = JobSet(jobs)
+
+    other["jobone"]["laststatus"] = "Running"
+
+    assert jobs.select(["Queued"]) == ["jobone"]
+    assert other.select(["Running"], ["hpc"]) == ["jobone"]
+
+
+def test_jobrecord_inherit():
+
+    """
+    Test that plain dictionaries get a copy of the parameters they have.
+    """
+
+    job = {"cores": "24", "queue": ""}
+
+    inherit(job, {"queue": "short"})
+
+    assert job == {"cores": "24", "queue": "short"}
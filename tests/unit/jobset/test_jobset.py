@@ -0,0 +1,109 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the JobSet class within the jobset
+module.
+"""
+
+from longbow.jobset import JobSet
+
+
+def _jobs():
+
+    return {
+        "lbowconf": {"recoveryfile": "rec.file"},
+        "jobone": {"laststatus": "Queued", "resource": "lab"},
+        "jobtwo": {"laststatus": "Running", "resource": "lab"},
+        "jobthree": {"laststatus": "Running", "resource": "hpc"}
+    }
+
+
+def test_jobset_dict():
+
+    """
+    Test that a JobSet holds the same data as the dictionary it was made from.
+    """
+
+    jobs = JobSet(_jobs())
+
+    assert jobs == _jobs()
+    assert "lbowconf" in jobs
+    assert jobs.conf == {"recoveryfile": "rec.file"}
+    assert jobs.select() == ["jobone", "jobtwo", "jobthree"]
+    assert jobs.count() == 3
+
+
+def test_jobset_select():
+
+    """
+    Test that jobs are selected by state and resource, in the order they were
+    added.
+    """
+
+    jobs = JobSet(_jobs())
+
+    assert jobs.select(["Running"]) == ["jobtwo", "jobthree"]
+    assert jobs.select(resources=["lab"]) == ["jobone", "jobtwo"]
+    assert jobs.select(["Running"], ["lab"]) == ["jobtwo"]
+    assert jobs.select(["Finished"]) == []
+    assert jobs.count(["Queued", "Running"]) == 3
+
+
+def test_jobset_transitions():
+
+    """
+    Test that the indexes follow changes to the jobs.
+    """
+
+    jobs = JobSet(_jobs())
+
+    jobs["jobone"]["laststatus"] = "Running"
+    jobs["jobtwo"].update({"resource": "hpc"})
+    jobs["jobfour"] = {"resource": "lab"}
+    jobs["jobfour"].setdefault("laststatus", "Waiting Submission")
+
+    assert jobs.select(["Running"], ["hpc"]) == ["jobtwo", "jobthree"]
+    assert jobs.select(["Queued"]) == []
+    assert jobs.select(resources=["lab"]) == ["jobone", "jobfour"]
+
+    del jobs["jobone"]
+    jobs.pop("jobthree")
+
+    assert jobs.select(["Running"]) == ["jobtwo"]
+    assert jobs.count() == 2
+
+    jobs["jobtwo"] = {"laststatus": "Finished", "resource": "lab"}
+
+    assert jobs.select(["Running"]) == []
+    assert jobs.select(["Finished"], ["lab"]) == ["jobtwo"]
@@ -0,0 +1,188 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the byresource method within the
+parallel module.
+"""
+
+import threading
+import time
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.parallel import byresource
+
+
+def test_byresource_results():
+
+    """
+    Test that every item is run and its result returned.
+    """
+
+    jobs = {
+        "lbowconf": {},
+        "jobone": {"resource": "machine1"},
+        "jobtwo": {"resource": "machine2"}
+    }
+
+    tasks = {"machine1": ["a", "b", "c"], "machine2": ["d"]}
+
+    results = byresource(jobs, tasks, lambda item: item.upper())
+
+    assert results == {"a": "A", "b": "B", "c": "C", "d": "D"}
+
+
+def test_byresource_concurrent():
+
+    """
+    Test that resources are worked on at the same time.
+    """
+
+    jobs = {
+        "jobone": {"resource": "machine1"},
+        "jobtwo": {"resource": "machine2"},
+        "jobthree": {"resource": "machine3"}
+    }
+
+    tasks = {"machine1": ["a"], "machine2": ["b"], "machine3": ["c"]}
+    barrier = []
+    lock = threading.Lock()
+
+    # Each call waits until all three have started, which can only happen if
+    # they run at the same time.
+    def _wait(item):
+
+        with lock:
+
+            barrier.append(item)
+
+        start = time.time()
+
+        while len(barrier) < 3 and time.time() - start < 5:
+
+            time.sleep(0.01)
+
+        return len(barrier)
+
+    results = byresource(jobs, tasks, _wait)
+
+    assert results == {"a": 3, "b": 3, "c": 3}
+
+
+def test_byresource_workers():
+
+    """
+    Test that the number of workers on a resource is limited by the
+    resource-workers parameter.
+    """
+
+    jobs = {
+        "jobone": {"resource": "machine1", "resource-workers": "2"}
+    }
+
+    tasks = {"machine1": ["a", "b", "c", "d", "e", "f"]}
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def _work(item):
+
+        with lock:
+
+            running.append(item)
+            peak.append(len(running))
+
+        time.sleep(0.05)
+
+        with lock:
+
+            running.remove(item)
+
+    byresource(jobs, tasks, _work)
+
+    assert max(peak) == 2
+
+
+def test_byresource_error():
+
+    """
+    Test that an exception raised by a call is raised again at the end.
+    """
+
+    jobs = {
+        "jobone": {"resource": "machine1"},
+        "jobtwo": {"resource": "machine2"}
+    }
+
+    tasks = {"machine1": ["a"], "machine2": ["b"]}
+
+    def _fail(item):
+
+        if item == "b":
+
+            raise exceptions.ExecutableError("Executable check - failed.")
+
+    with pytest.raises(exceptions.ExecutableError):
+
+        byresource(jobs, tasks, _fail)
+
+
+def test_byresource_keepgoing():
+
+    """
+    Test that the remaining items are still run if asked to carry on after an
+    exception.
+    """
+
+    jobs = {
+        "jobone": {"resource": "machine1"}
+    }
+
+    tasks = {"machine1": ["a", "b", "c"]}
+    done = []
+
+    def _fail(item):
+
+        done.append(item)
+
+        if item == "a":
+
+            raise exceptions.StagingError("Staging Error")
+
+    with pytest.raises(exceptions.StagingError):
+
+        byresource(jobs, tasks, _fail, stoponerror=False)
+
+    assert done == ["a", "b", "c"]
@@ -0,0 +1,76 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the groupbyresource method within
+the parallel module.
+"""
+
+from longbow.parallel import groupbyresource
+
+
+def test_groupbyresource_all():
+
+    """
+    Test that all jobs are grouped and the lbowconf entry is skipped.
+    """
+
+    jobs = {
+        "lbowconf": {},
+        "jobone": {"resource": "machine1"},
+        "jobtwo": {"resource": "machine2"},
+        "jobthree": {"resource": "machine1"}
+    }
+
+    resources = groupbyresource(jobs)
+
+    assert sorted(resources) == ["machine1", "machine2"]
+    assert sorted(resources["machine1"]) == ["jobone", "jobthree"]
+    assert resources["machine2"] == ["jobtwo"]
+
+
+def test_groupbyresource_joblist():
+
+    """
+    Test that only the jobs asked for are grouped, in the order given.
+    """
+
+    jobs = {
+        "jobone": {"resource": "machine1"},
+        "jobtwo": {"resource": "machine2"},
+        "jobthree": {"resource": "machine1"}
+    }
+
+    resources = groupbyresource(jobs, ["jobthree", "jobone"])
+
+    assert resources == {"machine1": ["jobthree", "jobone"]}
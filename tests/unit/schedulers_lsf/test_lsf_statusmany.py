@@ -0,0 +1,139 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This test module contains tests for the LSF scheduler plugin.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+from longbow.schedulers.lsf import status_many
+
+out = ('{"COMMAND": "bjobs", "JOBS": 3, "RECORDS": ['
+       '{"JOBID": "953631", "STAT": "PEND"}, '
+       '{"JOBID": "953711", "STAT": "RUN"}, '
+       '{"ERROR": "Job <953712> is not found"}]}')
+
+table = ("953631  scarf45 PEND  scarf      scarf.rl.ac             4t1m1b     Feb 26 13:52\n"
+         "953711  scarf45 RUN   scarf      scarf.rl.ac             1t2m3b     Feb 26 14:32\n")
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_json(mock_ssh):
+
+    """
+    Test that the states of all jobs come back from one json query.
+    """
+
+    jobs = [{"user": "test", "jobid": "953631"},
+            {"user": "test", "jobid": "953711"},
+            {"user": "test", "jobid": "953712"}]
+
+    mock_ssh.return_value = (out, "", 0)
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 1
+    assert "953631 953711 953712" in mock_ssh.call_args[0][1][0]
+    assert output == {"953631": "Queued",
+                      "953711": "Running",
+                      "953712": "Finished"}
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_nojson(mock_ssh):
+
+    """
+    Test the fall back to the user table when json is not supported.
+    """
+
+    jobs = [{"user": "test", "jobid": "953631"},
+            {"user": "test", "jobid": "953711"},
+            {"user": "test", "jobid": "953712"}]
+
+    mock_ssh.side_effect = [("", "bjobs: illegal option -- json", 0),
+                            (table, "", 0)]
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 2
+    assert output == {"953631": "Queued",
+                      "953711": "Running",
+                      "953712": "Finished"}
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_done(mock_ssh):
+
+    """
+    Test that jobs that ended properly but are still listed are finished.
+    """
+
+    jobs = [{"user": "test", "jobid": "953631"},
+            {"user": "test", "jobid": "953711"}]
+
+    mock_ssh.return_value = (
+        '{"COMMAND": "bjobs", "JOBS": 2, "RECORDS": ['
+        '{"JOBID": "953631", "STAT": "DONE"}, '
+        '{"JOBID": "953711", "STAT": "RUN"}]}', "", 0)
+
+    output = status_many(jobs)
+
+    assert output == {"953631": "Finished",
+                      "953711": "Running"}
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_exit(mock_ssh):
+
+    """
+    Test that jobs that ended in error but are still listed are finished.
+    """
+
+    jobs = [{"user": "test", "jobid": "953631"},
+            {"user": "test", "jobid": "953711"}]
+
+    mock_ssh.return_value = (
+        '{"COMMAND": "bjobs", "JOBS": 2, "RECORDS": ['
+        '{"JOBID": "953631", "STAT": "PEND"}, '
+        '{"JOBID": "953711", "STAT": "EXIT"}]}', "", 0)
+
+    output = status_many(jobs)
+
+    assert output == {"953631": "Queued",
+                      "953711": "Finished"}
@@ -0,0 +1,114 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This test module contains tests for the pbs scheduler plugin.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.schedulers.pbs import delete_many
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_deletemany_test1(mock_ssh):
+
+    """
+    Test that all of the jobs are deleted with a single command.
+    """
+
+    jobs = [
+        {"jobid": "12345", "replicates": "1"},
+        {"jobid": "12346", "replicates": "1"},
+        {"jobid": "12347", "replicates": "1"}
+    ]
+
+    mock_ssh.return_value = ("Success", "", 0)
+
+    output = delete_many(jobs)
+
+    args = mock_ssh.call_args[0][1]
+
+    assert output == "Success"
+    assert mock_ssh.call_count == 1
+    assert mock_ssh.call_args[0][0] is jobs[0]
+    assert " ".join(args) == "qdel 12345 12346 12347"
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_deletemany_except1(mock_ssh):
+
+    """
+    Test if jobdelete exception is triggered based on output from scheduler.
+    """
+
+    jobs = [
+        {"jobid": "12345", "replicates": "1"},
+        {"jobid": "12346", "replicates": "1"}
+    ]
+
+    mock_ssh.side_effect = exceptions.SSHError(
+        "Error", ("out", "", 0))
+
+    with pytest.raises(exceptions.JobdeleteError):
+
+        delete_many(jobs)
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_deletemany_replicates(mock_ssh):
+
+    """
+    Test that replicate jobs are deleted as whole job arrays.
+    """
+
+    jobs = [
+        {"jobid": "12345", "replicates": "1"},
+        {"jobid": "12346", "replicates": "5"}
+    ]
+
+    mock_ssh.return_value = ("Success", "", 0)
+
+    delete_many(jobs)
+
+    args = mock_ssh.call_args[0][1]
+
+    assert " ".join(args) == "qdel 12345 12346[]"
@@ -0,0 +1,125 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This test module contains tests for the PBS scheduler plugin.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.exceptions as exceptions
+from longbow.schedulers.pbs import status_many
+
+out = ('{"timestamp": 1500000000, "pbs_version": "14.1.0", '
+       '"pbs_server": "sdb", "Jobs": {'
+       '"3530460.sdb": {"job_state": "Q"}, '
+       '"3530461[].sdb": {"job_state": "B"}, '
+       '"3530462.sdb": {"job_state": "R"}}}')
+
+table = ("Job ID          Username Queue    Jobname    SessID NDS TSK Memory Time  S Time \n"
+         "--------------- -------- -------- ---------- ------ --- --- ------ ----- - -----\n"
+         "3530460.sdb     katrine  long     Uio67         --    8 192    --  48:00 Q   -- \n"
+         "3530462.sdb     katrine  long     IRM10         --    8 192    --  48:00 R   -- \n")
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_json(mock_ssh):
+
+    """
+    Test that the states of all jobs come back from one json query.
+    """
+
+    jobs = [{"user": "test", "jobid": "3530460", "replicates": "1"},
+            {"user": "test", "jobid": "3530461", "replicates": "4"},
+            {"user": "test", "jobid": "3530462", "replicates": "1"},
+            {"user": "test", "jobid": "3530463", "replicates": "1"}]
+
+    mock_ssh.return_value = (out, "", 0)
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 1
+    assert mock_ssh.call_args[0][1] == [
+        "qstat -f -F json 3530460 3530461[] 3530462 3530463"]
+    assert output == {"3530460": "Queued",
+                      "3530461": "Subjob(s) Running",
+                      "3530462": "Running",
+                      "3530463": "Finished"}
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_unknownjob(mock_ssh):
+
+    """
+    Test that the reply is still used when qstat complains of unknown jobs.
+    """
+
+    jobs = [{"user": "test", "jobid": "3530460", "replicates": "1"},
+            {"user": "test", "jobid": "3530463", "replicates": "1"}]
+
+    mock_ssh.side_effect = exceptions.SSHError(
+        "Err", (out, "qstat: Unknown Job Id 3530463.sdb", 153))
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 1
+    assert output["3530460"] == "Queued"
+    assert output["3530463"] == "Finished"
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_nojson(mock_ssh):
+
+    """
+    Test the fall back to the user table when json is not supported.
+    """
+
+    jobs = [{"user": "test", "jobid": "3530460", "replicates": "1"},
+            {"user": "test", "jobid": "3530462", "replicates": "1"},
+            {"user": "test", "jobid": "3530463", "replicates": "1"}]
+
+    mock_ssh.side_effect = [
+        exceptions.SSHError("Err", ("", "qstat: invalid option -- 'F'", 2)),
+        (table, "", 0)]
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 2
+    assert output == {"3530460": "Queued",
+                      "3530462": "Running",
+                      "3530463": "Finished"}
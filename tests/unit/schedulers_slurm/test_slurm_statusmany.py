@@ -0,0 +1,112 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This test module contains tests for the slurm scheduler plugin.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.schedulers.slurm import status_many
+
+out = ("600 PD\n"
+       "601 R\n"
+       "602_1 R\n")
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_states(mock_ssh):
+
+    """
+    Test that the states of all jobs come back from one query.
+    """
+
+    jobs = [{"user": "test", "jobid": "600"},
+            {"user": "test", "jobid": "601"},
+            {"user": "test", "jobid": "602"},
+            {"user": "test", "jobid": "603"}]
+
+    mock_ssh.return_value = (out, "", 0)
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 1
+    assert "squeue -h -j 600,601,602,603" in mock_ssh.call_args[0][1][0]
+    assert output == {"600": "Pending", "601": "Running", "602": "Running",
+                      "603": "Finished"}
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_invalidid(mock_ssh):
+
+    """
+    Test that a rejected job list falls back to a user query.
+    """
+
+    jobs = [{"user": "test", "jobid": "600"},
+            {"user": "test", "jobid": "604"}]
+
+    mock_ssh.side_effect = [
+        exceptions.SSHError("Err", ("", "Invalid job id specified", 1)),
+        (out, "", 0)]
+
+    output = status_many(jobs)
+
+    assert mock_ssh.call_count == 2
+    assert "squeue -h -u test" in mock_ssh.call_args[0][1][0]
+    assert output["600"] == "Pending"
+    assert output["604"] == "Finished"
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_statusmany_except(mock_ssh):
+
+    """
+    Test that other SSH errors are passed up.
+    """
+
+    jobs = [{"user": "test", "jobid": "600"}]
+
+    mock_ssh.side_effect = exceptions.SSHError("Err", ("", "Error", 255))
+
+    with pytest.raises(exceptions.SSHError):
+
+        status_many(jobs)
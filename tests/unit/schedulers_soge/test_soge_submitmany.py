@@ -0,0 +1,81 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the submit_many method within the
+SoGE scheduler module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.exceptions as exceptions
+from longbow.schedulers.soge import submit_many
+
+
+@mock.patch('longbow.shellwrappers.sendtosshmany')
+def test_submitmany_outcomes(mock_ssh):
+
+    """
+    Test that all jobs go in one call and that the outcome of each is given.
+    """
+
+    jobs = [
+        {"destdir": "/path/to/jobone", "subfile": "submit.file"},
+        {"destdir": "/path/to/jobtwo", "subfile": "submit.file"},
+        {"destdir": "/path/to/jobthree", "subfile": "submit.file"}
+    ]
+
+    limit = "job rejected: Only 10 jobs are allowed per user"
+
+    mock_ssh.return_value = [
+        ('Your job 5346 ("test") has been submitted', "", 0),
+        ("", limit, 1),
+        ("", "Something else", 1)
+    ]
+
+    errors = submit_many(jobs)
+
+    assert mock_ssh.call_count == 1
+    assert mock_ssh.call_args[0][1][0] == ["cd /path/to/jobone\n",
+                                          "qsub submit.file"]
+    assert jobs[0]["jobid"] == "5346"
+    assert errors[0] is None
+    assert isinstance(errors[1], exceptions.QueuemaxError)
+    assert isinstance(errors[2], exceptions.JobsubmitError)
+    assert "jobid" not in jobs[2]
@@ -35,6 +35,7 @@ This testing module contains the tests for the _checkcomplete method within
 the scheduling module.
 """
 
+from longbow.jobset import JobSet
 from longbow.scheduling import _checkcomplete
 
 
@@ -210,3 +211,30 @@ def test_checkcomplete_multi5():
 
     assert finished is False
     assert complete is True
+
+
+def test_checkcomplete_jobset():
+
+    """
+    Check that a JobSet follows its jobs through to completion.
+    """
+
+    jobs = JobSet({
+        "lbowconf": {},
+        "jobone": {
+            "laststatus": "Running"
+        },
+        "jobtwo": {
+            "laststatus": "Submit Error"
+        }
+    })
+
+    assert _checkcomplete(jobs) == (False, False)
+
+    jobs["jobone"]["laststatus"] = "Finished"
+
+    assert _checkcomplete(jobs) == (False, True)
+
+    jobs["jobone"]["laststatus"] = "Complete"
+
+    assert _checkcomplete(jobs) == (True, False)
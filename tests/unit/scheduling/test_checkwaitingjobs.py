@@ -161,6 +161,67 @@ def test_checkwaitingjobs_two(mock_submit):
     assert jobs["lbowconf"]["test-machine-queue-slots"] == "3"
 
 
+@mock.patch('longbow.staging.stage_upstream')
+@mock.patch('longbow.schedulers.lsf.submit')
+def test_checkwaitingjobs_deferred(mock_submit, mock_stage):
+
+    """
+    Check that a job whose files were not staged when it was held back has
+    them staged before it is submitted.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "test-machine-queue-slots": 1,
+            "test-machine-queue-max": 2
+        },
+        "jobone": {
+            "laststatus": "Waiting Submission",
+            "resource": "test-machine",
+            "scheduler": "LSF",
+            "upload-deferred": "true"
+        }
+    }
+
+    mock_submit.side_effect = addjobid
+
+    _checkwaitingjobs(jobs, False)
+
+    mock_stage.assert_called_once_with(jobs, ["jobone"])
+    assert mock_submit.call_count == 1
+    assert jobs["jobone"]["upload-deferred"] == "false"
+    assert jobs["jobone"]["laststatus"] == "Queued"
+
+
+@mock.patch('longbow.staging.stage_upstream')
+@mock.patch('longbow.schedulers.lsf.submit')
+def test_checkwaitingjobs_deferredexcept(mock_submit, mock_stage):
+
+    """
+    Check that a job whose files can't be staged is not submitted.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "test-machine-queue-slots": 1,
+            "test-machine-queue-max": 2
+        },
+        "jobone": {
+            "laststatus": "Waiting Submission",
+            "resource": "test-machine",
+            "scheduler": "LSF",
+            "upload-deferred": "true"
+        }
+    }
+
+    mock_stage.side_effect = exceptions.StagingError("Staging Error")
+
+    _checkwaitingjobs(jobs, False)
+
+    assert mock_submit.call_count == 0
+    assert jobs["jobone"]["laststatus"] == "Submit Error"
+
+
 @mock.patch('longbow.schedulers.lsf.submit')
 def test_checkwaitingjobs_except1(mock_submit):
 
@@ -0,0 +1,114 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This testing module contains the tests for the delete_many method within the
+scheduling module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.exceptions as exceptions
+from longbow.scheduling import delete_many
+
+
+@mock.patch('longbow.schedulers.lsf.delete')
+@mock.patch('longbow.schedulers.lsf.delete_many')
+def test_deletemany_resources(mock_many, mock_delete):
+
+    """
+    Test that the jobs on a resource are deleted in one go, and that a job on
+    its own is deleted as normal.
+    """
+
+    jobs = {
+        "lbowconf": {},
+        "job-one": {
+            "jobname": "job-one",
+            "resource": "lsf-machine",
+            "scheduler": "LSF",
+            "jobid": "123"
+        },
+        "job-two": {
+            "jobname": "job-two",
+            "resource": "lsf-machine",
+            "scheduler": "LSF",
+            "jobid": "456"
+        },
+        "job-three": {
+            "jobname": "job-three",
+            "resource": "other-machine",
+            "scheduler": "LSF",
+            "jobid": "789"
+        }
+    }
+
+    delete_many(jobs, ["job-one", "job-two", "job-three"])
+
+    assert mock_many.call_count == 1
+    assert [job["jobid"] for job in mock_many.call_args[0][0]] == \
+        ["123", "456"]
+    assert mock_delete.call_count == 1
+    assert mock_delete.call_args[0][0]["jobid"] == "789"
+
+
+@mock.patch('longbow.schedulers.lsf.delete')
+@mock.patch('longbow.schedulers.lsf.delete_many')
+def test_deletemany_except(mock_many, mock_delete):
+
+    """
+    Test that a failure to delete the jobs on one resource is not raised.
+    """
+
+    jobs = {"lbowconf": {}}
+
+    for name in ["job-one", "job-two"]:
+
+        jobs[name] = {
+            "jobname": name,
+            "resource": "lsf-machine",
+            "scheduler": "LSF",
+            "jobid": "123"
+        }
+
+    mock_many.side_effect = exceptions.JobdeleteError("Error")
+
+    delete_many(jobs, ["job-one", "job-two"])
+
+    assert mock_many.call_count == 1
+    assert mock_delete.call_count == 0
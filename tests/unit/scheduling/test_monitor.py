@@ -49,7 +49,7 @@ import longbow.exceptions as exceptions
 from longbow.scheduling import monitor
 
 
-def jobstatus(jobs, _):
+def jobstatus(jobs, _, resources=None):
 
     """
     Change status of the job
@@ -146,10 +146,10 @@ def test_monitor_teststagefreq(mock_init, mock_poll, mock_wait, mock_down):
 
     assert mock_poll.call_count == 3
     assert mock_down.call_count == 3
-    assert int(end - start) > 2
+    assert int(end - start) > 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.staging.stage_downstream')
 @mock.patch('longbow.scheduling._checkwaitingjobs')
 @mock.patch('longbow.scheduling._polljobs')
@@ -195,7 +195,7 @@ def test_monitor_complete1(mock_init, mock_poll, mock_wait, mock_down,
     assert mock_down.call_count == 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.staging.stage_downstream')
 @mock.patch('longbow.scheduling._checkwaitingjobs')
 @mock.patch('longbow.scheduling._polljobs')
@@ -253,7 +253,7 @@ def test_monitor_complete2(mock_init, mock_poll, mock_wait, mock_down,
     assert mock_save.call_count == 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.staging.stage_downstream')
 @mock.patch('longbow.scheduling._checkwaitingjobs')
 @mock.patch('longbow.scheduling._polljobs')
@@ -311,7 +311,7 @@ def test_monitor_run1(mock_init, mock_poll, mock_wait, mock_down,
     assert mock_save.call_count == 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.staging.stage_downstream')
 @mock.patch('longbow.scheduling._checkwaitingjobs')
 @mock.patch('longbow.scheduling._polljobs')
@@ -356,7 +356,7 @@ def test_monitor_except(mock_init, mock_poll, mock_wait, mock_down,
     assert mock_save.call_count == 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.staging.stage_downstream')
 @mock.patch('longbow.scheduling._checkwaitingjobs')
 @mock.patch('longbow.scheduling._polljobs')
@@ -415,3 +415,98 @@ def test_monitor_update(mock_init, mock_poll, mock_wait, mock_down, mock_save):
     assert mock_wait.call_count == 1
     assert mock_down.call_count == 0
     assert mock_save.call_count == 1
+
+
+@mock.patch('longbow.scheduling._stagejobfiles')
+@mock.patch('longbow.scheduling._checkwaitingjobs')
+@mock.patch('longbow.scheduling._polljobs')
+@mock.patch('longbow.scheduling._monitorinitialise')
+def test_monitor_pollresources(mock_init, mock_poll, mock_wait, mock_down):
+
+    """
+    Test that each resource is polled to its own polling frequency.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "recoveryfile": "recovery-YYMMDD-HHMMSS"
+        },
+        "jobone": {
+            "resource": "hpc1",
+            "laststatus": "Running",
+            "polling-frequency": "1"
+        },
+        "jobtwo": {
+            "resource": "hpc2",
+            "laststatus": "Running",
+            "polling-frequency": "60"
+        }
+    }
+
+    polled = []
+
+    def _poll(jobs, save, resources):
+
+        polled.append(sorted(resources))
+
+        if len(polled) == 3:
+
+            raise exceptions.PluginattributeError
+
+    mock_init.return_value = 0, 60
+    mock_poll.side_effect = _poll
+    mock_wait.return_value = False
+
+    with pytest.raises(exceptions.PluginattributeError):
+
+        monitor(jobs)
+
+    assert polled == [["hpc1", "hpc2"], ["hpc1"], ["hpc1"]]
+    assert mock_down.call_count == 0
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.scheduling._stagejobfiles')
+@mock.patch('longbow.scheduling._checkwaitingjobs')
+@mock.patch('longbow.scheduling._polljobs')
+@mock.patch('longbow.scheduling._monitorinitialise')
+def test_monitor_sleep(mock_init, mock_poll, mock_wait, mock_down,
+                       mock_sleep):
+
+    """
+    Test that the loop sleeps until the next thing is due rather than waking
+    up every second.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "recoveryfile": "recovery-YYMMDD-HHMMSS"
+        },
+        "jobone": {
+            "resource": "hpc1",
+            "laststatus": "Running"
+        }
+    }
+
+    clock = [1000.0]
+
+    def _sleep(seconds):
+
+        clock[0] += seconds
+
+    mock_init.return_value = 0, 300
+    mock_poll.side_effect = [False, exceptions.PluginattributeError]
+    mock_wait.return_value = False
+    mock_sleep.side_effect = _sleep
+
+    with mock.patch('time.time') as mock_time:
+
+        mock_time.side_effect = lambda: clock[0]
+
+        with pytest.raises(exceptions.PluginattributeError):
+
+            monitor(jobs)
+
+    sleeps = [call[0][0] for call in mock_sleep.call_args_list]
+
+    assert sleeps == [0, 300.0]
@@ -0,0 +1,161 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the _pollingupdate method within the
+scheduling module.
+"""
+
+import longbow.scheduling as scheduling
+from longbow.scheduling import _pollingupdate
+
+
+def _jobs(status):
+
+    return {
+        "lbowconf": {},
+        "jobone": {
+            "laststatus": status,
+            "maxtime": "01:00",
+            "polling-adaptive": "true",
+            "polling-frequency": "300",
+            "polling-frequency-max": "1800",
+            "polling-frequency-min": "60",
+            "resource": "lab"
+        }
+    }
+
+
+def test_pollingupdate_backoff():
+
+    """
+    Test that the interval doubles while a job stays queued, up to the longest
+    interval, and goes back to the polling frequency when its status changes.
+    """
+
+    scheduling.POLLING.clear()
+    jobs = _jobs("Queued")
+
+    _pollingupdate(jobs, 1000, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["next"] == 1300
+
+    _pollingupdate(jobs, 1300, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["next"] == 1300 + 600
+
+    _pollingupdate(jobs, 1900, ["lab"])
+    _pollingupdate(jobs, 3100, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["next"] == 3100 + 1800
+
+    jobs["jobone"]["laststatus"] = "Held"
+
+    _pollingupdate(jobs, 4900, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["next"] == 4900 + 300
+
+
+def test_pollingupdate_walltime():
+
+    """
+    Test that running jobs are polled more often as they near their maxtime,
+    but no more often than the shortest interval.
+    """
+
+    scheduling.POLLING.clear()
+    jobs = _jobs("Running")
+
+    _pollingupdate(jobs, 1000, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["started"] == 1000
+    assert scheduling.POLLING["jobone"]["next"] == 1300
+
+    # 400 seconds left.
+    _pollingupdate(jobs, 4200, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["started"] == 1000
+    assert scheduling.POLLING["jobone"]["next"] == 4200 + 200
+
+    # Past the maxtime.
+    _pollingupdate(jobs, 4700, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["next"] == 4700 + 60
+
+
+def test_pollingupdate_skip():
+
+    """
+    Test that jobs without adaptive polling, on other resources or no longer
+    being polled are left alone.
+    """
+
+    scheduling.POLLING.clear()
+    jobs = _jobs("Queued")
+    jobs["jobtwo"] = dict(jobs["jobone"], resource="other")
+    jobs["jobthree"] = dict(jobs["jobone"], laststatus="Finished")
+    jobs["jobfour"] = dict(jobs["jobone"], **{"polling-adaptive": "false"})
+
+    _pollingupdate(jobs, 1000, ["lab"])
+
+    assert list(scheduling.POLLING) == ["jobone"]
+
+
+def test_pollingupdate_notdue():
+
+    """
+    Test that a resource poll made for another job does not back off a job
+    that was not yet due, unless its status changed.
+    """
+
+    scheduling.POLLING.clear()
+    jobs = _jobs("Queued")
+
+    _pollingupdate(jobs, 1000, ["lab"])
+    _pollingupdate(jobs, 1100, ["lab"])
+    _pollingupdate(jobs, 1200, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["count"] == 0
+    assert scheduling.POLLING["jobone"]["next"] == 1300
+
+    _pollingupdate(jobs, 1300, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["count"] == 1
+    assert scheduling.POLLING["jobone"]["next"] == 1300 + 600
+
+    jobs["jobone"]["laststatus"] = "Running"
+
+    _pollingupdate(jobs, 1400, ["lab"])
+
+    assert scheduling.POLLING["jobone"]["status"] == "Running"
+    assert scheduling.POLLING["jobone"]["next"] == 1400 + 300
@@ -49,7 +49,7 @@ import longbow.exceptions as exceptions
 from longbow.scheduling import _polljobs
 
 
-@mock.patch('longbow.schedulers.lsf.status')
+@mock.patch('longbow.schedulers.lsf.status_many')
 def test_polljobs_callcount(mock_status):
 
     """
@@ -58,47 +58,161 @@ def test_polljobs_callcount(mock_status):
 
     jobs = {
         "jobone": {
+            "resource": "test-machine",
             "laststatus": "Running",
             "scheduler": "LSF",
             "jobid": "123456"
         },
         "jobtwo": {
+            "resource": "test-machine",
             "laststatus": "Queued",
             "scheduler": "LSF",
-            "jobid": "123456"
+            "jobid": "123457"
         },
         "jobthree": {
+            "resource": "test-machine",
             "laststatus": "Submit Error",
             "scheduler": "LSF",
-            "jobid": "123456"
+            "jobid": "123458"
         },
         "jobfour": {
+            "resource": "test-machine",
             "laststatus": "Waiting Submission",
             "scheduler": "LSF",
-            "jobid": "123456"
+            "jobid": "123459"
         },
         "jobfive": {
+            "resource": "test-machine",
             "laststatus": "Finished",
             "scheduler": "LSF",
-            "jobid": "123456"
+            "jobid": "123460"
         },
         "jobsix": {
+            "resource": "test-machine",
             "laststatus": "Complete",
             "scheduler": "LSF",
-            "jobid": "123456"
+            "jobid": "123461"
         }
     }
 
-    mock_status.return_value = "Running"
+    mock_status.return_value = {"123456": "Running", "123457": "Running"}
     returnval = _polljobs(jobs, False)
 
-    assert mock_status.call_count == 2, \
+    assert mock_status.call_count == 1, \
+        "Should only be one query for the resource"
+    assert len(mock_status.call_args[0][0]) == 2, \
         "Should only be polling running and queued jobs"
     assert jobs["jobtwo"]["laststatus"] == "Running"
     assert returnval is True
 
 
-@mock.patch('longbow.schedulers.lsf.status')
+@mock.patch('longbow.schedulers.lsf.status_many')
+def test_polljobs_resources(mock_status):
+
+    """
+    Test that jobs are grouped into one query per resource.
+    """
+
+    jobs = {
+        "jobone": {
+            "resource": "machine1",
+            "laststatus": "Running",
+            "scheduler": "LSF",
+            "jobid": "1"
+        },
+        "jobtwo": {
+            "resource": "machine2",
+            "laststatus": "Queued",
+            "scheduler": "LSF",
+            "jobid": "2"
+        },
+        "jobthree": {
+            "resource": "machine1",
+            "laststatus": "Queued",
+            "scheduler": "LSF",
+            "jobid": "3"
+        }
+    }
+
+    mock_status.return_value = {"1": "Running", "2": "Running",
+                                "3": "Running"}
+    _polljobs(jobs, False)
+
+    assert mock_status.call_count == 2
+    assert jobs["jobthree"]["laststatus"] == "Running"
+
+
+@mock.patch('longbow.schedulers.lsf.status_many')
+def test_polljobs_unreachable(mock_status):
+
+    """
+    Test that a resource that can't be reached doesn't stop the others being
+    polled.
+    """
+
+    jobs = {
+        "jobone": {
+            "resource": "machine1",
+            "laststatus": "Running",
+            "scheduler": "LSF",
+            "jobid": "1"
+        },
+        "jobtwo": {
+            "resource": "machine2",
+            "laststatus": "Queued",
+            "scheduler": "LSF",
+            "jobid": "2"
+        }
+    }
+
+    def _status(joblist):
+
+        if joblist[0]["resource"] == "machine1":
+
+            raise exceptions.SSHError("SSH Error", ("", "", 255))
+
+        return {"2": "Running"}
+
+    mock_status.side_effect = _status
+    _polljobs(jobs, False)
+
+    assert mock_status.call_count == 2
+    assert jobs["jobone"]["laststatus"] == "Running"
+    assert jobs["jobtwo"]["laststatus"] == "Running"
+
+
+@mock.patch('longbow.scheduling.schedulers')
+def test_polljobs_fallback(mock_schedulers):
+
+    """
+    Test that plugins without status_many get polled job by job.
+    """
+
+    jobs = {
+        "jobone": {
+            "resource": "test-machine",
+            "laststatus": "Running",
+            "scheduler": "LSF",
+            "jobid": "1"
+        },
+        "jobtwo": {
+            "resource": "test-machine",
+            "laststatus": "Queued",
+            "scheduler": "LSF",
+            "jobid": "2"
+        }
+    }
+
+    mock_schedulers.lsf = mock.Mock(spec=["status"])
+    mock_schedulers.lsf.status.return_value = "Running"
+
+    _polljobs(jobs, False)
+
+    assert mock_schedulers.lsf.status.call_count == 2
+    assert jobs["jobtwo"]["laststatus"] == "Running"
+
+
+@mock.patch('longbow.schedulers.lsf.status_many')
 def test_polljobs_finished(mock_status):
 
     """
@@ -148,17 +262,17 @@ def test_polljobs_finished(mock_status):
         }
     }
 
-    mock_status.return_value = "Finished"
+    mock_status.return_value = {"123456": "Finished"}
     _polljobs(jobs, False)
 
-    assert mock_status.call_count == 2, \
-        "Should only be polling running and queued jobs"
+    assert mock_status.call_count == 1, \
+        "Should only be one query for the resource"
     assert jobs["jobone"]["laststatus"] == "Finished"
     assert jobs["jobtwo"]["laststatus"] == "Finished"
     assert jobs["lbowconf"]["test-machine-queue-slots"] == "0"
 
 
-@mock.patch('longbow.schedulers.lsf.status')
+@mock.patch('longbow.schedulers.lsf.status_many')
 def test_polljobs_except(mock_status):
 
     """
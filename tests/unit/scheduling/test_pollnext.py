@@ -0,0 +1,92 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the _pollnext method within the
+scheduling module.
+"""
+
+import longbow.scheduling as scheduling
+from longbow.scheduling import _pollnext
+
+
+def _jobs():
+
+    return {
+        "lbowconf": {},
+        "jobone": {
+            "laststatus": "Queued",
+            "polling-adaptive": "true",
+            "resource": "lab"
+        },
+        "jobtwo": {
+            "laststatus": "Running",
+            "polling-adaptive": "true",
+            "resource": "lab"
+        },
+        "jobthree": {
+            "laststatus": "Waiting Submission",
+            "resource": "lab"
+        }
+    }
+
+
+def test_pollnext_earliest():
+
+    """
+    Test that a resource is due when the first of its jobs is due, ignoring
+    jobs waiting to be submitted.
+    """
+
+    scheduling.POLLING.clear()
+    scheduling.POLLING["jobone"] = {"next": 2000}
+    scheduling.POLLING["jobtwo"] = {"next": 1500}
+
+    assert _pollnext(_jobs(), "lab", 1000, 300) == 1500
+
+
+def test_pollnext_fixed():
+
+    """
+    Test that jobs without adaptive polling keep the resource interval, as do
+    resources with nothing left to poll.
+    """
+
+    scheduling.POLLING.clear()
+    scheduling.POLLING["jobone"] = {"next": 2000}
+    scheduling.POLLING["jobtwo"] = {"next": 1500}
+    jobs = _jobs()
+    jobs["jobtwo"]["polling-adaptive"] = "false"
+
+    assert _pollnext(jobs, "lab", 1000, 300) == 1300
+    assert _pollnext(jobs, "other", 1000, 300) == 1300
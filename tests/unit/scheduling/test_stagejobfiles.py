@@ -43,6 +43,7 @@ except ImportError:
 
     import mock
 
+import longbow.exceptions as exceptions
 from longbow.scheduling import _stagejobfiles
 
 
@@ -57,13 +58,16 @@ def test_stagejobfiles_singlerun(mock_download):
 
     jobs = {
         "jobone": {
-            "laststatus": "Running"
+            "laststatus": "Running",
+            "resource": "test-machine"
         },
         "jobtwo": {
-            "laststatus": "Finished"
+            "laststatus": "Finished",
+            "resource": "test-machine"
         },
         "jobthree": {
-            "laststatus": "Complete"
+            "laststatus": "Complete",
+            "resource": "test-machine"
         }
     }
 
@@ -73,3 +77,38 @@ def test_stagejobfiles_singlerun(mock_download):
     assert jobs["jobone"]["laststatus"] == "Running"
     assert jobs["jobtwo"]["laststatus"] == "Complete"
     assert jobs["jobthree"]["laststatus"] == "Complete"
+
+
+@mock.patch('longbow.staging.stage_downstream')
+def test_stagejobfiles_failed(mock_download):
+
+    """
+    Test that a failed download leaves the job to be staged again later and
+    doesn't stop other jobs being staged.
+    """
+
+    jobs = {
+        "jobone": {
+            "laststatus": "Finished",
+            "resource": "test-machine"
+        },
+        "jobtwo": {
+            "laststatus": "Finished",
+            "resource": "test-machine"
+        }
+    }
+
+    def _download(job, options=None):
+
+        if job is jobs["jobone"]:
+
+            raise exceptions.StagingError("Staging Error")
+
+    mock_download.side_effect = _download
+
+    save = _stagejobfiles(jobs, False)
+
+    assert mock_download.call_count == 2
+    assert jobs["jobone"]["laststatus"] == "Finished"
+    assert jobs["jobtwo"]["laststatus"] == "Complete"
+    assert save is True
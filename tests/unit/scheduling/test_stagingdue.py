@@ -0,0 +1,94 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the _stagingdue method within the
+scheduling module.
+"""
+
+import longbow.scheduling as scheduling
+from longbow.scheduling import _stagingdue
+
+
+def _jobs():
+
+    jobs = {
+        "lbowconf": {
+            "recoveryfile": "rec.file"
+        }
+    }
+
+    for name, status in [("jobone", "Running"), ("jobtwo", "Running"),
+                         ("jobthree", "Finished"), ("jobfour", "Queued"),
+                         ("jobfive", "Running")]:
+
+        jobs[name] = {
+            "laststatus": status,
+            "staging-adaptive": "true"
+        }
+
+    jobs["jobfive"]["staging-adaptive"] = "false"
+
+    return jobs
+
+
+def test_stagingdue_first():
+
+    """
+    Test that running and finished jobs are due when first seen, and that
+    jobs without adaptive staging are left out.
+    """
+
+    scheduling.STAGING.clear()
+
+    assert sorted(_stagingdue(_jobs(), 1000)) == ["jobone", "jobthree",
+                                                  "jobtwo"]
+
+
+def test_stagingdue_timetable():
+
+    """
+    Test that jobs are due once their time has come, and that finished jobs
+    that failed to stage wait before trying again.
+    """
+
+    scheduling.STAGING.clear()
+    scheduling.STAGING["jobone"] = {"finished": False, "next": 1000}
+    scheduling.STAGING["jobtwo"] = {"finished": False, "next": 1001}
+    scheduling.STAGING["jobthree"] = {"finished": True, "next": 1060}
+
+    assert _stagingdue(_jobs(), 1000) == ["jobone"]
+    assert sorted(_stagingdue(_jobs(), 1060)) == ["jobone", "jobthree",
+                                                  "jobtwo"]
+
+    scheduling.STAGING.clear()
@@ -0,0 +1,110 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the _stagingupdate method within the
+scheduling module.
+"""
+
+import longbow.scheduling as scheduling
+from longbow.scheduling import _stagingupdate
+
+
+def _jobs(localdir):
+
+    return {
+        "jobone": {
+            "laststatus": "Running",
+            "localworkdir": localdir,
+            "staging-adaptive": "true",
+            "staging-frequency": "300",
+            "staging-frequency-max": "1800",
+            "staging-frequency-min": "60"
+        }
+    }
+
+
+def test_stagingupdate_growth(tmpdir):
+
+    """
+    Test that the interval starts at the staging frequency, then follows the
+    rate of growth within the bounds.
+    """
+
+    scheduling.STAGING.clear()
+    jobs = _jobs(str(tmpdir))
+
+    _stagingupdate(jobs, ["jobone"], 1000)
+
+    assert scheduling.STAGING["jobone"]["next"] == 1300
+    assert scheduling.STAGING["jobone"]["bytes"] == 0
+
+    # Quiet jobs go to the longest interval.
+    _stagingupdate(jobs, ["jobone"], 1300)
+
+    assert scheduling.STAGING["jobone"]["next"] == 1300 + 1800
+
+    # 10 MB in 100 seconds, smoothed with the quiet spell, is 50 KB/s.
+    tmpdir.join("output").write("a" * scheduling.STAGINGBYTES)
+
+    _stagingupdate(jobs, ["jobone"], 1400)
+
+    assert scheduling.STAGING["jobone"]["next"] == 1400 + 200
+
+    # Busy jobs go to the shortest interval.
+    tmpdir.join("output").write("a" * scheduling.STAGINGBYTES * 10)
+
+    _stagingupdate(jobs, ["jobone"], 1410)
+
+    assert scheduling.STAGING["jobone"]["next"] == 1410 + 60
+
+    scheduling.STAGING.clear()
+
+
+def test_stagingupdate_finished(tmpdir):
+
+    """
+    Test that a finished job that is still to be staged tries again after the
+    shortest interval.
+    """
+
+    scheduling.STAGING.clear()
+    jobs = _jobs(str(tmpdir))
+    jobs["jobone"]["laststatus"] = "Finished"
+
+    _stagingupdate(jobs, ["jobone"], 1000)
+
+    assert scheduling.STAGING["jobone"]["finished"] is True
+    assert scheduling.STAGING["jobone"]["next"] == 1060
+
+    scheduling.STAGING.clear()
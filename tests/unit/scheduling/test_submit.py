@@ -151,7 +151,7 @@ def test_submit_multiplediff(mock_isdir, mock_lsf, mock_pbs, mock_slurm):
         "For a single job this method should only be called once"
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_filewrite(mock_isdir, mock_submit, mock_savini):
@@ -179,7 +179,7 @@ def test_submit_filewrite(mock_isdir, mock_submit, mock_savini):
     assert mock_savini.call_count == 1
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_fileuninit(mock_isdir, mock_submit, mock_savini):
@@ -207,7 +207,7 @@ def test_submit_fileuninit(mock_isdir, mock_submit, mock_savini):
     assert mock_savini.call_count == 0
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_fileexcept1(mock_isdir, mock_submit, mock_savini):
@@ -234,7 +234,7 @@ def test_submit_fileexcept1(mock_isdir, mock_submit, mock_savini):
     submit(jobs)
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_fileexcept2(mock_isdir, mock_submit, mock_savini):
@@ -261,7 +261,7 @@ def test_submit_fileexcept2(mock_isdir, mock_submit, mock_savini):
     submit(jobs)
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_attrexcept(mock_isdir, mock_submit, mock_savini):
@@ -288,7 +288,7 @@ def test_submit_attrexcept(mock_isdir, mock_submit, mock_savini):
         submit(jobs)
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_submitexcept(mock_isdir, mock_submit, mock_savini):
@@ -315,7 +315,7 @@ def test_submit_submitexcept(mock_isdir, mock_submit, mock_savini):
     assert jobs["job-one"]["laststatus"] == "Submit Error"
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_queueexcept(mock_isdir, mock_submit, mock_savini):
@@ -343,7 +343,7 @@ def test_submit_queueexcept(mock_isdir, mock_submit, mock_savini):
     assert jobs["job-one"]["laststatus"] == "Waiting Submission"
 
 
-@mock.patch('longbow.configuration.saveini')
+@mock.patch('longbow.configuration.saverecovery')
 @mock.patch('longbow.schedulers.lsf.submit')
 @mock.patch('os.path.isdir')
 def test_submit_queueinfo(mock_isdir, mock_submit, mock_savini):
@@ -382,3 +382,217 @@ def test_submit_queueinfo(mock_isdir, mock_submit, mock_savini):
 
     assert jobs["lbowconf"]["test-machine-queue-slots"] == "3"
     assert jobs["lbowconf"]["test-machine-queue-max"] == "3"
+
+
+@mock.patch('longbow.configuration.saverecovery')
+@mock.patch('longbow.schedulers.lsf.submit')
+@mock.patch('os.path.isdir')
+def test_submit_queueresource(mock_isdir, mock_submit, mock_savini):
+
+    """
+    Test that a full queue on one resource only holds back the jobs on that
+    resource.
+    """
+
+    jobs = {
+        "lbowconf": {},
+        "job-one": {
+            "resource": "full-machine",
+            "scheduler": "LSF",
+            "jobid": "test123"
+        },
+        "job-two": {
+            "resource": "full-machine",
+            "scheduler": "LSF",
+            "jobid": "test456"
+        },
+        "job-three": {
+            "resource": "test-machine",
+            "scheduler": "LSF",
+            "jobid": "test789"
+        }
+    }
+
+    def _submit(job):
+
+        if job["resource"] == "full-machine":
+
+            raise exceptions.QueuemaxError("Submit Error")
+
+    mock_isdir.return_value = False
+    mock_savini.return_value = None
+    mock_submit.side_effect = _submit
+
+    submit(jobs)
+
+    assert jobs["job-one"]["laststatus"] == "Waiting Submission"
+    assert jobs["job-two"]["laststatus"] == "Waiting Submission"
+    assert jobs["job-three"]["laststatus"] == "Queued"
+    assert jobs["lbowconf"]["full-machine-queue-slots"] == "0"
+    assert jobs["lbowconf"]["test-machine-queue-slots"] == "1"
+
+
+@mock.patch('longbow.schedulers.slurm.submit_many')
+@mock.patch('longbow.schedulers.slurm.submit')
+@mock.patch('os.path.isdir')
+def test_submit_batch(mock_isdir, mock_submit, mock_many):
+
+    """
+    Test that jobs with batched submission go out in one call per resource and
+    that the outcome of each job is dealt with.
+    """
+
+    jobs = {"lbowconf": {}}
+
+    for name in ["job-one", "job-two", "job-three"]:
+
+        jobs[name] = {
+            "resource": "test-machine",
+            "scheduler": "Slurm",
+            "submit-batch": "true"
+        }
+
+    def _many(joblist):
+
+        outcomes = []
+
+        for job in joblist:
+
+            job["jobid"] = "123"
+            outcomes.append(None)
+
+        outcomes[-1] = exceptions.QueuemaxError()
+
+        return outcomes
+
+    mock_isdir.return_value = False
+    mock_many.side_effect = _many
+
+    submit(jobs)
+
+    assert mock_many.call_count == 1
+    assert mock_submit.call_count == 0
+    assert sorted([jobs[a]["laststatus"] for a in jobs if a != "lbowconf"]) \
+        == ["Queued", "Queued", "Waiting Submission"]
+
+
+@mock.patch('longbow.schedulers.slurm.submit_many')
+@mock.patch('longbow.schedulers.slurm.submit')
+@mock.patch('os.path.isdir')
+def test_submit_batchfallback(mock_isdir, mock_submit, mock_many):
+
+    """
+    Test that jobs are submitted one at a time if submitting them in one go
+    fails to reach the resource.
+    """
+
+    jobs = {"lbowconf": {}}
+
+    for name in ["job-one", "job-two"]:
+
+        jobs[name] = {
+            "resource": "test-machine",
+            "scheduler": "Slurm",
+            "submit-batch": "true",
+            "jobid": "123"
+        }
+
+    mock_isdir.return_value = False
+    mock_many.side_effect = exceptions.SSHError("Error", ("", "", 255))
+
+    submit(jobs)
+
+    assert mock_many.call_count == 1
+    assert mock_submit.call_count == 2
+    assert jobs["job-one"]["laststatus"] == "Queued"
+
+
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.schedulers.lsf.submit')
+@mock.patch('os.path.isdir')
+def test_submit_stage(mock_isdir, mock_submit, mock_upload):
+
+    """
+    Test that each job is submitted straight after its files are staged, and
+    that the files for jobs held back by queue limits are not staged.
+    """
+
+    jobs = {"lbowconf": {}}
+
+    for name in ["job-one", "job-two", "job-three"]:
+
+        jobs[name] = {
+            "resource": "test-machine",
+            "scheduler": "LSF",
+            "jobid": "test123",
+            "destdir": "/path/to/" + name,
+            "localworkdir": "/path/to/local/" + name
+        }
+
+    calls = []
+
+    def _submit(job):
+
+        calls.append(("submit", job["destdir"]))
+
+        if job is not jobs["job-one"]:
+
+            raise exceptions.QueuemaxError("Queue is full.")
+
+    mock_isdir.return_value = False
+    mock_upload.side_effect = \
+        lambda job, options=None: calls.append(("upload", job["destdir"]))
+    mock_submit.side_effect = _submit
+
+    submit(jobs, stage=True)
+
+    assert calls == [("upload", "/path/to/job-one"),
+                     ("submit", "/path/to/job-one"),
+                     ("upload", "/path/to/job-two"),
+                     ("submit", "/path/to/job-two")]
+    assert jobs["job-one"]["laststatus"] == "Queued"
+    assert jobs["job-two"]["laststatus"] == "Waiting Submission"
+    assert "upload-deferred" not in jobs["job-two"]
+    assert jobs["job-three"]["laststatus"] == "Waiting Submission"
+    assert jobs["job-three"]["upload-deferred"] == "true"
+
+
+@mock.patch('longbow.configuration.saverecovery')
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.schedulers.lsf.submit')
+@mock.patch('os.path.isdir')
+def test_submit_stageerror(mock_isdir, mock_submit, mock_upload,
+                           mock_savini):
+
+    """
+    Test that a failed transfer is raised, but only after the recovery file
+    has been written for the jobs that were already submitted.
+    """
+
+    jobs = {"lbowconf": {"recoveryfile": "recovery"}}
+
+    for name in ["job-one", "job-two"]:
+
+        jobs[name] = {
+            "resource": "test-machine",
+            "scheduler": "LSF",
+            "jobid": "test123",
+            "destdir": "/path/to/" + name,
+            "localworkdir": "/path/to/local/" + name
+        }
+
+    def _upload(job, options=None):
+
+        if job is jobs["job-two"]:
+
+            raise exceptions.RsyncError("Rsync Error", "output")
+
+    mock_isdir.return_value = True
+    mock_upload.side_effect = _upload
+
+    with pytest.raises(exceptions.StagingError):
+
+        submit(jobs, stage=True)
+
+    assert mock_submit.call_count == 1
+    assert mock_savini.call_count == 1
@@ -0,0 +1,75 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the transfersummary method within
+the scheduling module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+from longbow.scheduling import _transfersummary
+
+
+@mock.patch('longbow.scheduling.TRANSFERSUMMARY', 2)
+@mock.patch('longbow.scheduling.LOG')
+def test_transfersummary_slowest(mock_log):
+
+    """
+    Test that the jobs that spent the longest staging are logged, slowest
+    first.
+    """
+
+    jobs = {
+        "lbowconf": {},
+        "jobone": {"transfer-bytes": "1048576", "transfer-files": "1",
+                   "transfer-seconds": "1.0"},
+        "jobtwo": {"transfer-bytes": "4194304", "transfer-files": "2",
+                   "transfer-seconds": "8.0"},
+        "jobthree": {"transfer-bytes": "2097152", "transfer-files": "3",
+                     "transfer-seconds": "2.0"},
+        "jobfour": {}
+    }
+
+    _transfersummary(jobs)
+
+    assert mock_log.info.call_count == 2
+    assert mock_log.info.call_args_list[0][0][1:] == ("jobtwo", "2", 4.0,
+                                                      8.0, 0.5)
+    assert mock_log.info.call_args_list[1][0][1] == "jobthree"
@@ -0,0 +1,84 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This testing module contains the tests for the closeconnections method within
+the shellwrappers module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import closeconnections
+
+
+@mock.patch('os.path.exists')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_closeconnections_exit(mock_sendtoshell, mock_exists):
+
+    """
+    Test that each shared connection is told to exit and is forgotten.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+    shellwrappers.SSHMASTERS[("user", "host1", "22")] = "/tmp/sock1"
+    shellwrappers.SSHMASTERS[("user", "host2", "22")] = "/tmp/sock2"
+    shellwrappers.SSHMASTERS[("user", "host3", "22")] = None
+
+    mock_sendtoshell.return_value = ("", "", 0)
+    mock_exists.return_value = False
+
+    closeconnections()
+
+    assert mock_sendtoshell.call_count == 2
+    assert "-O exit" in " ".join(mock_sendtoshell.call_args[0][0])
+    assert shellwrappers.SSHMASTERS == {}
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_closeconnections_empty(mock_sendtoshell):
+
+    """
+    Test that nothing is sent if there are no shared connections.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+
+    closeconnections()
+
+    assert mock_sendtoshell.call_count == 0
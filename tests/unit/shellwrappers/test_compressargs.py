@@ -0,0 +1,212 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the compression profile methods,
+including calibrate, within the shellwrappers module.
+"""
+
+import os
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import _compressargs, _rsyncparse, calibrate, \
+    sendtorsync
+
+RSYNC32 = ("rsync  version 3.2.7  protocol version 31\n"
+           "Compress list:\n"
+           "    zstd lz4 zlibx zlib none\n")
+RSYNC30 = "rsync  version 3.0.9  protocol version 30\n"
+
+
+def _job():
+
+    return {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "remoteworkdir": "/remote/work",
+        "compression": "zstd",
+        "compression-level": "3",
+        "skip-compress": "nc, .DCD"
+    }
+
+
+def test_rsyncparse():
+
+    """
+    Test that the version and algorithms are read from rsync --version.
+    """
+
+    assert _rsyncparse(RSYNC32) == {
+        "version": (3, 2), "compress": ["zstd", "lz4", "zlibx", "zlib",
+                                        "none"]}
+    assert _rsyncparse(RSYNC30) == {
+        "version": (3, 0), "compress": ["none", "zlib"]}
+
+
+@mock.patch('longbow.shellwrappers._rsyncinfo')
+def test_compressargs_profile(mock_info):
+
+    """
+    Test that the algorithm, level and extensions to skip are passed on.
+    """
+
+    mock_info.return_value = _rsyncparse(RSYNC32)
+
+    assert _compressargs(_job()) == [
+        "-z", "--compress-choice=zstd", "--compress-level=3",
+        "--skip-compress=nc/dcd"]
+
+
+@mock.patch('longbow.shellwrappers._rsyncinfo')
+def test_compressargs_oldrsync(mock_info):
+
+    """
+    Test that options the local rsync doesn't have are left out.
+    """
+
+    mock_info.return_value = _rsyncparse("rsync version 2.6.9 protocol\n")
+
+    assert _compressargs(_job()) == ["-z", "--compress-level=3"]
+
+
+def test_compressargs_defaults():
+
+    """
+    Test that jobs without a profile keep the usual compression, and that
+    compression can be switched off.
+    """
+
+    job = _job()
+
+    assert _compressargs({}) == ["-z"]
+
+    job["compression"] = "none"
+
+    assert _compressargs(job) == []
+
+
+@mock.patch('longbow.shellwrappers._rsyncinfo')
+def test_compressargs_sample(mock_info, tmpdir):
+
+    """
+    Test that large local files that don't compress have their extension
+    skipped, whilst those that do compress don't.
+    """
+
+    mock_info.return_value = _rsyncparse(RSYNC30)
+    job = _job()
+    job["compression"] = "zlib"
+    job["compression-level"] = ""
+
+    tmpdir.join("traj.sampletest").write_binary(
+        os.urandom(shellwrappers.TARMAXSIZE))
+    tmpdir.join("log.sampletext").write("a" * shellwrappers.TARMAXSIZE)
+    tmpdir.join("small.sampletiny").write_binary(os.urandom(100))
+
+    assert _compressargs(job, str(tmpdir)) == [
+        "-z", "--skip-compress=nc/dcd/sampletest"]
+
+
+@mock.patch('longbow.shellwrappers._rsyncinfo')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtorsync_compression(mock_shell, mock_info):
+
+    """
+    Test that the compression profile makes it into the rsync command.
+    """
+
+    mock_info.return_value = _rsyncparse(RSYNC32)
+    mock_shell.return_value = "", "", 0
+    job = _job()
+    job["compression"] = "none"
+
+    sendtorsync(job, "juan_trique-ponee@massive-machine:/src", "/dst", "",
+                "")
+
+    assert mock_shell.call_args[0][0][:2] == ["rsync", "-aP"]
+
+    job["compression"] = "lz4"
+    job["compression-level"] = ""
+
+    sendtorsync(job, "juan_trique-ponee@massive-machine:/src", "/dst", "",
+                "")
+
+    assert mock_shell.call_args[0][0][:4] == [
+        "rsync", "-azP", "--compress-choice=lz4", "--skip-compress=nc/dcd"]
+
+
+@mock.patch('longbow.shellwrappers._rsyncinfo')
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_calibrate(mock_ssh, mock_rsync, mock_info):
+
+    """
+    Test that only profiles both ends support are tried, that the quickest
+    is picked and that the test files are removed from the remote host.
+    """
+
+    mock_info.return_value = _rsyncparse(RSYNC32)
+    mock_ssh.return_value = ("rsync  version 3.2.3\nCompress list:\n"
+                             "    zstd zlib none\n", "", 0)
+    tried = []
+
+    def _rsync(job, src, dst, includemask, excludemask, options):
+
+        tried.append((job["compression"], job["compression-level"]))
+
+        assert sorted(os.listdir(src)) == ["data", "text"]
+        assert dst.endswith(":/remote/work/.longbow-calibrate/")
+
+    mock_rsync.side_effect = _rsync
+
+    with mock.patch('longbow.shellwrappers.time') as mock_time:
+
+        mock_time.time.side_effect = [0, 5, 10, 12, 20, 24, 30, 34, 40, 50]
+
+        best, timings = calibrate(_job())
+
+    assert tried == [("none", ""), ("zstd", "1"), ("zstd", "3"),
+                     ("zlib", "1"), ("zlib", "6")]
+    assert best == ("zstd", "1")
+    assert len(timings) == 5
+    assert mock_ssh.call_args[0][1][0] == \
+        "rm -rf /remote/work/.longbow-calibrate"
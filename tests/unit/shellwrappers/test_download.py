@@ -161,3 +161,73 @@ def test_download_exceptiontest(mock_sendtorsync):
     with pytest.raises(exceptions.RsyncError):
 
         download(job)
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtotar')
+def test_download_tarstream(mock_sendtotar, mock_sendtorsync):
+
+    """
+    Check that running jobs are synced with rsync and finished jobs are
+    fetched in a tar stream.
+    """
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "~/source/directory/path",
+        "localworkdir": "/destination/directory/path",
+        "download-include": "",
+        "download-exclude": "",
+        "laststatus": "Running",
+        "transfer-mode": "tarstream"
+    }
+
+    download(job)
+
+    assert mock_sendtorsync.call_count == 1
+    assert mock_sendtotar.call_count == 0
+
+    job["laststatus"] = "Finished"
+
+    download(job)
+
+    assert mock_sendtorsync.call_count == 1
+    assert mock_sendtotar.call_count == 1
+    assert mock_sendtotar.call_args[0][3] == "download"
+
+
+@mock.patch('longbow.shellwrappers._downloadappend')
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_download_tiers(mock_sendtorsync, mock_append):
+
+    """
+    Check that only the progress files are fetched for running jobs staged in
+    tiers and that everything is fetched once they have finished.
+    """
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "~/source/directory/path",
+        "localworkdir": "/destination/directory/path",
+        "download-include": "",
+        "download-exclude": "",
+        "download-running": "mdout, *.log",
+        "laststatus": "Running",
+        "staging-tiers": "true"
+    }
+
+    download(job)
+
+    assert mock_sendtorsync.call_count == 0
+    assert mock_append.call_args[0][2] == ["mdout", "*.log"]
+
+    job["laststatus"] = "Finished"
+
+    download(job)
+
+    assert mock_sendtorsync.call_count == 1
+    assert mock_append.call_count == 1
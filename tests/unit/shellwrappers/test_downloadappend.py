@@ -0,0 +1,185 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the fetching of append only files
+within the shellwrappers module.
+"""
+
+import hashlib
+import os
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.shellwrappers import _downloadappend, download
+
+
+def _job(localdir):
+
+    return {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "/remote/dir",
+        "download-append": "*.nc, *.dcd",
+        "download-exclude": "",
+        "download-include": "",
+        "localworkdir": localdir,
+        "ssh-multiplex": "false",
+        "ssh-timeout": "0"
+    }
+
+
+def _stream(parts):
+
+    """
+    Make a fake sendtoshell that writes the given stream to the file the
+    pipeline redirects to.
+    """
+
+    def _sendtoshell(cmd, timeout=None):
+
+        with open(cmd[2].rsplit("> ", 1)[1].strip("'"), "wb") as stream:
+
+            stream.write(b"".join(parts))
+
+        return "", "", 0
+
+    return _sendtoshell
+
+
+@mock.patch('longbow.shellwrappers._downloadappend')
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_download_append(mock_rsync, mock_append):
+
+    """
+    Test that append only files are left out of the rsync transfer and
+    fetched afterwards.
+    """
+
+    job = _job("/local/dir")
+
+    download(job, ["--files-from=list"])
+
+    assert mock_rsync.call_args[0][5] == [
+        "--files-from=list", "--exclude", "*.nc", "--exclude", "*.dcd"]
+    assert mock_append.call_args[0][2] == ["*.nc", "*.dcd"]
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_downloadappend_tail(mock_ssh, mock_shell, mock_rsync, tmpdir):
+
+    """
+    Test that only the new data is fetched and added on, and that the file
+    gets the remote modification time.
+    """
+
+    tmpdir.join("traj.nc").write_binary(b"a" * 100)
+    tmpdir.join("same.nc").write_binary(b"b" * 10)
+
+    mock_ssh.return_value = ("traj.nc\t150\t1000.5\nsame.nc\t10\t900.0\n",
+                             "", 0)
+    mock_shell.side_effect = _stream([
+        hashlib.md5(b"a" * 100).hexdigest().encode() + b"\n", b"c" * 50])
+
+    _downloadappend(_job(str(tmpdir)), "src", ["*.nc", "*.dcd"])
+
+    listcmd = mock_ssh.call_args[0][1][0]
+
+    assert listcmd.startswith("cd /remote/dir && find . -type f")
+    assert "tail -c +1 traj.nc | head -c 100 | md5sum" in \
+        mock_shell.call_args[0][0][2]
+    assert "tail -c +101 traj.nc | head -c 50" in \
+        mock_shell.call_args[0][0][2]
+    assert tmpdir.join("traj.nc").read_binary() == b"a" * 100 + b"c" * 50
+    assert os.path.getmtime(str(tmpdir.join("traj.nc"))) == 1000.5
+    assert mock_rsync.call_count == 0
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_downloadappend_full(mock_ssh, mock_shell, mock_rsync, tmpdir):
+
+    """
+    Test that new, shrunk and mismatched files are sent in full.
+    """
+
+    tmpdir.join("bad.nc").write_binary(b"a" * 100)
+    tmpdir.join("good.dcd").write_binary(b"b" * 100)
+    tmpdir.join("short.nc").write_binary(b"c" * 100)
+    listed = []
+
+    def _rsync(job, src, dst, includemask, excludemask, options):
+
+        with open(options[0].split("=", 1)[1]) as listfile:
+
+            listed.extend(listfile.read().split())
+
+    mock_ssh.return_value = ("bad.nc\t150\t1.0\ngood.dcd\t120\t1.0\n"
+                             "new.nc\t50\t1.0\nshort.nc\t20\t1.0\n", "", 0)
+    mock_shell.side_effect = _stream([
+        b"0" * 32 + b"\n", b"x" * 50,
+        hashlib.md5(b"b" * 100).hexdigest().encode() + b"\n", b"y" * 20])
+    mock_rsync.side_effect = _rsync
+
+    _downloadappend(_job(str(tmpdir)), "src", ["*.nc", "*.dcd"])
+
+    assert sorted(listed) == ["bad.nc", "new.nc", "short.nc"]
+    assert tmpdir.join("bad.nc").read_binary() == b"a" * 100
+    assert tmpdir.join("good.dcd").read_binary() == b"b" * 100 + b"y" * 20
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_downloadappend_listerror(mock_ssh, tmpdir):
+
+    """
+    Test that a failed listing is raised as an rsync error.
+    """
+
+    mock_ssh.side_effect = exceptions.SSHError("SSH Error", ("", "", 1))
+
+    with pytest.raises(exceptions.RsyncError):
+
+        _downloadappend(_job(str(tmpdir)), "src", ["*.nc"])
@@ -0,0 +1,254 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This testing module contains the tests for the persistent remote shell
+methods within the shellwrappers module.
+"""
+
+import subprocess
+import threading
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import _shellrun, _shellclose, _shellsend, \
+    sendtossh
+
+
+def localshell():
+
+    """
+    Start a local shell to stand in for the remote one.
+    """
+
+    handle = subprocess.Popen(["bash", "-s"], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    return {"env-fix": False, "handle": handle, "lock": threading.Lock(),
+            "sent": None}
+
+
+def test_shellrun_output():
+
+    """
+    Test that stdout, stderr and the exit code are separated per command.
+    """
+
+    shell = localshell()
+
+    output = _shellrun(shell, "echo out; echo err >&2; printf nonewline")
+    assert output == ("out\nnonewline", "err\n", 0)
+
+    output = _shellrun(shell, "cd /\nexit 3")
+    assert output == ("", "", 3)
+
+    _shellclose(shell)
+
+
+def test_shellrun_subshell():
+
+    """
+    Test that state (cwd) does not leak from one command to the next.
+    """
+
+    shell = localshell()
+
+    cwd = _shellrun(shell, "pwd")[0]
+    _shellrun(shell, "cd /")
+
+    assert _shellrun(shell, "pwd")[0] == cwd
+
+    _shellclose(shell)
+
+
+def test_shellrun_closed():
+
+    """
+    Test that a dead shell raises an error.
+    """
+
+    shell = localshell()
+    _shellclose(shell)
+
+    try:
+
+        _shellrun(shell, "true")
+        failed = False
+
+    except (IOError, OSError, ValueError):
+
+        failed = True
+
+    assert failed is True
+
+
+def test_shellsend_off():
+
+    """
+    Test that nothing happens if persistent shells are off.
+    """
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "false",
+        "persistent-shell": "false"
+    }
+
+    assert _shellsend(job, ["ls"]) is None
+
+
+@mock.patch('longbow.shellwrappers._shellstart')
+def test_shellsend_fallback(mock_start):
+
+    """
+    Test that a broken shell is dropped and None is returned.
+    """
+
+    shellwrappers.SSHSHELLS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "false",
+        "persistent-shell": "true"
+    }
+
+    shell = localshell()
+    _shellclose(shell)
+    mock_start.return_value = shell
+
+    assert _shellsend(job, ["ls"]) is None
+    assert shellwrappers.SSHSHELLS == {}
+
+
+@mock.patch('longbow.shellwrappers._shellstart')
+def test_shellsend_delivered(mock_start):
+
+    """
+    Test that a shell which fails once the command has been sent is dropped
+    and the command is given as timed out rather than sent again.
+    """
+
+    shellwrappers.SSHSHELLS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "false",
+        "persistent-shell": "true"
+    }
+
+    shell = localshell()
+    mock_start.return_value = shell
+
+    assert _shellsend(job, ["sleep", "5"], 0.2) == (
+        "", shellwrappers.TIMEOUTMSG, 255)
+    assert shellwrappers.SSHSHELLS == {}
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+@mock.patch('longbow.shellwrappers._shellstart')
+def test_sendtossh_persistentshell(mock_start, mock_sendtoshell):
+
+    """
+    Test that sendtossh uses the persistent shell and sources the profile
+    only once.
+    """
+
+    shellwrappers.SSHSHELLS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "true",
+        "persistent-shell": "true"
+    }
+
+    shell = localshell()
+    mock_start.return_value = shell
+
+    with mock.patch('longbow.shellwrappers._shellrun',
+                    wraps=shellwrappers._shellrun) as mock_run:
+
+        output = sendtossh(job, ["echo", "hello"])
+        sendtossh(job, ["echo", "again"])
+
+    assert output == ("hello\n", "", 0)
+    assert mock_sendtoshell.call_count == 0
+    assert mock_run.call_count == 3
+    assert mock_run.call_args_list[0][0][1] == "source /etc/profile"
+
+    shellwrappers.closeconnections()
+
+
+@mock.patch('longbow.shellwrappers._shellstart')
+def test_shellsend_busy(mock_start):
+
+    """
+    Test that None is returned if the shell is busy with another command, so
+    that the caller uses its own connection.
+    """
+
+    shellwrappers.SSHSHELLS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "false",
+        "persistent-shell": "true"
+    }
+
+    shell = localshell()
+    mock_start.return_value = shell
+
+    shell["lock"].acquire()
+
+    assert _shellsend(job, ["ls"]) is None
+
+    shell["lock"].release()
+
+    assert _shellsend(job, ["echo", "hello"]) == ("hello\n", "", 0)
+
+    shellwrappers.closeconnections()
@@ -0,0 +1,173 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This testing module contains the tests for the remotedelete_many method within
+the shellwrappers module.
+"""
+
+import os
+import subprocess
+import time
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.shellwrappers import remotedelete_many
+
+
+def _runlocal(job, args):
+    """Run the commands given to SSH here instead."""
+    handle = subprocess.Popen(["sh", "-c", " ".join(args)],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    stdout, stderr = handle.communicate()
+
+    return stdout.decode("utf-8"), stderr.decode("utf-8"), handle.returncode
+
+
+def test_remotedeletemany_srcpath():
+
+    """
+    Test that the absolute path exception is raised with non absolute paths.
+    """
+
+    jobs = [
+        {"host": "massive-machine", "destdir": "/path/to/jobone"},
+        {"host": "massive-machine", "destdir": "path/to/jobtwo"}
+    ]
+
+    with pytest.raises(exceptions.AbsolutepathError):
+
+        remotedelete_many(jobs)
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_remotedeletemany_results(mock_sendtossh, tmpdir):
+
+    """
+    Check that the directories are removed by one call and that what happened
+    to each one is reported back.
+    """
+
+    jobone = tmpdir.mkdir("jobone")
+    jobone.join("file.txt").write("output")
+    jobtwo = tmpdir.mkdir("job two")
+
+    jobs = [
+        {"host": "massive-machine", "destdir": str(jobone)},
+        {"host": "massive-machine", "destdir": str(tmpdir.join("missing"))},
+        {"host": "massive-machine", "destdir": str(jobtwo)}
+    ]
+
+    mock_sendtossh.side_effect = _runlocal
+
+    results = remotedelete_many(jobs)
+
+    assert mock_sendtossh.call_count == 1
+    assert results == ["deleted", "missing", "deleted"]
+    assert not os.path.exists(str(jobone))
+    assert not os.path.exists(str(jobtwo))
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_remotedeletemany_background(mock_sendtossh, tmpdir):
+
+    """
+    Check that directories can be left being removed in the background.
+    """
+
+    jobone = tmpdir.mkdir("jobone")
+
+    jobs = [
+        {"host": "massive-machine", "destdir": str(jobone)},
+        {"host": "massive-machine", "destdir": str(tmpdir.join("missing"))}
+    ]
+
+    mock_sendtossh.side_effect = _runlocal
+
+    results = remotedelete_many(jobs, True)
+
+    assert results == ["deleted", "missing"]
+
+    for _ in range(50):
+
+        if not os.path.exists(str(jobone)):
+
+            break
+
+        time.sleep(0.1)
+
+    assert not os.path.exists(str(jobone))
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_remotedeletemany_noreply(mock_sendtossh):
+
+    """
+    Check that directories the script did not report on are given as failed.
+    """
+
+    jobs = [
+        {"host": "massive-machine", "destdir": "~/path/to/jobone"}
+    ]
+
+    mock_sendtossh.return_value = ("", "", 0)
+
+    assert remotedelete_many(jobs) == ["failed"]
+    assert "~/path/to/jobone" in mock_sendtossh.call_args[0][1][0]
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_remotedeletemany_exceptiontest(mock_sendtossh):
+
+    """
+    Check that the SSH exception is percolated properly.
+    """
+
+    jobs = [
+        {"host": "massive-machine", "destdir": "/path/to/jobone"}
+    ]
+
+    mock_sendtossh.side_effect = exceptions.SSHError("SSHError", "Error")
+
+    with pytest.raises(exceptions.RemotedeleteError):
+
+        remotedelete_many(jobs)
@@ -0,0 +1,296 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the retry, timeout and circuit
+breaker methods within the shellwrappers module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import _retrypolicy, _retrydelay, sendtoshell, \
+    sendtossh, sendtorsync, connectionsummary
+
+
+def _job():
+
+    return {
+        "env-fix": "false",
+        "host": "massive-machine",
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "retry-attempts": "2",
+        "retry-delay": "5",
+        "ssh-timeout": "60",
+        "breaker-threshold": "2",
+        "breaker-cooldown": "600"
+    }
+
+
+def test_retrypolicy_defaults():
+
+    """
+    Test that jobs without the retry parameters get the old behaviour.
+    """
+
+    policy = _retrypolicy({"host": "massive-machine"})
+
+    assert policy["retry-attempts"] == 3
+    assert policy["retry-delay"] == 10
+    assert policy["ssh-timeout"] == 0
+    assert policy["breaker-threshold"] == 0
+
+
+@mock.patch('random.uniform')
+def test_retrydelay_backoff(mock_uniform):
+
+    """
+    Test that the wait doubles with each attempt and has jitter applied.
+    """
+
+    mock_uniform.return_value = 1.0
+    policy = _retrypolicy(_job())
+
+    assert _retrydelay(policy, 1) == 5
+    assert _retrydelay(policy, 2) == 10
+    assert _retrydelay(policy, 3) == 20
+    assert _retrydelay(policy, 20) == 320
+
+    mock_uniform.return_value = 0.5
+
+    assert _retrydelay(policy, 2) == 5
+
+
+def test_sendtoshell_timeout():
+
+    """
+    Test that a command running past its timeout is killed and given the same
+    exit code as a dropped connection.
+    """
+
+    stdout, stderr, errorstate = sendtoshell(["sleep", "10"], timeout=0.5)
+
+    assert errorstate == 255
+    assert shellwrappers.TIMEOUTMSG in stderr
+
+
+def test_sendtoshell_notimeout():
+
+    """
+    Test that a command finishing inside its timeout is left alone.
+    """
+
+    stdout, stderr, errorstate = sendtoshell(["echo", "hello"], timeout=10)
+
+    assert errorstate == 0
+    assert stdout == "hello\n"
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtossh_retryconfig(mock_sendtoshell, mock_sleep):
+
+    """
+    Test that the number of attempts and the timeout come from the job.
+    """
+
+    shellwrappers.CIRCUITS.clear()
+    shellwrappers.STATS.clear()
+
+    mock_sendtoshell.return_value = ("", shellwrappers.TIMEOUTMSG, 255)
+
+    with pytest.raises(exceptions.SSHError):
+
+        sendtossh(_job(), ["ls"])
+
+    assert mock_sendtoshell.call_count == 2
+    assert mock_sendtoshell.call_args[1]["timeout"] == 60
+    assert mock_sleep.call_count == 1
+    assert shellwrappers.STATS["massive-machine"]["timeouts"] == 2
+    assert shellwrappers.STATS["massive-machine"]["retries"] == 1
+    assert shellwrappers.STATS["massive-machine"]["failures"] == 1
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtossh_breaker(mock_sendtoshell, mock_sleep):
+
+    """
+    Test that the circuit breaker opens after repeated failures and then stops
+    calls going out to the host.
+    """
+
+    shellwrappers.CIRCUITS.clear()
+    shellwrappers.STATS.clear()
+
+    mock_sendtoshell.return_value = ("", "", 255)
+
+    for _ in range(2):
+
+        with pytest.raises(exceptions.SSHError):
+
+            sendtossh(_job(), ["ls"])
+
+    assert mock_sendtoshell.call_count == 4
+
+    with pytest.raises(exceptions.SSHError):
+
+        sendtossh(_job(), ["ls"])
+
+    assert mock_sendtoshell.call_count == 4
+    assert shellwrappers.STATS["massive-machine"]["trips"] == 1
+
+    with pytest.raises(exceptions.RsyncError):
+
+        sendtorsync(_job(), "src", "dst", "", "")
+
+    assert mock_sendtoshell.call_count == 4
+
+
+@mock.patch('time.time')
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtossh_breakerreset(mock_sendtoshell, mock_sleep, mock_time):
+
+    """
+    Test that once the cool down is over a call is let through, and that a
+    success closes the breaker.
+    """
+
+    shellwrappers.CIRCUITS.clear()
+    shellwrappers.STATS.clear()
+
+    mock_time.return_value = 1000.0
+    mock_sendtoshell.return_value = ("", "", 255)
+
+    for _ in range(2):
+
+        with pytest.raises(exceptions.SSHError):
+
+            sendtossh(_job(), ["ls"])
+
+    mock_time.return_value = 1700.0
+    mock_sendtoshell.return_value = ("output", "", 0)
+
+    assert sendtossh(_job(), ["ls"])[0] == "output"
+
+    key = ("juan_trique-ponee", "massive-machine", "22")
+
+    assert shellwrappers.CIRCUITS[key]["opened"] is None
+    assert shellwrappers.CIRCUITS[key]["failures"] == 0
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtossh_breakerremote(mock_sendtoshell, mock_sleep):
+
+    """
+    Test that commands that fail on the remote host don't count towards the
+    circuit breaker.
+    """
+
+    shellwrappers.CIRCUITS.clear()
+
+    mock_sendtoshell.return_value = ("", "", 1)
+
+    for _ in range(3):
+
+        with pytest.raises(exceptions.SSHError):
+
+            sendtossh(_job(), ["ls"])
+
+    assert mock_sendtoshell.call_count == 3
+
+    key = ("juan_trique-ponee", "massive-machine", "22")
+
+    assert shellwrappers.CIRCUITS[key]["opened"] is None
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtorsync_timeout(mock_sendtoshell, mock_sleep):
+
+    """
+    Test that rsync is told to give up on stalled transfers.
+    """
+
+    shellwrappers.CIRCUITS.clear()
+
+    mock_sendtoshell.return_value = ("", "", 0)
+
+    sendtorsync(_job(), "src", "dst", "", "")
+
+    callargs = mock_sendtoshell.call_args[0][0]
+
+    assert " ".join(callargs) == \
+        "rsync -azP --timeout=60 --stats -e ssh -p 22 src dst"
+
+
+@mock.patch('longbow.shellwrappers.LOG')
+def test_connectionsummary(mock_log):
+
+    """
+    Test that the statistics for each host are logged.
+    """
+
+    shellwrappers.STATS.clear()
+    shellwrappers.STATS["massive-machine"] = {
+        "calls": 10, "retries": 2, "timeouts": 1, "failures": 0, "trips": 0,
+        "transfers": 0, "bytes": 0, "files": 0, "seconds": 0.0}
+
+    connectionsummary()
+
+    assert mock_log.info.call_count == 1
+    assert mock_log.info.call_args[0][1:] == ("massive-machine", 10, 2, 1, 0,
+                                              0)
+
+    shellwrappers.STATS["massive-machine"].update(
+        {"transfers": 2, "bytes": 4194304, "files": 3, "seconds": 2.0})
+
+    connectionsummary()
+
+    assert mock_log.info.call_count == 3
+    assert mock_log.info.call_args[0][1:] == ("massive-machine", 2, 3, 4.0,
+                                              2.0, 2.0)
+
+    shellwrappers.STATS.clear()
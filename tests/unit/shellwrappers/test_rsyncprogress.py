@@ -0,0 +1,158 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the parsing of rsync output within
+the shellwrappers module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import sendtorsync, sendtoshell
+
+
+def _job():
+
+    return {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine"
+    }
+
+
+def test_rsyncprogress_stats():
+
+    """
+    Test that the statistics from both new and old versions of rsync are
+    picked out.
+    """
+
+    stats = {}
+
+    for line in ["Number of files: 12 (reg: 10, dir: 2)",
+                 "Number of regular files transferred: 1,234",
+                 "Total bytes sent: 2,345,678",
+                 "Total bytes received: 1,024"]:
+
+        shellwrappers._rsyncprogress(_job(), stats, line)
+
+    assert stats == {"files": 1234, "sent": 2345678, "received": 1024}
+
+    stats = {}
+
+    for line in ["Number of files transferred: 3",
+                 "Total bytes sent: 512"]:
+
+        shellwrappers._rsyncprogress(_job(), stats, line)
+
+    assert stats == {"files": 3, "sent": 512}
+
+
+@mock.patch('longbow.shellwrappers.LOG')
+def test_rsyncprogress_progress(mock_log):
+
+    """
+    Test that progress lines are logged, but not too often.
+    """
+
+    stats = {}
+
+    for line in ["    32,768  50%    1.02MB/s    0:00:01 (xfr#3, to-chk=5/10)",
+                 "    65,536 100%    1.10MB/s    0:00:00 (xfr#4, to-chk=4/10)",
+                 "    65,536 100%    1.10MB/s    0:00:00 (xfer#5, "
+                 "to-check=3/10)"]:
+
+        shellwrappers._rsyncprogress(_job(), stats, line)
+
+    assert mock_log.debug.call_count == 1
+    assert mock_log.debug.call_args[0][2:] == ("3", "5", "10", "1.02MB/s")
+    assert "files" not in stats
+
+
+def test_sendtoshell_stream():
+
+    """
+    Test that output is handed over line by line, carriage returns included,
+    and that standard error is still returned.
+    """
+
+    lines = []
+
+    stdout, stderr, errorstate = sendtoshell(
+        ["sh", "-c", "printf '10%%\\r50%%\\rdone\\nlast'; echo oops >&2"],
+        stream=lines.append)
+
+    assert lines == ["10%", "50%", "done", "last"]
+    assert stdout == "10%\n50%\ndone\nlast"
+    assert stderr.strip() in ("oops", b"oops")
+    assert errorstate == 0
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtorsync_transfer(mock_sendtoshell):
+
+    """
+    Test that the statistics of a transfer are returned and added to the
+    totals for the job and its host.
+    """
+
+    def _rsync(cmd, stream):
+
+        stream("Number of regular files transferred: 2")
+        stream("Total bytes sent: 1,000")
+        stream("Total bytes received: 48")
+
+        return "", "", 0
+
+    job = _job()
+    mock_sendtoshell.side_effect = _rsync
+    shellwrappers.STATS.clear()
+
+    transfer = sendtorsync(job, "src", "dst", "", "")
+    sendtorsync(job, "src", "dst", "", "")
+
+    assert transfer["bytes"] == 1048
+    assert transfer["files"] == 2
+    assert job["transfer-bytes"] == "2096"
+    assert job["transfer-files"] == "4"
+    assert shellwrappers.STATS["massive-machine"]["transfers"] == 2
+    assert shellwrappers.STATS["massive-machine"]["bytes"] == 2096
+
+    shellwrappers.STATS.clear()
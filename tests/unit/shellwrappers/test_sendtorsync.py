@@ -43,6 +43,8 @@ except ImportError:
 
     import mock
 
+import os
+
 import pytest
 
 import longbow.exceptions as exceptions
@@ -97,11 +99,24 @@ def test_sendtorsync_rsyncformat1(mock_sendtoshell):
     sendtorsync(job, "src", "dst", "", "")
 
     callargs = mock_sendtoshell.call_args[0][0]
-    testargs = "rsync -azP -e ssh -p 22 src dst"
+    testargs = "rsync -azP --stats -e ssh -p 22 src dst"
 
     assert " ".join(callargs) == testargs
 
 
+def _readfilter(cmd, rules):
+    """Keep the filter rules given to rsync before the file is removed."""
+    for arg in cmd:
+
+        if arg.startswith("--filter=merge "):
+
+            with open(arg[len("--filter=merge "):]) as filterfile:
+
+                rules.extend(filterfile.read().splitlines())
+
+    return "Output message", "Error message", 0
+
+
 @mock.patch('longbow.shellwrappers.sendtoshell')
 def test_sendtorsync_rsyncformat2(mock_sendtoshell):
 
@@ -117,15 +132,17 @@ def test_sendtorsync_rsyncformat2(mock_sendtoshell):
         "host": "massive-machine"
     }
 
-    # Set the return values of sendtoshell.
-    mock_sendtoshell.return_value = "Output message", "Error message", 0
+    rules = []
+    mock_sendtoshell.side_effect = lambda cmd, stream: _readfilter(cmd, rules)
 
     sendtorsync(job, "src", "dst", "", "exfile")
 
     callargs = mock_sendtoshell.call_args[0][0]
-    testargs = "rsync -azP --exclude exfile -e ssh -p 22 src dst"
 
-    assert " ".join(callargs) == testargs
+    assert " ".join(callargs[:3] + callargs[4:]) == \
+        "rsync -azP --stats -e ssh -p 22 src dst"
+    assert callargs[3].startswith("--filter=merge ")
+    assert rules == ["- exfile"]
 
 
 @mock.patch('longbow.shellwrappers.sendtoshell')
@@ -143,16 +160,12 @@ def test_sendtorsync_rsyncformat3(mock_sendtoshell):
         "host": "massive-machine"
     }
 
-    # Set the return values of sendtoshell.
-    mock_sendtoshell.return_value = "Output message", "Error message", 0
+    rules = []
+    mock_sendtoshell.side_effect = lambda cmd, stream: _readfilter(cmd, rules)
 
     sendtorsync(job, "src", "dst", "", "exfile1, exfile2")
 
-    callargs = mock_sendtoshell.call_args[0][0]
-    testargs = ("rsync -azP --exclude exfile1 --exclude exfile2 -e ssh -p 22 "
-                "src dst")
-
-    assert " ".join(callargs) == testargs
+    assert rules == ["- exfile1", "- exfile2"]
 
 
 @mock.patch('longbow.shellwrappers.sendtoshell')
@@ -170,13 +183,37 @@ def test_sendtorsync_rsyncformat4(mock_sendtoshell):
         "host": "massive-machine"
     }
 
-    # Set the return values of sendtoshell.
-    mock_sendtoshell.return_value = "Output message", "Error message", 0
+    rules = []
+    mock_sendtoshell.side_effect = lambda cmd, stream: _readfilter(cmd, rules)
 
     sendtorsync(job, "src", "dst", "incfile", "exfile1, exfile2")
 
     callargs = mock_sendtoshell.call_args[0][0]
-    testargs = ("rsync -azP --include incfile --exclude exfile1 --exclude "
-                "exfile2 -e ssh -p 22 src dst")
 
-    assert " ".join(callargs) == testargs
+    assert "--include" not in callargs and "--exclude" not in callargs
+    assert rules == ["+ incfile", "- exfile1", "- exfile2"]
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtorsync_filterremoved(mock_sendtoshell):
+
+    """
+    Check that the file of filter rules is removed, even if rsync fails.
+    """
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "retry-attempts": "1"
+    }
+
+    mock_sendtoshell.return_value = "Output message", "Error message", 1
+
+    with pytest.raises(exceptions.RsyncError):
+
+        sendtorsync(job, "src", "dst", "incfile", "exfile")
+
+    callargs = mock_sendtoshell.call_args[0][0]
+
+    assert not os.path.exists(callargs[3][len("--filter=merge "):])
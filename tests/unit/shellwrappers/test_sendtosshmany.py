@@ -0,0 +1,164 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the sendtosshmany method within
+the shellwrappers module.
+"""
+
+import subprocess
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import sendtosshmany
+
+
+def _job():
+    """Make a job that sendtosshmany can connect with."""
+    return {"user": "user", "host": "host", "port": "22", "env-fix": "false",
+            "retry-attempts": "3", "retry-delay": "0"}
+
+
+def _runlocal(cmd):
+    """Run the script given to SSH here instead."""
+    handle = subprocess.Popen(["sh", "-c", cmd[-1]],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    stdout, stderr = handle.communicate()
+
+    return stdout.decode("utf-8"), stderr.decode("utf-8"), handle.returncode
+
+
+@mock.patch('longbow.shellwrappers._shellsend')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtosshmany_split(mock_shell, mock_send):
+
+    """
+    Test that one SSH call is made and the output of each lot of commands
+    comes back separately.
+    """
+
+    mock_send.return_value = None
+    mock_shell.side_effect = _runlocal
+
+    shellouts = sendtosshmany(_job(), [
+        ["cd /\n", "echo Submitted 123"],
+        ["echo oops >&2\n", "exit 3"],
+        ["printf 'no newline'"]])
+
+    assert mock_shell.call_count == 1
+    assert shellouts[0] == ("Submitted 123\n", "", 0)
+    assert shellouts[1] == ("", "oops\n", 3)
+    assert shellouts[2] == ("no newline", "", 0)
+
+
+@mock.patch('longbow.shellwrappers._shellsend')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtosshmany_missing(mock_shell, mock_send):
+
+    """
+    Test that commands with no output from the script are given as failed.
+    """
+
+    mock_send.return_value = None
+    mock_shell.return_value = ("", "", 0)
+
+    shellouts = sendtosshmany(_job(), [["echo hello"]])
+
+    assert shellouts[0][2] == 255
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers._shellsend')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtosshmany_partial(mock_shell, mock_send, mock_sleep):
+
+    """
+    Test that when the connection drops part way through, only the lots that
+    were not reported on are sent again.
+    """
+
+    scripts = []
+
+    def _dropped(cmd):
+        """Run the script but drop the connection after the first lot."""
+        scripts.append(cmd[-1])
+        stdout, stderr, _ = _runlocal(cmd)
+
+        if len(scripts) == 1:
+
+            return stdout[:stdout.index("Submitted 1") + 12], stderr, 255
+
+        return stdout, stderr, 0
+
+    shellwrappers.STATS.clear()
+    mock_send.return_value = None
+    mock_shell.side_effect = _dropped
+
+    shellouts = sendtosshmany(_job(), [
+        ["echo Submitted 1"], ["echo Submitted 2"], ["echo Submitted 3"]])
+
+    assert mock_shell.call_count == 2
+    assert mock_sleep.call_count == 1
+    assert "Submitted 1" not in scripts[1]
+    assert "Submitted 2" in scripts[1]
+    assert shellouts == [("Submitted 1\n", "", 0), ("Submitted 2\n", "", 0),
+                         ("Submitted 3\n", "", 0)]
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers._shellsend')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtosshmany_notimeout(mock_shell, mock_send, mock_sleep):
+
+    """
+    Test that the batch is sent without a timeout even if one is set.
+    """
+
+    job = _job()
+    job["ssh-timeout"] = "5"
+    mock_send.return_value = None
+    mock_shell.side_effect = _runlocal
+
+    sendtosshmany(job, [["echo hello"]])
+
+    assert len(mock_send.call_args[0]) == 2
+    assert "timeout" not in mock_send.call_args[1]
+    assert "timeout" not in mock_shell.call_args[1]
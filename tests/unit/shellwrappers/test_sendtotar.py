@@ -0,0 +1,160 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the sendtotar method within the
+shellwrappers module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.shellwrappers import sendtotar
+
+
+def _job():
+
+    return {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "ssh-multiplex": "false",
+        "ssh-timeout": "0"
+    }
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtotar_upload(mock_sendtoshell):
+
+    """
+    Test that an upload packs the local files and unpacks them remotely.
+    """
+
+    mock_sendtoshell.return_value = "", "", 0
+
+    sendtotar(_job(), "/local/dir/", "~/remote/dir", "upload", "", "",
+              1048576)
+
+    callargs = mock_sendtoshell.call_args[0][0]
+
+    assert callargs[:2] == ["sh", "-c"]
+    assert callargs[2] == (
+        "cd /local/dir/ && find . '!' -type d -size -1048576c | tar -czf - "
+        "-T - | ssh -p 22 juan_trique-ponee@massive-machine 'mkdir -p "
+        "~/remote/dir && tar -xzf - -C ~/remote/dir'")
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtotar_download(mock_sendtoshell):
+
+    """
+    Test that a download packs the remote files and unpacks them locally.
+    """
+
+    mock_sendtoshell.return_value = "", "", 0
+
+    sendtotar(_job(), "/local/dir", "/remote/dir", "download", "", "")
+
+    callargs = mock_sendtoshell.call_args[0][0]
+
+    assert callargs[2] == (
+        "mkdir -p /local/dir && ssh -p 22 juan_trique-ponee@massive-machine "
+        "'cd /remote/dir && find . '\"'\"'!'\"'\"' -type d | tar -czf - -T -"
+        "' | tar -xzf - -C /local/dir")
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtotar_masks(mock_sendtoshell):
+
+    """
+    Test that the masks and anchored excludes make it into the file selection.
+    """
+
+    mock_sendtoshell.return_value = "", "", 0
+
+    sendtotar(_job(), "/local/dir", "/remote/dir", "upload", "keep.log",
+              "*.log, tmp/", None, ["--exclude", "/big.top"])
+
+    callargs = mock_sendtoshell.call_args[0][0][2]
+
+    assert ("'!' '(' -path ./big.top -o -path './big.top/*' ')' '(' '(' "
+            "-name keep.log -o -path '*/keep.log/*' ')' -o '!' '(' -name "
+            "'*.log' -o -path '*/*.log/*' -o -name tmp -o -path '*/tmp/*' ')' "
+            "')'") in callargs
+
+
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtotar_timeout(mock_sendtoshell):
+
+    """
+    Test that ssh is told to give up on stalled connections.
+    """
+
+    job = _job()
+    job["ssh-timeout"] = "300"
+
+    mock_sendtoshell.return_value = "", "", 0
+
+    sendtotar(job, "/local/dir", "/remote/dir", "download", "", "")
+
+    callargs = mock_sendtoshell.call_args[0][0][2]
+
+    assert ("ssh -p 22 -o ServerAliveInterval=100 -o ServerAliveCountMax=3 "
+            "juan_trique-ponee@massive-machine") in callargs
+
+
+@mock.patch('time.sleep')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtotar_retries(mock_sendtoshell, mock_time):
+
+    """
+    Test that the transfer is tried three times before finally raising the
+    RsyncError exception.
+    """
+
+    mock_sendtoshell.return_value = "", "Error message", 2
+    mock_time.return_value = None
+
+    with pytest.raises(exceptions.RsyncError):
+
+        sendtotar(_job(), "/local/dir", "/remote/dir", "upload", "", "")
+
+    assert mock_sendtoshell.call_count == 3
@@ -0,0 +1,202 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+This testing module contains the tests for the shared SSH connection methods
+within the shellwrappers module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.shellwrappers as shellwrappers
+from longbow.shellwrappers import _sshmultiplex, _sshmastercheck, sendtossh, \
+    sendtorsync
+
+
+def test_sshmultiplex_off():
+
+    """
+    Test that no options are given if multiplexing is not switched on.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "ssh-multiplex": "false"
+    }
+
+    assert _sshmultiplex(job) == []
+    assert shellwrappers.SSHMASTERS == {}
+
+
+@mock.patch('os.path.exists')
+@mock.patch('longbow.shellwrappers._sshmasterstart')
+def test_sshmultiplex_start(mock_start, mock_exists):
+
+    """
+    Test that a master is started once and then reused.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "ssh-multiplex": "true"
+    }
+
+    mock_start.return_value = "/tmp/sock"
+    mock_exists.return_value = True
+
+    assert _sshmultiplex(job) == ["-o", "ControlPath=/tmp/sock"]
+    assert _sshmultiplex(job) == ["-o", "ControlPath=/tmp/sock"]
+    assert mock_start.call_count == 1
+
+
+@mock.patch('longbow.shellwrappers._sshmasterstart')
+def test_sshmultiplex_failed(mock_start):
+
+    """
+    Test that a master that failed to start is not retried.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "ssh-multiplex": "true"
+    }
+
+    mock_start.return_value = None
+
+    assert _sshmultiplex(job) == []
+    assert _sshmultiplex(job) == []
+    assert mock_start.call_count == 1
+
+
+@mock.patch('os.path.exists')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sshmastercheck_down(mock_sendtoshell, mock_exists):
+
+    """
+    Test that an unhealthy master is dropped so it gets restarted.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+    shellwrappers.SSHMASTERS[("user", "machine", "22")] = "/tmp/sock"
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine"
+    }
+
+    mock_sendtoshell.return_value = ("", "No ControlPath", 255)
+    mock_exists.return_value = False
+
+    _sshmastercheck(job)
+
+    assert shellwrappers.SSHMASTERS == {}
+
+
+@mock.patch('os.path.exists')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtossh_multiplex(mock_sendtoshell, mock_exists):
+
+    """
+    Test that ssh commands go through the shared connection.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+    shellwrappers.SSHMASTERS[("user", "machine", "22")] = "/tmp/sock"
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "env-fix": "false",
+        "ssh-multiplex": "true"
+    }
+
+    mock_sendtoshell.return_value = ("", "", 0)
+    mock_exists.return_value = True
+
+    sendtossh(job, ["ls"])
+
+    callargs = " ".join(mock_sendtoshell.call_args[0][0])
+
+    assert callargs == "ssh -o ControlPath=/tmp/sock -p 22 user@machine ls"
+
+    shellwrappers.SSHMASTERS.clear()
+
+
+@mock.patch('os.path.exists')
+@mock.patch('longbow.shellwrappers.sendtoshell')
+def test_sendtorsync_multiplex(mock_sendtoshell, mock_exists):
+
+    """
+    Test that rsync transfers go through the shared connection.
+    """
+
+    shellwrappers.SSHMASTERS.clear()
+    shellwrappers.SSHMASTERS[("user", "machine", "22")] = "/tmp/sock"
+
+    job = {
+        "port": "22",
+        "user": "user",
+        "host": "machine",
+        "ssh-multiplex": "true"
+    }
+
+    mock_sendtoshell.return_value = ("", "", 0)
+    mock_exists.return_value = True
+
+    sendtorsync(job, "src", "dst", "", "")
+
+    callargs = " ".join(mock_sendtoshell.call_args[0][0])
+
+    assert callargs == ("rsync -azP --stats -e ssh -o ControlPath=/tmp/sock "
+                        "-p 22 src dst")
+
+    shellwrappers.SSHMASTERS.clear()
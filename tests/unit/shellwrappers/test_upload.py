@@ -46,7 +46,7 @@ except ImportError:
 import pytest
 
 import longbow.exceptions as exceptions
-from longbow.shellwrappers import upload
+from longbow.shellwrappers import upload, TARMAXSIZE
 
 
 def test_upload_srcpath():
@@ -161,3 +161,113 @@ def test_upload_exceptiontest(mock_sendtorsync):
     with pytest.raises(exceptions.RsyncError):
 
         upload(job)
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtotar')
+def test_upload_tarstream(mock_sendtotar, mock_sendtorsync, tmpdir):
+
+    """
+    Check that small files go in a tar stream and large files are left to
+    rsync.
+    """
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "~/destination/directory/path",
+        "localworkdir": str(tmpdir),
+        "transfer-mode": "tarstream",
+        "upload-include": "",
+        "upload-exclude": ""
+    }
+
+    tmpdir.join("small.in").write("a")
+
+    upload(job)
+
+    assert mock_sendtotar.call_count == 1
+    assert mock_sendtotar.call_args[0][3] == "upload"
+    assert mock_sendtorsync.call_count == 0
+
+    tmpdir.join("large.top").write("a" * TARMAXSIZE)
+
+    upload(job, ["--exclude", "/cached.top"])
+
+    assert mock_sendtotar.call_count == 2
+    assert mock_sendtorsync.call_count == 1
+    assert mock_sendtorsync.call_args[0][5] == [
+        "--exclude", "/cached.top", "--min-size=" + str(TARMAXSIZE)]
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_upload_manifest(mock_sendtorsync, tmpdir):
+
+    """
+    Check that files named exactly by the masks are given to rsync as a list
+    of files rather than as masks.
+    """
+
+    tmpdir.join("input").write("data")
+    tmpdir.join("coords").write("data")
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "~/destination/directory/path",
+        "localworkdir": str(tmpdir),
+        "upload-include": "input, coords, missing, input",
+        "upload-exclude": "*"
+    }
+
+    files = []
+
+    def _readfiles(job, src, dst, include, exclude, options):
+
+        with open(options[-1][len("--files-from="):]) as listfile:
+
+            files.extend(listfile.read().splitlines())
+
+    mock_sendtorsync.side_effect = _readfiles
+
+    upload(job, ["--exclude", "/big"])
+
+    callargs = mock_sendtorsync.call_args[0]
+
+    assert callargs[3] == "" and callargs[4] == ""
+    assert callargs[5][:2] == ["--exclude", "/big"]
+    assert files == ["input", "coords"]
+
+    job["upload-include"] = "input, *.in"
+    mock_sendtorsync.side_effect = None
+
+    upload(job)
+
+    assert mock_sendtorsync.call_args[0][3] == "input, *.in"
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_upload_mkdir(mock_sendtorsync):
+
+    """
+    Check that the remote job directory is made as rsync starts, rather than
+    by an SSH call of its own.
+    """
+
+    job = {
+        "port": "22",
+        "user": "juan_trique-ponee",
+        "host": "massive-machine",
+        "destdir": "~/destination/directory path",
+        "localworkdir": "/destination/directory/path",
+        "upload-include": "",
+        "upload-exclude": ""
+    }
+
+    upload(job, ["--exclude", "/big"])
+
+    assert mock_sendtorsync.call_args[0][5] == [
+        "--exclude", "/big",
+        "--rsync-path=mkdir -p ~/'destination/directory path' && rsync"]
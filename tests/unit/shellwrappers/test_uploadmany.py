@@ -0,0 +1,159 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the uploadmany and downloadmany
+methods within the shellwrappers module.
+"""
+
+import os
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import pytest
+
+import longbow.exceptions as exceptions
+from longbow.shellwrappers import uploadmany, downloadmany
+
+
+def _jobs(tmpdir):
+
+    joblist = []
+
+    for name in ["jobone", "jobtwo"]:
+
+        localdir = os.path.join(str(tmpdir), name)
+        os.mkdir(localdir)
+
+        joblist.append({
+            "destdir": "/remote/work/" + name + "12345",
+            "download-exclude": "",
+            "download-include": "",
+            "host": "massive-machine",
+            "localworkdir": localdir,
+            "port": "22",
+            "upload-exclude": "*.log",
+            "upload-include": "",
+            "user": "juan_trique-ponee"
+        })
+
+    return joblist
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_uploadmany_single(mock_rsync, tmpdir):
+
+    """
+    Test that all of the jobs go in one rsync call with a manifest of their
+    directories.
+    """
+
+    joblist = _jobs(tmpdir)
+    seen = {}
+
+    def _rsync(job, src, dst, includemask, excludemask, options):
+
+        manifest = [a for a in options if a.startswith("--files-from=")][0]
+
+        with open(manifest.split("=", 1)[1]) as listfile:
+
+            seen["manifest"] = listfile.read().split()
+
+        seen["links"] = dict(
+            (name, os.path.realpath(os.path.join(src, name)))
+            for name in os.listdir(src))
+
+        return {"bytes": 100, "files": 2, "seconds": 1.0}
+
+    mock_rsync.side_effect = _rsync
+
+    uploadmany(joblist)
+
+    assert mock_rsync.call_count == 1
+
+    args = mock_rsync.call_args[0]
+
+    assert args[2] == "juan_trique-ponee@massive-machine:/remote/work/"
+    assert args[4] == "*.log"
+    assert "-r" in args[5]
+    assert "--copy-dirlinks" in args[5]
+    assert "--rsync-path=mkdir -p /remote/work && rsync" in args[5]
+    assert seen["manifest"] == ["jobone12345", "jobtwo12345"]
+    assert seen["links"]["jobone12345"] == os.path.realpath(
+        joblist[0]["localworkdir"])
+    assert not os.path.exists(args[1])
+    assert joblist[0]["transfer-bytes"] == "50"
+    assert joblist[1]["transfer-files"] == "1"
+    assert joblist[1]["transfer-seconds"] == "0.5"
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_downloadmany_single(mock_rsync, tmpdir):
+
+    """
+    Test that the download goes the other way and keeps the symlinks to the
+    local directories.
+    """
+
+    joblist = _jobs(tmpdir)
+
+    downloadmany(joblist)
+
+    args = mock_rsync.call_args[0]
+
+    assert mock_rsync.call_count == 1
+    assert args[1] == "juan_trique-ponee@massive-machine:/remote/work/"
+    assert "--keep-dirlinks" in args[5]
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+def test_uploadmany_abspath(mock_rsync, tmpdir):
+
+    """
+    Test that relative paths are refused.
+    """
+
+    joblist = _jobs(tmpdir)
+    joblist[1]["destdir"] = "remote/work/jobtwo12345"
+
+    with pytest.raises(exceptions.AbsolutepathError):
+
+        uploadmany(joblist)
+
+    assert mock_rsync.call_count == 0
@@ -0,0 +1,288 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the remote input cache methods,
+including prunecache, within the staging module.
+"""
+
+import hashlib
+import os
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.exceptions as exceptions
+import longbow.staging as staging
+from longbow.staging import _cacheinputs, _cachecandidates, _filehash, \
+    prunecache, stage_upstream
+
+
+def _job(tmpdir):
+
+    localdir = str(tmpdir)
+
+    with open(os.path.join(localdir, "big.top"), "wb") as topfile:
+
+        topfile.write(b"a" * staging.CACHEMINSIZE)
+
+    with open(os.path.join(localdir, "copy.top"), "wb") as topfile:
+
+        topfile.write(b"a" * staging.CACHEMINSIZE)
+
+    with open(os.path.join(localdir, "small.in"), "wb") as infile:
+
+        infile.write(b"a")
+
+    return {
+        "destdir": "/remote/work/jobone12345",
+        "host": "massive-machine",
+        "input-cache": "true",
+        "jobname": "jobone",
+        "localworkdir": localdir,
+        "port": "22",
+        "remoteworkdir": "/remote/work",
+        "resource": "test-machine",
+        "upload-exclude": "",
+        "upload-include": "",
+        "user": "juan_trique-ponee"
+    }
+
+
+def _reset():
+
+    staging.HASHINDEX["loaded"] = True
+    staging.HASHINDEX["changed"] = False
+    staging.HASHINDEX["files"] = {}
+
+
+def test_cachecandidates_size(tmpdir):
+
+    """
+    Test that only large files are put through the cache.
+    """
+
+    assert _cachecandidates(_job(tmpdir)) == ["big.top", "copy.top"]
+
+
+def test_cachecandidates_masks(tmpdir):
+
+    """
+    Test that the upload masks are honoured.
+    """
+
+    job = _job(tmpdir)
+    job["upload-include"] = "big.top, small.in"
+    job["upload-exclude"] = "*"
+
+    assert _cachecandidates(job) == ["big.top"]
+
+    job["upload-include"] = ""
+    job["upload-exclude"] = "*.top"
+
+    assert _cachecandidates(job) == []
+
+
+def test_filehash_index(tmpdir):
+
+    """
+    Test that a file is only hashed again if it changes.
+    """
+
+    _reset()
+    job = _job(tmpdir)
+    path = os.path.join(job["localworkdir"], "big.top")
+    digest = hashlib.sha256(b"a" * staging.CACHEMINSIZE).hexdigest()
+
+    assert _filehash(path) == digest
+    assert staging.HASHINDEX["changed"] is True
+
+    with mock.patch('hashlib.sha256') as mock_sha:
+
+        assert _filehash(path) == digest
+        assert mock_sha.call_count == 0
+
+    _reset()
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_cacheinputs_missing(mock_ssh, mock_rsync, tmpdir):
+
+    """
+    Test that only the missing blob is uploaded, once, and then linked into
+    the job directory for each file using it.
+    """
+
+    _reset()
+    job = _job(tmpdir)
+    digest = hashlib.sha256(b"a" * staging.CACHEMINSIZE).hexdigest()
+    uploaded = []
+
+    def _rsync(job, src, dst, includemask, excludemask, options):
+
+        uploaded.extend(os.listdir(src))
+
+    mock_ssh.return_value = (digest + "\n", "", 0)
+    mock_rsync.side_effect = _rsync
+
+    cached = _cacheinputs(job)
+
+    assert cached == ["big.top", "copy.top"]
+    assert uploaded == [digest]
+    assert mock_rsync.call_args[0][2] == \
+        "juan_trique-ponee@massive-machine:/remote/work/.longbow-cache/"
+
+    linkcmd = mock_ssh.call_args[0][1][0]
+
+    assert linkcmd.count("ln -f /remote/work/.longbow-cache/" + digest) == 2
+    assert "/remote/work/jobone12345/copy.top" in linkcmd
+
+    _reset()
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_cacheinputs_present(mock_ssh, mock_rsync, tmpdir):
+
+    """
+    Test that nothing is uploaded when the cache already has the files.
+    """
+
+    _reset()
+
+    mock_ssh.return_value = ("", "", 0)
+
+    assert _cacheinputs(_job(tmpdir)) == ["big.top", "copy.top"]
+    assert mock_rsync.call_count == 0
+
+    _reset()
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_cacheinputs_failed(mock_ssh, mock_rsync, tmpdir):
+
+    """
+    Test that if the cache can't be used the files are left to the normal
+    transfer.
+    """
+
+    _reset()
+
+    mock_ssh.side_effect = exceptions.SSHError("SSH Error", ("", "", 1))
+
+    assert _cacheinputs(_job(tmpdir)) == []
+
+    _reset()
+
+
+@mock.patch('longbow.staging._savehashindex')
+@mock.patch('longbow.staging._cacheinputs')
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_stage_upstream_cache(mock_ssh, mock_upload, mock_cache, mock_save,
+                              tmpdir):
+
+    """
+    Test that cached files are left out of the normal transfer.
+    """
+
+    jobs = {"jobone": _job(tmpdir)}
+
+    mock_cache.return_value = ["big.top", "copy.top"]
+
+    stage_upstream(jobs)
+
+    assert mock_upload.call_args[0][1] == ["--exclude", "/big.top",
+                                           "--exclude", "/copy.top"]
+    assert mock_save.call_count == 1
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_prunecache_command(mock_ssh):
+
+    """
+    Test that the cache directory and age make it into the remote command and
+    that the removed files are counted.
+    """
+
+    job = {
+        "remoteworkdir": "/remote/work",
+        "resource": "test-machine"
+    }
+
+    mock_ssh.return_value = ("./abc\n./def\n", "", 0)
+
+    assert prunecache(job, 30) == 2
+
+    cmd = " ".join(mock_ssh.call_args[0][1])
+
+    assert cmd.startswith("cd /remote/work/.longbow-cache ")
+    assert "-mtime +30" in cmd
+    assert "-ctime +30" in cmd
+
+
+@mock.patch('longbow.shellwrappers.sendtorsync')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_cacheinputs_quoted(mock_ssh, mock_rsync, tmpdir):
+
+    """
+    Test that the remote paths are quoted and that the cached copy is made
+    read only before it is linked.
+    """
+
+    _reset()
+    job = _job(tmpdir)
+    job["remoteworkdir"] = "/remote/my work"
+    job["destdir"] = "/remote/my work/jobone12345"
+    digest = hashlib.sha256(b"a" * staging.CACHEMINSIZE).hexdigest()
+    blob = "'/remote/my work/.longbow-cache/" + digest + "'"
+
+    mock_ssh.return_value = ("", "", 0)
+
+    assert _cacheinputs(job) == ["big.top", "copy.top"]
+
+    checkcmd = mock_ssh.call_args_list[0][0][1][0]
+    linkcmd = mock_ssh.call_args[0][1][0]
+
+    assert "cd '/remote/my work/.longbow-cache'" in checkcmd
+    assert linkcmd.index("chmod a-w " + blob) < linkcmd.index("ln -f " + blob)
+    assert "'/remote/my work/jobone12345/copy.top'" in linkcmd
+
+    _reset()
@@ -47,9 +47,8 @@ import longbow.exceptions as exceptions
 from longbow.staging import cleanup
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_single(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_single(mock_delete):
 
     """
     Test that the correct number of function calls are made.
@@ -62,23 +61,26 @@ def test_cleanup_single(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
+    mock_delete.return_value = ["deleted"]
+
     cleanup(jobs)
 
     assert mock_delete.call_count == 1, \
         "There is only one job, this should only be called once"
-    assert mock_list.call_count == 1, \
-        "There is only one job, this should only be called once"
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_multiple(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_multiple(mock_delete):
 
     """
-    Test that the correct number of function calls are made.
+    Test that the jobs on one resource are cleaned up in a single call.
     """
 
     jobs = {
@@ -88,28 +90,87 @@ def test_cleanup_multiple(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             },
         "jobtwo": {
             "destdir": "/path/to/jobtwo12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             },
         "jobthree": {
             "destdir": "/path/to/jobthree12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
+    mock_delete.return_value = ["deleted", "deleted", "deleted"]
+
     cleanup(jobs)
 
-    assert mock_delete.call_count == 3, \
-        "There is only one job, this should only be called once"
-    assert mock_list.call_count == 3, \
-        "There is only one job, this should only be called once"
+    assert mock_delete.call_count == 1, \
+        "The jobs share a resource, this should only be called once"
+    assert len(mock_delete.call_args[0][0]) == 3
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_params(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_resources(mock_delete):
+
+    """
+    Test that each resource gets a call of its own.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "recoveryfile": "rec.file"
+        },
+        "jobone": {
+            "destdir": "/path/to/jobone12484",
+            "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
+            },
+        "jobtwo": {
+            "destdir": "/path/to/jobtwo12484",
+            "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
+            },
+        "jobthree": {
+            "destdir": "/path/to/jobthree12484",
+            "remoteworkdir": "/path/to/local/dir",
+            "resource": "other-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
+            }
+    }
+
+    mock_delete.side_effect = lambda joblist, background: \
+        ["deleted" for _ in joblist]
+
+    cleanup(jobs)
+
+    assert mock_delete.call_count == 2
+    assert sorted(len(call[0][0]) for call in mock_delete.call_args_list) == \
+        [1, 2]
+
+
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_params(mock_delete):
 
     """
     Test the correct arguments make it to the method calls.
@@ -122,24 +183,30 @@ def test_cleanup_params(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
+    mock_delete.return_value = ["deleted"]
+
     cleanup(jobs)
 
-    listarg1 = mock_list.call_args[0][0]
     deletearg1 = mock_delete.call_args[0][0]
 
-    assert isinstance(listarg1, dict)
-    assert isinstance(deletearg1, dict)
+    assert isinstance(deletearg1, list)
+    assert deletearg1[0] is jobs["jobone"]
+    assert mock_delete.call_args[0][1] is False
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_nodelete(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_background(mock_delete):
 
     """
-    Test that the following exception is handled correctly.
+    Test that jobs with background cleanup switched on are removed in the
+    background, apart from the others.
     """
 
     jobs = {
@@ -148,25 +215,66 @@ def test_cleanup_nodelete(mock_delete, mock_list):
         },
         "jobone": {
             "destdir": "/path/to/jobone12484",
-            "remoteworkdir": "/path/to/jobone12484",
+            "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22",
+            "cleanup-background": "true"
+            },
+        "jobtwo": {
+            "destdir": "/path/to/jobtwo12484",
+            "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
-    mock_list.return_value = None
-    mock_delete.return_value = None
+    mock_delete.side_effect = lambda joblist, background: \
+        ["deleted" for _ in joblist]
+
+    cleanup(jobs)
+
+    calls = dict((call[0][0][0]["destdir"], call[0][1])
+                 for call in mock_delete.call_args_list)
+
+    assert calls == {"/path/to/jobone12484": True,
+                     "/path/to/jobtwo12484": False}
+
+
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_nodelete(mock_delete):
+
+    """
+    Test that the remote working directory itself is never removed.
+    """
+
+    jobs = {
+        "lbowconf": {
+            "recoveryfile": "rec.file"
+        },
+        "jobone": {
+            "destdir": "/path/to/jobone12484",
+            "remoteworkdir": "/path/to/jobone12484",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
+            }
+    }
 
     cleanup(jobs)
 
     assert mock_delete.call_count == 0, "Should not be called in this case."
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_excepttest1(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_excepttest1(mock_delete):
 
     """
-    Test that the listerror exception is entercepted and does not percolate
-    up from here.
+    Test that a missing directory is skipped.
     """
 
     jobs = {
@@ -176,22 +284,23 @@ def test_cleanup_excepttest1(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
-    mock_delete.return_value = None
-    mock_list.side_effect = exceptions.RemotelistError("List Error", "blah")
+    mock_delete.return_value = ["missing"]
 
     cleanup(jobs)
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_excepttest2(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_excepttest2(mock_delete):
 
     """
-    Test that the KeyError exception is entercepted and does not percolate
-    up from here.
+    Test that a job missing its parameters is skipped.
     """
 
     jobs = {
@@ -204,18 +313,16 @@ def test_cleanup_excepttest2(mock_delete, mock_list):
             }
     }
 
-    mock_delete.return_value = None
-    mock_list.side_effect = KeyError("blah")
-
     cleanup(jobs)
 
+    assert mock_delete.call_count == 0
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_excepttest3(mock_delete, mock_list):
+
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_excepttest3(mock_delete):
 
     """
-    Test that the KeyError exception is entercepted and does not percolate
+    Test that the deleteerror exception is entercepted and does not percolate
     up from here.
     """
 
@@ -226,22 +333,23 @@ def test_cleanup_excepttest3(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
     mock_delete.side_effect = exceptions.RemotedeleteError("Error", "blah")
-    mock_list.return_value = None
 
     cleanup(jobs)
 
 
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_excepttest4(mock_delete, mock_list):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_excepttest4(mock_delete):
 
     """
-    Test that the KeyError exception is entercepted and does not percolate
-    up from here.
+    Test that a directory that could not be removed is skipped.
     """
 
     jobs = {
@@ -251,20 +359,22 @@ def test_cleanup_excepttest4(mock_delete, mock_list):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
-    mock_delete.return_value = None
-    mock_list.side_effect = NameError("blah")
+    mock_delete.return_value = ["failed"]
 
     cleanup(jobs)
 
 
 @mock.patch('os.remove')
 @mock.patch('os.path.isfile')
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_recoveryfilerm1(m_delete, m_list, m_isfile, m_remove):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_recoveryfilerm1(m_delete, m_isfile, m_remove):
 
     """
     Test that the recoveryfile would be removed.
@@ -277,23 +387,26 @@ def test_cleanup_recoveryfilerm1(m_delete, m_list, m_isfile, m_remove):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
     m_isfile.return_value = True
-    m_delete.return_value = None
-    m_list.return_value = None
+    m_delete.return_value = ["deleted"]
 
     cleanup(jobs)
 
-    assert m_remove.call_count == 1
+    # The recovery file and its journal.
+    assert m_remove.call_count == 2
 
 
 @mock.patch('os.remove')
 @mock.patch('os.path.isfile')
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_recoveryfilerm2(m_delete, m_list, m_isfile, m_remove):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_recoveryfilerm2(m_delete, m_isfile, m_remove):
 
     """
     Test that the recoveryfile would be removed.
@@ -306,12 +419,15 @@ def test_cleanup_recoveryfilerm2(m_delete, m_list, m_isfile, m_remove):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
     m_isfile.return_value = True
-    m_delete.return_value = None
-    m_list.return_value = None
+    m_delete.return_value = ["deleted"]
 
     cleanup(jobs)
 
@@ -320,9 +436,8 @@ def test_cleanup_recoveryfilerm2(m_delete, m_list, m_isfile, m_remove):
 
 @mock.patch('os.remove')
 @mock.patch('os.path.isfile')
-@mock.patch('longbow.shellwrappers.remotelist')
-@mock.patch('longbow.shellwrappers.remotedelete')
-def test_cleanup_recoveryfilerm3(m_delete, m_list, m_isfile, m_remove):
+@mock.patch('longbow.shellwrappers.remotedelete_many')
+def test_cleanup_recoveryfilerm3(m_delete, m_isfile, m_remove):
 
     """
     Test that the recoveryfile would be removed.
@@ -335,12 +450,15 @@ def test_cleanup_recoveryfilerm3(m_delete, m_list, m_isfile, m_remove):
         "jobone": {
             "destdir": "/path/to/jobone12484",
             "remoteworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee",
+            "host": "massive-machine",
+            "port": "22"
             }
     }
 
     m_isfile.return_value = False
-    m_delete.return_value = None
-    m_list.return_value = None
+    m_delete.return_value = ["deleted"]
 
     cleanup(jobs)
 
@@ -0,0 +1,239 @@
+# BSD 3-Clause License
+#
+# Copyright (c) 2017, Science and Technology Facilities Council and
+# The University of Nottingham
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+This testing module contains the tests for the stage_downstream_many method
+within the staging module.
+"""
+
+try:
+
+    from unittest import mock
+
+except ImportError:
+
+    import mock
+
+import longbow.exceptions as exceptions
+from longbow.staging import stage_downstream_many
+
+
+def _jobs(bulk):
+
+    jobs = {}
+
+    for name in ["jobone", "jobtwo", "jobthree"]:
+
+        jobs[name] = {
+            "bulk-staging": bulk,
+            "destdir": "/remote/work/" + name + "12345",
+            "download-exclude": "",
+            "download-include": "",
+            "host": "massive-machine",
+            "jobname": name,
+            "localworkdir": "/local/" + name,
+            "port": "22",
+            "resource": "test-machine",
+            "user": "juan_trique-ponee"
+        }
+
+    return jobs
+
+
+@mock.patch('longbow.shellwrappers.downloadmany')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_single(mock_download, mock_many):
+
+    """
+    Test that each job is transferred on its own without bulk staging.
+    """
+
+    jobs = _jobs("false")
+
+    failed = stage_downstream_many(jobs, ["jobone", "jobtwo", "jobthree"])
+
+    assert failed == []
+    assert mock_download.call_count == 3
+    assert mock_many.call_count == 0
+
+
+@mock.patch('longbow.shellwrappers.downloadmany')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_bulk(mock_download, mock_many):
+
+    """
+    Test that jobs on the same resource are grouped into one transfer.
+    """
+
+    jobs = _jobs("true")
+    jobs["jobthree"]["download-exclude"] = "*.dcd"
+
+    failed = stage_downstream_many(jobs, ["jobone", "jobtwo", "jobthree"])
+
+    assert failed == []
+    assert mock_many.call_count == 1
+    assert len(mock_many.call_args[0][0]) == 2
+    assert mock_download.call_count == 1
+
+
+@mock.patch('longbow.shellwrappers.downloadmany')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_fallback(mock_download, mock_many):
+
+    """
+    Test that a failed grouped transfer falls back to one transfer per job,
+    and that jobs that still fail are returned.
+    """
+
+    jobs = _jobs("true")
+
+    def _download(job, options=None):
+
+        if job["jobname"] == "jobtwo":
+
+            raise exceptions.RsyncError("Rsync Error", "output")
+
+    mock_many.side_effect = exceptions.RsyncError("Rsync Error", "output")
+    mock_download.side_effect = _download
+
+    failed = stage_downstream_many(jobs, ["jobone", "jobtwo", "jobthree"])
+
+    assert failed == ["jobtwo"]
+    assert mock_download.call_count == 3
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_manifest(mock_download, mock_ssh):
+
+    """
+    Test that the jobs on a resource are listed with one SSH call, that jobs
+    are staged in full the first time, then only if their files change and
+    only those files.
+    """
+
+    jobs = _jobs("false")
+    listed = []
+
+    for name in jobs:
+
+        jobs[name]["laststatus"] = "Running"
+        jobs[name]["staging-manifest"] = "true"
+
+    def _download(job, options=None):
+
+        if options is not None:
+
+            with open(options[0].split("=", 1)[1]) as listfile:
+
+                listed.append((job["jobname"], listfile.read().split()))
+
+    mock_download.side_effect = _download
+    mock_ssh.return_value = (
+        "a.out\t10\t100.0\n/\n"
+        "a.out\t10\t100.0\nsub/b.dcd\t20\t100.0\n/\n"
+        "/\n", "", 0)
+
+    stage_downstream_many(jobs, ["jobone", "jobtwo", "jobthree"])
+
+    assert mock_ssh.call_count == 1
+    assert mock_ssh.call_args[0][1][0].count("find /remote/work/") == 3
+    assert mock_download.call_count == 3
+    assert listed == []
+
+    mock_ssh.return_value = (
+        "a.out\t10\t100.0\n/\n"
+        "a.out\t12\t150.0\nsub/b.dcd\t20\t100.0\nc.log\t1\t150.0\n/\n"
+        "/\n", "", 0)
+
+    stage_downstream_many(jobs, ["jobone", "jobtwo", "jobthree"])
+
+    assert mock_ssh.call_count == 2
+    assert mock_download.call_count == 5
+    assert listed == [("jobtwo", ["a.out", "c.log"])]
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_manifestfail(mock_download, mock_ssh):
+
+    """
+    Test that a failed listing, or a failed transfer, means a full transfer
+    next time.
+    """
+
+    jobs = _jobs("false")
+    jobs = {"jobone": jobs["jobone"]}
+    jobs["jobone"]["destdir"] = "/remote/work/jobfail12345"
+    jobs["jobone"]["laststatus"] = "Running"
+    jobs["jobone"]["staging-manifest"] = "true"
+
+    mock_ssh.side_effect = exceptions.SSHError("SSH Error", ("", "", 1))
+
+    stage_downstream_many(jobs, ["jobone"])
+
+    assert mock_download.call_args[0][1] is None
+
+    mock_ssh.side_effect = None
+    mock_ssh.return_value = ("a.out\t10\t100.0\n/\n", "", 0)
+    mock_download.side_effect = exceptions.RsyncError("Rsync Error", "out")
+
+    assert stage_downstream_many(jobs, ["jobone"]) == ["jobone"]
+
+    mock_download.side_effect = None
+
+    stage_downstream_many(jobs, ["jobone"])
+
+    assert mock_download.call_args[0][1] is None
+
+
+@mock.patch('longbow.shellwrappers.sendtossh')
+@mock.patch('longbow.shellwrappers.download')
+def test_stage_downstream_many_manifestquoted(mock_download, mock_ssh):
+
+    """
+    Test that the job directory is quoted in the listing command.
+    """
+
+    jobs = _jobs("false")
+    jobs = {"jobone": jobs["jobone"]}
+    jobs["jobone"]["destdir"] = "/remote/my work/jobone12345"
+    jobs["jobone"]["laststatus"] = "Running"
+    jobs["jobone"]["staging-manifest"] = "true"
+
+    mock_ssh.return_value = ("a.out\t10\t100.0\n/\n", "", 0)
+
+    stage_downstream_many(jobs, ["jobone"])
+
+    assert "find '/remote/my work/jobone12345' " in \
+        mock_ssh.call_args[0][1][0]
@@ -54,7 +54,8 @@ from longbow.staging import stage_upstream
 def test_stage_upstream_singlejob(mock_ssh, mock_upload):
 
     """
-    Test if a single call is made to SSH and rsync. Multiples here are bad.
+    Test if a single call is made to rsync, and none to SSH as the transfer
+    makes the job directory. Multiples here are bad.
     """
 
     jobs = {
@@ -66,8 +67,8 @@ def test_stage_upstream_singlejob(mock_ssh, mock_upload):
 
     stage_upstream(jobs)
 
-    assert mock_ssh.call_count == 1, \
-        "There is only one job, this should only be called once"
+    assert mock_ssh.call_count == 0, \
+        "The directory is made by the transfer"
     assert mock_upload.call_count == 1, \
         "There is only one job, this should only be called once"
 
@@ -77,7 +78,7 @@ def test_stage_upstream_singlejob(mock_ssh, mock_upload):
 def test_stage_upstream_multijobs(mock_ssh, mock_upload):
 
     """
-    Test if multiple calls are made to SSH and rsync.
+    Test if multiple calls are made to rsync.
     """
 
     jobs = {
@@ -101,27 +102,29 @@ def test_stage_upstream_multijobs(mock_ssh, mock_upload):
 
     stage_upstream(jobs)
 
-    assert mock_ssh.call_count == 4, \
-        "There is only one job, this should only be called once"
+    assert mock_ssh.call_count == 0, \
+        "The directories are made by the transfers"
     assert mock_upload.call_count == 4, \
         "There is only one job, this should only be called once"
 
 
-@mock.patch('longbow.shellwrappers.sendtossh')
-def test_stage_upstream_sshexcept(mock_ssh):
+@mock.patch('longbow.staging._cacheinputs')
+def test_stage_upstream_sshexcept(mock_cache):
 
     """
-    Test if the SSH exception is raised if passed up from the SSH call.
+    Test if the SSH exception is raised if passed up from the SSH call that
+    puts cached inputs in place.
     """
 
     jobs = {
         "jobone": {
             "destdir": "/path/to/jobone12484",
+            "input-cache": "true",
             "resource": "test-machine"
             }
     }
 
-    mock_ssh.side_effect = exceptions.SSHError("SSH Error", "output")
+    mock_cache.side_effect = exceptions.SSHError("SSH Error", "output")
 
     with pytest.raises(exceptions.SSHError):
 
@@ -171,10 +174,154 @@ def test_stage_upstream_params(mock_ssh, mock_upload):
     stage_upstream(jobs)
 
     uploadarg1 = mock_upload.call_args[0][0]
-    ssharg1 = mock_ssh.call_args[0][0]
-    ssharg2 = mock_ssh.call_args[0][1]
 
     assert isinstance(uploadarg1, dict)
-    assert isinstance(ssharg1, dict)
-    assert isinstance(ssharg2, list)
-    assert ssharg2[0] == "mkdir -p /path/to/jobone12484\n"
+    assert uploadarg1["destdir"] == "/path/to/jobone12484"
+    assert mock_ssh.call_count == 0
+
+
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_stage_upstream_jobfailure(mock_ssh, mock_upload):
+
+    """
+    Test that a failed transfer for one job doesn't stop the others, and that
+    the failure is still raised at the end.
+    """
+
+    jobs = {
+        "jobone": {
+            "destdir": "/path/to/jobone12484",
+            "localworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "staging-concurrency": "2"
+            },
+        "jobtwo": {
+            "destdir": "/path/to/jobtwo12484",
+            "localworkdir": "/path/to/local/dir",
+            "resource": "test-machine",
+            "staging-concurrency": "2"
+            },
+        "jobthree": {
+            "destdir": "/path/to/jobthree12484",
+            "localworkdir": "/path/to/local/dir",
+            "resource": "other-machine"
+            }
+    }
+
+    def _upload(job, options=None):
+
+        if job is jobs["jobone"]:
+
+            raise exceptions.RsyncError("Rsync Error", "output")
+
+    mock_upload.side_effect = _upload
+
+    with pytest.raises(exceptions.StagingError):
+
+        stage_upstream(jobs)
+
+    assert mock_upload.call_count == 3
+
+
+@mock.patch('longbow.shellwrappers.uploadmany')
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_stage_upstream_bulk(mock_ssh, mock_upload, mock_many):
+
+    """
+    Test that in bulk mode the files are sent with one transfer, which makes
+    the directories too.
+    """
+
+    jobs = {}
+
+    for name in ["jobone", "jobtwo", "jobthree"]:
+
+        jobs[name] = {
+            "bulk-staging": "true",
+            "destdir": "/path/to/" + name + "12484",
+            "host": "massive-machine",
+            "port": "22",
+            "resource": "test-machine",
+            "upload-exclude": "",
+            "upload-include": "",
+            "user": "juan_trique-ponee"
+        }
+
+    stage_upstream(jobs)
+
+    assert mock_ssh.call_count == 0
+    assert mock_many.call_count == 1
+    assert mock_upload.call_count == 0
+
+
+@mock.patch('longbow.shellwrappers.uploadmany')
+@mock.patch('longbow.shellwrappers.upload')
+@mock.patch('longbow.shellwrappers.sendtossh')
+def test_stage_upstream_bulktarstream(mock_ssh, mock_upload, mock_many):
+
+    """
+    Test that jobs using tar streams are staged on their own even in bulk
+    mode.
+    """
+
+    jobs = {}
+
+    for name in ["jobone", "jobtwo"]:
+
+        jobs[name] = {
+            "bulk-staging": "true",
+            "destdir": "/path/to/" + name + "12484",
+            "host": "massive-machine",
+            "port": "22",
+            "resource": "test-machine",
+            "transfer-mode": "tarstream",
+            "upload-exclude": "",
+            "upload-include": "",
+            "user": "juan_trique-ponee"
+        }
+
+    stage_upstream(jobs)
+
+    assert mock_many.call_count == 0
+    assert mock_upload.call_count == 2
+
+
+@mock.patch('longbow.shellwrappers.upload')
+def test_stage_upstream_then(mock_upload):
+
+    """
+    Test that each job is handed on once staged, and that the rest of the jobs
+    on a resource are held once the hand on returns False.
+    """
+
+    jobs = {"lbowconf": {}}
+
+    for name in ["jobone", "jobtwo", "jobthree"]:
+
+        jobs[name] = {
+            "destdir": "/path/to/" + name,
+            "localworkdir": "/path/to/local/dir",
+            "resource": "test-machine"
+        }
+
+    jobs["jobfour"] = {
+        "destdir": "/path/to/jobfour",
+        "localworkdir": "/path/to/local/dir",
+        "resource": "other-machine"
+    }
+
+    handed = []
+
+    def _then(group):
+
+        handed.extend(group)
+
+        return group[0] != "jobtwo"
+
+    held = stage_upstream(jobs, then=_then)
+
+    assert sorted(handed) == ["jobfour", "jobone", "jobtwo"]
+    assert held == ["jobthree"]
+    assert mock_upload.call_count == 3